@@ -0,0 +1,224 @@
+"""Compare Excel round trips of per-cell access with the bulk range path.
+
+Builds a sheet in the in-memory fake Excel, then scans and writes it back
+once the way process_excel used to (one Range per cell, value read twice,
+one assignment per translated cell) and once through ExcelBackend, and
+prints the number of COM calls each needed.  Shapes are compared the same
+way: probing every access method on read and again on write-back, against
+the shape handles of ExcelBackend, and reported as COM calls per shape.
+
+    python benchmark/com_calls.py --rows 5000 --cols 10 --shapes 300
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from excel_backend import ExcelBackend  # noqa: E402
+from fake_excel import FakeApp, FakeSheet  # noqa: E402
+
+
+def make_sheet(rows, cols, seed=0):
+    """Mix of text, numbers, formulas and empty cells"""
+    rng = random.Random(seed)
+    contents = {}
+    for row in range(1, rows + 1):
+        for column in range(1, cols + 1):
+            kind = rng.random()
+            if kind < 0.6:
+                contents[(row, column)] = f"テキスト{rng.randrange(1000)}です"
+            elif kind < 0.8:
+                contents[(row, column)] = rng.randrange(100000)
+            elif kind < 0.9:
+                contents[(row, column)] = f"=SUM(A{row}:B{row})"
+    return contents
+
+
+def make_shapes(count, seed=0):
+    """Text boxes, WordArt, pictures, OLE objects and some groups of them"""
+    rng = random.Random(seed)
+    kinds = ["textbox", "textbox", "autoshape", "wordart", "smartart", "picture", "ole"]
+    shapes = []
+    while len(shapes) < count:
+        if rng.random() < 0.1:
+            shapes.append(("group", [(rng.choice(kinds), f"図形{rng.randrange(1000)}") for _ in range(3)]))
+        else:
+            shapes.append((rng.choice(kinds), f"図形{rng.randrange(1000)}"))
+    return shapes
+
+
+def count_shapes(shapes):
+    return sum(count_shapes(content) if kind == "group" else 1 for kind, content in shapes)
+
+
+def legacy_shapes(app, path):
+    """The old shape scan and write-back: every access method probed with
+    hasattr on read, and again in a different order on write"""
+    book = app.books.open(path)
+    for sheet in book.sheets:
+        shapes = sheet.api.Shapes
+        found = []
+        for i in range(1, shapes.Count + 1):
+            shape = shapes.Item(i)
+            text = None
+            try:
+                if hasattr(shape, 'TextFrame') and shape.TextFrame.HasText:
+                    text = shape.TextFrame.Characters().Text
+            except Exception:
+                pass
+            if not text:
+                try:
+                    if hasattr(shape, 'TextFrame2'):
+                        text = shape.TextFrame2.TextRange.Text
+                except Exception:
+                    pass
+            if not text:
+                try:
+                    if hasattr(shape, 'AlternativeText') and shape.AlternativeText:
+                        text = shape.AlternativeText
+                except Exception:
+                    pass
+            if not text:
+                try:
+                    if hasattr(shape, 'OLEFormat') and hasattr(shape.OLEFormat, 'Object'):
+                        if hasattr(shape.OLEFormat.Object, 'Text'):
+                            text = shape.OLEFormat.Object.Text
+                except Exception:
+                    pass
+            if not text:
+                try:
+                    if hasattr(shape, 'TextEffect') and hasattr(shape.TextEffect, 'Text'):
+                        text = shape.TextEffect.Text
+                except Exception:
+                    pass
+            if text:
+                found.append((i, text))
+
+        for i, text in found:
+            shape = shapes.Item(i)
+            text = "T:" + text
+            try:
+                if hasattr(shape, 'TextFrame') and shape.TextFrame.HasText:
+                    shape.TextFrame.Characters().Text = text
+                    continue
+            except Exception:
+                pass
+            try:
+                if hasattr(shape, 'TextFrame2'):
+                    shape.TextFrame2.TextRange.Text = text
+                    continue
+            except Exception:
+                pass
+            try:
+                if hasattr(shape, 'AlternativeText'):
+                    shape.AlternativeText = text
+                    continue
+            except Exception:
+                pass
+            try:
+                if hasattr(shape, 'TextEffect') and hasattr(shape.TextEffect, 'Text'):
+                    shape.TextEffect.Text = text
+                    continue
+            except Exception:
+                pass
+            try:
+                if hasattr(shape, 'OLEFormat') and hasattr(shape.OLEFormat, 'Object'):
+                    if hasattr(shape.OLEFormat.Object, 'Text'):
+                        shape.OLEFormat.Object.Text = text
+            except Exception:
+                pass
+    book.save(path + ".legacy")
+
+
+def legacy(app, path):
+    """The old per-cell scan and write-back"""
+    book = app.books.open(path)
+    for sheet in book.sheets:
+        refs = []
+        for cell in sheet.used_range:
+            cell_value_str = str(cell.value) if cell.value is not None else ""
+            if cell_value_str and not cell_value_str.replace('.', '').isdigit():
+                refs.append((cell, cell_value_str))
+        for cell, text in refs:
+            cell.value = "T:" + text
+    book.save(path + ".legacy")
+
+
+def bulk(app, path):
+    """Scan and write back through ExcelBackend"""
+    backend = ExcelBackend(app_factory=lambda: app)
+    wb = backend.open(path)
+    for _, segments in wb.sections():
+        for text, ref in segments:
+            wb.write(ref, "T:" + text)
+    wb.save(path + ".bulk")
+    wb.close()
+
+
+def translated_shapes(shapes):
+    """Expected shape texts after "T:" is written in front of every text"""
+    return [translated_shapes(content) if kind == "group" else "T:" + content for kind, content in shapes]
+
+
+def compare_shapes(shapes):
+    contents = {(1, 1): "見出し", "shapes": shapes}
+    total = count_shapes(shapes)
+    print(f"\nShapes: {len(shapes)} on the sheet, {total} with text (including grouped shapes)\n")
+    expected = list(_flatten(translated_shapes(shapes)))
+    for name, run, suffix in (("probing", legacy_shapes, ".legacy"), ("handles", bulk, ".bulk")):
+        app = FakeApp({"book.xlsx": {"Sheet1": contents}})
+        with contextlib.redirect_stdout(io.StringIO()):
+            run(app, "book.xlsx")
+        shape_calls = sum(count for call, count in app.calls.items() if not call.startswith(("range", "sheet", "book")))
+        written = app.saved_shapes["book.xlsx" + suffix]["Sheet1"]
+        translated = sum(1 for got, want in zip(_flatten(written), expected) if got == want)
+        print(f"{name:>9}: {shape_calls:>7} COM calls on shapes  {shape_calls / max(translated, 1):5.1f} per translated shape  "
+              f"{translated}/{total} shapes translated")
+
+
+def _flatten(texts):
+    for text in texts:
+        if isinstance(text, list):
+            yield from _flatten(text)
+        else:
+            yield text
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=2000)
+    parser.add_argument('--cols', type=int, default=10)
+    parser.add_argument('--shapes', type=int, default=200, help='Shapes on the sheet for the shape comparison (default: 200)')
+    args = parser.parse_args()
+
+    contents = make_sheet(args.rows, args.cols)
+    print(f"Sheet: {args.rows} rows x {args.cols} columns, {len(contents)} non-empty cells\n")
+
+    results = {}
+    for name, run in (("per-cell", legacy), ("bulk", bulk)):
+        app = FakeApp({"book.xlsx": {"Sheet1": contents}})
+        start_time = time.perf_counter()
+        run(app, "book.xlsx")
+        elapsed = time.perf_counter() - start_time
+        results[name] = app
+        print(f"{name:>9}: {sum(app.calls.values()):>9} COM calls  {elapsed:7.3f} s  {dict(app.calls)}")
+
+    # Numbers and formulas must come through the bulk write unchanged
+    app = results["bulk"]
+    source = FakeSheet(app, "Sheet1", contents).cells
+    after = app.saved["book.xlsx.bulk"]["Sheet1"]
+    untouched = [position for position, (value, formula) in source.items()
+                 if not isinstance(value, str) or formula.startswith('=')]
+    kept = sum(after.get(position) == source[position] for position in untouched)
+    print(f"\nNumbers and formulas unchanged by the bulk write: {kept}/{len(untouched)}")
+
+    if args.shapes:
+        compare_shapes(make_shapes(args.shapes))
+
+if __name__ == "__main__":
+    main()
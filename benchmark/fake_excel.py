@@ -0,0 +1,358 @@
+"""In-memory stand-in for the parts of xlwings/Excel used by excel_backend.
+
+Every property access or assignment that would be a COM round trip to Excel
+is counted in ``FakeApp.calls``, so the cost of different access patterns can
+be measured on any platform:
+
+    app = FakeApp({"book.xlsx": {"Sheet1": {(1, 1): "こんにちは", (1, 2): "=A1"}}})
+    backend = ExcelBackend(app_factory=lambda: app)
+
+Cell contents are given as {(row, column): content}; a string starting with
+"=" is a formula (its value is the formula text in angle brackets).  Shapes
+are given under the key "shapes" as (kind, text) pairs, a group as
+("group", [(kind, text), ...]):
+
+    {"Sheet1": {(1, 1): "見出し", "shapes": [("textbox", "注意"), ("group", [("wordart", "タイトル")])]}}
+
+Each shape only has the members real Excel offers for its kind; the others
+raise AttributeError like a failed COM call.
+"""
+import copy
+import os
+import re
+from collections import Counter
+
+NUMBER = re.compile(r'^[-+]?\d+(\.\d+)?$')
+
+
+class FakeApp:
+    def __init__(self, workbooks):
+        self.workbooks = workbooks  # path -> {sheet name: {(row, column): content}}
+        self.saved = {}  # path -> {sheet name: {(row, column): (value, formula)}}
+        self.saved_shapes = {}  # path -> {sheet name: [shape text, or a list for a group]}
+        self.calls = Counter()
+        self.pid = 1
+        self.books = FakeBooks(self)
+
+    def call(self, name):
+        self.calls[name] += 1
+
+    def quit(self):
+        self.pid = None
+
+
+class FakeBooks:
+    def __init__(self, app):
+        self.app = app
+
+    def open(self, path):
+        self.app.call("books.open")
+        return FakeBook(self.app, self.app.workbooks[path], os.path.basename(path))
+
+
+class FakeBook:
+    def __init__(self, app, sheets, name="book.xlsx"):
+        self.app = app
+        self.name = name
+        self.api = FakeBookApi(self)
+        self.sheets = []
+        for name, contents in sheets.items():
+            cells = {position: content for position, content in contents.items() if position != "shapes"}
+            self.sheets.append(FakeSheet(app, name, cells, contents.get("shapes", [])))
+
+    def save(self, path):
+        self.app.call("book.save")
+        self.app.saved[path] = {sheet.name: copy.deepcopy(sheet.cells) for sheet in self.sheets}
+        self.app.saved_shapes[path] = {sheet.name: [shape.texts() for shape in sheet.api.Shapes.shapes]
+                                       for sheet in self.sheets}
+
+    def close(self):
+        self.app.call("book.close")
+
+    def contents(self):
+        """The workbook in the form FakeApp takes, as it is now"""
+        return {sheet.name: {**{position: formula for position, (_, formula) in sheet.cells.items()},
+                             "shapes": [shape.spec() for shape in sheet.api.Shapes.shapes]}
+                for sheet in self.sheets}
+
+
+class FakeBookApi:
+    def __init__(self, book):
+        self.book = book
+
+    def SaveCopyAs(self, path):
+        self.book.app.call("book.SaveCopyAs")
+        self.book.app.workbooks[path] = self.book.contents()
+
+
+class FakeSheet:
+    def __init__(self, app, name, contents, shapes=()):
+        self.app = app
+        self.name = name
+        self.cells = {}  # (row, column) -> (value, formula)
+        for position, content in contents.items():
+            self.set_cell(position, content)
+        self.api = FakeSheetApi(app, [make_shape(app, spec) for spec in shapes])
+
+    def set_cell(self, position, content):
+        """Store content the way Excel parses typed input"""
+        if content is None or content == '':
+            self.cells.pop(position, None)
+        elif isinstance(content, str) and content.startswith('='):
+            previous = self.cells.get(position)
+            value = previous[0] if previous and previous[1] == content else f"<{content}>"
+            self.cells[position] = (value, content)
+        elif isinstance(content, str) and NUMBER.match(content):
+            self.cells[position] = (float(content), content)
+        elif isinstance(content, (int, float)):
+            self.cells[position] = (float(content), '%.15g' % content)
+        else:
+            self.cells[position] = (content, content)
+
+    @property
+    def used_range(self):
+        self.app.call("sheet.used_range")
+        if not self.cells:
+            return FakeRange(self, 1, 1, 1, 1)
+        rows = [row for row, _ in self.cells]
+        columns = [column for _, column in self.cells]
+        return FakeRange(self, min(rows), min(columns), max(rows), max(columns))
+
+    def range(self, first, last=None):
+        self.app.call("sheet.range")
+        last = last or first
+        return FakeRange(self, first[0], first[1], last[0], last[1])
+
+
+class FakeSheetApi:
+    def __init__(self, app, shapes=()):
+        self.app = app
+        self.Shapes = FakeShapes(app, list(shapes))
+
+
+class FakeShapes:
+    def __init__(self, app, shapes, name="Shapes"):
+        self.app = app
+        self.shapes = shapes
+        self.name = name
+
+    @property
+    def Count(self):
+        self.app.call(f"{self.name}.Count")
+        return len(self.shapes)
+
+    def Item(self, index):
+        self.app.call(f"{self.name}.Item")
+        return self.shapes[index - 1]
+
+
+def make_shape(app, spec):
+    kind, content = spec
+    if kind == "group":
+        return FakeShape(app, kind, None, [make_shape(app, item) for item in content])
+    return FakeShape(app, kind, content)
+
+
+class FakeShape:
+    # Shape.Type and the text members of each kind of shape
+    TYPES = {"autoshape": 1, "group": 6, "ole": 7, "picture": 13, "wordart": 15, "textbox": 17, "smartart": 24}
+    MEMBERS = {
+        "autoshape": {"TextFrame", "TextFrame2", "AlternativeText"},
+        "textbox": {"TextFrame", "TextFrame2", "AlternativeText"},
+        "wordart": {"TextFrame", "TextFrame2", "TextEffect", "AlternativeText"},
+        "smartart": {"TextFrame2", "AlternativeText"},
+        "picture": {"AlternativeText"},  # The text of a picture is its alternative text
+        "ole": {"OLEFormat", "AlternativeText"},
+        "group": {"GroupItems", "AlternativeText"},
+    }
+
+    def __init__(self, app, kind, text, items=None):
+        self.app = app
+        self.kind = kind
+        self.text = text or ""
+        self.items = items or []
+
+    def texts(self):
+        return [item.texts() for item in self.items] if self.kind == "group" else self.text
+
+    def spec(self):
+        return (self.kind, [item.spec() for item in self.items] if self.kind == "group" else self.text)
+
+    def member(self, name):
+        self.app.call(f"Shape.{name}")
+        if name not in self.MEMBERS[self.kind]:
+            raise AttributeError(name)
+
+    @property
+    def Type(self):
+        self.app.call("Shape.Type")
+        return self.TYPES[self.kind]
+
+    @property
+    def GroupItems(self):
+        self.member("GroupItems")
+        return FakeShapes(self.app, self.items, "GroupItems")
+
+    @property
+    def TextFrame(self):
+        self.member("TextFrame")
+        return FakeTextFrame(self)
+
+    @property
+    def TextFrame2(self):
+        self.member("TextFrame2")
+        return FakeTextObject(self, "TextRange")
+
+    @property
+    def OLEFormat(self):
+        self.member("OLEFormat")
+        return FakeTextObject(self, "Object")
+
+    @property
+    def TextEffect(self):
+        self.member("TextEffect")
+        return FakeShapeText(self, "TextEffect")
+
+    @property
+    def AlternativeText(self):
+        self.member("AlternativeText")
+        return self.text if self.kind == "picture" else ""
+
+    @AlternativeText.setter
+    def AlternativeText(self, text):
+        self.member("AlternativeText")
+        if self.kind == "picture":
+            self.text = text
+
+
+class FakeTextFrame:
+    def __init__(self, shape):
+        self.shape = shape
+
+    @property
+    def HasText(self):
+        self.shape.app.call("TextFrame.HasText")
+        return bool(self.shape.text)
+
+    def Characters(self):
+        self.shape.app.call("TextFrame.Characters")
+        return FakeShapeText(self.shape, "Characters")
+
+
+class FakeTextObject:
+    """TextFrame2 (.TextRange) or OLEFormat (.Object), which hold the text one level down"""
+
+    def __init__(self, shape, child):
+        self.shape = shape
+        self.child = child
+
+    def __getattr__(self, name):
+        if name != self.child:
+            raise AttributeError(name)
+        self.shape.app.call(self.child)
+        return FakeShapeText(self.shape, self.child)
+
+
+class FakeShapeText:
+    """Object with the Text property of a shape"""
+
+    def __init__(self, shape, name):
+        self.shape = shape
+        self.name = name
+
+    @property
+    def Text(self):
+        self.shape.app.call(f"{self.name}.Text")
+        return self.shape.text
+
+    @Text.setter
+    def Text(self, text):
+        self.shape.app.call(f"{self.name}.Text=")
+        self.shape.text = text
+
+
+class FakeRange:
+    def __init__(self, sheet, top, left, bottom, right, ndim=None):
+        self.sheet = sheet
+        self.top, self.left, self.bottom, self.right = top, left, bottom, right
+        self.ndim = ndim
+
+    def options(self, ndim=None):
+        return FakeRange(self.sheet, self.top, self.left, self.bottom, self.right, ndim)
+
+    def _positions(self):
+        return [[(row, column) for column in range(self.left, self.right + 1)]
+                for row in range(self.top, self.bottom + 1)]
+
+    def _read(self, field):
+        return [[self.sheet.cells.get(position, (None, ''))[field] for position in row]
+                for row in self._positions()]
+
+    @property
+    def row(self):
+        self.sheet.app.call("range.row")
+        return self.top
+
+    @property
+    def column(self):
+        self.sheet.app.call("range.column")
+        return self.left
+
+    @property
+    def shape(self):
+        self.sheet.app.call("range.shape")
+        return self.bottom - self.top + 1, self.right - self.left + 1
+
+    @property
+    def count(self):
+        self.sheet.app.call("range.count")
+        return (self.bottom - self.top + 1) * (self.right - self.left + 1)
+
+    @property
+    def address(self):
+        return f"R{self.top}C{self.left}"
+
+    @property
+    def value(self):
+        self.sheet.app.call("range.value")
+        grid = self._read(0)
+        if self.ndim == 2:
+            return grid
+        if len(grid) == 1 and len(grid[0]) == 1:
+            return grid[0][0]
+        return grid[0] if len(grid) == 1 else grid
+
+    @value.setter
+    def value(self, content):
+        self.sheet.app.call("range.value=")
+        self._assign(content)
+
+    @property
+    def formula(self):
+        self.sheet.app.call("range.formula")
+        grid = self._read(1)
+        if len(grid) == 1 and len(grid[0]) == 1:
+            return grid[0][0]
+        return tuple(tuple(row) for row in grid)
+
+    @formula.setter
+    def formula(self, content):
+        self.sheet.app.call("range.formula=")
+        self._assign(content)
+
+    def _assign(self, content):
+        positions = self._positions()
+        if not isinstance(content, (list, tuple)):
+            content = [[content] * len(positions[0])] * len(positions)
+        elif content and not isinstance(content[0], (list, tuple)):
+            content = [content]
+        for position_row, content_row in zip(positions, content):
+            for position, item in zip(position_row, content_row):
+                self.sheet.set_cell(position, item)
+
+    def __iter__(self):
+        # xlwings creates a Range per cell, each one a COM call
+        for row in self._positions():
+            for row_index, column in row:
+                self.sheet.app.call("range.__iter__")
+                yield FakeRange(self.sheet, row_index, column, row_index, column)
@@ -0,0 +1,220 @@
+"""Generate synthetic .xlsx workbooks for benchmarks.
+
+Workbooks are written directly with zipfile, so neither Excel nor openpyxl is
+needed.  Cells mix text, numbers and formulas; a share of the texts is drawn
+from a small pool so the same strings repeat, as they do in real sheets.
+Each sheet can also get a drawing with text boxes (shapes).
+
+    python benchmark/make_workbooks.py --out bench_input --files 4 --sheets 3 --rows 2000 --repeat 0.5
+"""
+import argparse
+import os
+import random
+import zipfile
+from xml.sax.saxutils import escape
+
+# Characters used for synthetic Japanese text
+KANA = "あいうえおかきくけこさしすせそたちつてとなにぬねのはひふへほまみむめもやゆよらりるれろわをん"
+KANJI = "日本語会社売上利益計画報告書確認担当部署製品番号在庫数量金額合計備考予定実績顧客"
+
+NS_MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+NS_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+NS_PKG_REL = "http://schemas.openxmlformats.org/package/2006/relationships"
+NS_XDR = "http://schemas.openxmlformats.org/drawingml/2006/spreadsheetDrawing"
+NS_A = "http://schemas.openxmlformats.org/drawingml/2006/main"
+REL_TYPE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/"
+
+
+def column_letter(column):
+    """Excel column letters for a 1-based column number"""
+    letters = ""
+    while column:
+        column, remainder = divmod(column - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def random_text(rng, min_length, max_length):
+    length = rng.randint(min_length, max_length)
+    return "".join(rng.choice(KANJI if rng.random() < 0.4 else KANA) for _ in range(length))
+
+
+def skippable_text(rng):
+    """Text a translator should leave alone: URLs, IDs, dates, English, ..."""
+    n = rng.randrange(1, 10000)
+    return rng.choice([
+        f"https://example.com/docs/{n}",
+        f"user{n}@example.com",
+        f"C:\\data\\report_{n}.xlsx",
+        f"2024/{n % 12 + 1}/{n % 28 + 1}",
+        f"v{n % 10}.{n % 7}.{n % 13}",
+        f"{n:08x}",
+        f"PN-{n:05d}-A",
+        rng.choice(["Total", "Status", "Remarks", "Sales amount", "OK", "N/A", "Customer name"]),
+    ])
+
+
+class TextSource:
+    """Produce texts of which roughly ``repeat`` are repetitions from a pool"""
+
+    def __init__(self, rng, repeat, min_length, max_length, pool_size=50, skippable=0.0, templated=0.0):
+        self.rng = rng
+        self.repeat = repeat
+        self.skippable = skippable
+        self.templated = templated
+        self.min_length = min_length
+        self.max_length = max_length
+        self.pool = [random_text(rng, min_length, max_length) for _ in range(pool_size)]
+
+    def __call__(self):
+        if self.skippable and self.rng.random() < self.skippable:
+            return skippable_text(self.rng)
+        if self.templated and self.rng.random() < self.templated:
+            # Step lists and log lines that differ only in a number or code
+            n = self.rng.randrange(1, 1000)
+            return self.rng.choice([f"手順{n}を実行", f"ERR-{n:04d} 接続失敗", f"{self.pool[n % 5]} {n}件"])
+        if self.rng.random() < self.repeat:
+            return self.rng.choice(self.pool)
+        return random_text(self.rng, self.min_length, self.max_length)
+
+
+def sheet_xml(rows, cols, rng, texts, shared, with_drawing):
+    """Worksheet XML; shared string indices are allocated in ``shared``"""
+    lines = [f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+             f'<worksheet xmlns="{NS_MAIN}" xmlns:r="{NS_REL}"><sheetData>']
+    for row in range(1, rows + 1):
+        cells = []
+        for column in range(1, cols + 1):
+            ref = f"{column_letter(column)}{row}"
+            kind = rng.random()
+            if kind < 0.6:
+                index = shared.setdefault(texts(), len(shared))
+                cells.append(f'<c r="{ref}" t="s"><v>{index}</v></c>')
+            elif kind < 0.8:
+                cells.append(f'<c r="{ref}"><v>{rng.randrange(100000)}</v></c>')
+            elif kind < 0.9 and column > 2:
+                cells.append(f'<c r="{ref}"><f>SUM(A{row}:B{row})</f><v>0</v></c>')
+        lines.append(f'<row r="{row}">{"".join(cells)}</row>')
+    lines.append('</sheetData>')
+    if with_drawing:
+        lines.append('<drawing r:id="rId1"/>')
+    lines.append('</worksheet>')
+    return "".join(lines)
+
+
+def drawing_xml(shapes, texts):
+    """Drawing part with ``shapes`` text boxes"""
+    anchors = []
+    for i in range(shapes):
+        anchors.append(
+            f'<xdr:twoCellAnchor><xdr:from><xdr:col>{i}</xdr:col><xdr:colOff>0</xdr:colOff><xdr:row>{i}</xdr:row><xdr:rowOff>0</xdr:rowOff></xdr:from>'
+            f'<xdr:to><xdr:col>{i + 2}</xdr:col><xdr:colOff>0</xdr:colOff><xdr:row>{i + 2}</xdr:row><xdr:rowOff>0</xdr:rowOff></xdr:to>'
+            f'<xdr:sp macro="" textlink=""><xdr:nvSpPr><xdr:cNvPr id="{i + 2}" name="TextBox {i + 1}"/><xdr:cNvSpPr txBox="1"/></xdr:nvSpPr>'
+            f'<xdr:spPr><a:prstGeom prst="rect"><a:avLst/></a:prstGeom></xdr:spPr>'
+            f'<xdr:txBody><a:bodyPr/><a:lstStyle/><a:p><a:r><a:t>{escape(texts())}</a:t></a:r></a:p></xdr:txBody></xdr:sp>'
+            f'<xdr:clientData/></xdr:twoCellAnchor>'
+        )
+    return (f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            f'<xdr:wsDr xmlns:xdr="{NS_XDR}" xmlns:a="{NS_A}">{"".join(anchors)}</xdr:wsDr>')
+
+
+def make_workbook(path, sheets=3, rows=1000, cols=8, repeat=0.5, min_length=4, max_length=30, shapes=0, skippable=0.0,
+                  templated=0.0, seed=0):
+    """Write one synthetic workbook and return its number of distinct cell texts"""
+    rng = random.Random(seed)
+    texts = TextSource(rng, repeat, min_length, max_length, skippable=skippable, templated=templated)
+    shared = {}  # text -> shared string index
+
+    parts = {}
+    for n in range(1, sheets + 1):
+        parts[f"xl/worksheets/sheet{n}.xml"] = sheet_xml(rows, cols, rng, texts, shared, shapes > 0)
+        if shapes:
+            parts[f"xl/worksheets/_rels/sheet{n}.xml.rels"] = (
+                f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<Relationships xmlns="{NS_PKG_REL}">'
+                f'<Relationship Id="rId1" Type="{REL_TYPE}drawing" Target="../drawings/drawing{n}.xml"/></Relationships>')
+            parts[f"xl/drawings/drawing{n}.xml"] = drawing_xml(shapes, texts)
+
+    strings = "".join(f"<si><t>{escape(text)}</t></si>" for text in shared)
+    parts["xl/sharedStrings.xml"] = (f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                                     f'<sst xmlns="{NS_MAIN}" count="{len(shared)}" uniqueCount="{len(shared)}">{strings}</sst>')
+    parts["xl/workbook.xml"] = (
+        f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<workbook xmlns="{NS_MAIN}" xmlns:r="{NS_REL}"><sheets>'
+        + "".join(f'<sheet name="Sheet{n}" sheetId="{n}" r:id="rId{n}"/>' for n in range(1, sheets + 1))
+        + '</sheets></workbook>')
+    parts["xl/_rels/workbook.xml.rels"] = (
+        f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<Relationships xmlns="{NS_PKG_REL}">'
+        + "".join(f'<Relationship Id="rId{n}" Type="{REL_TYPE}worksheet" Target="worksheets/sheet{n}.xml"/>'
+                  for n in range(1, sheets + 1))
+        + f'<Relationship Id="rId{sheets + 1}" Type="{REL_TYPE}sharedStrings" Target="sharedStrings.xml"/>'
+        + '</Relationships>')
+    parts["_rels/.rels"] = (
+        f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<Relationships xmlns="{NS_PKG_REL}">'
+        f'<Relationship Id="rId1" Type="{REL_TYPE}officeDocument" Target="xl/workbook.xml"/></Relationships>')
+
+    content_type = "application/vnd.openxmlformats-officedocument"
+    overrides = [f'<Override PartName="/xl/workbook.xml" ContentType="{content_type}.spreadsheetml.sheet.main+xml"/>',
+                 f'<Override PartName="/xl/sharedStrings.xml" ContentType="{content_type}.spreadsheetml.sharedStrings+xml"/>']
+    for n in range(1, sheets + 1):
+        overrides.append(f'<Override PartName="/xl/worksheets/sheet{n}.xml" ContentType="{content_type}.spreadsheetml.worksheet+xml"/>')
+        if shapes:
+            overrides.append(f'<Override PartName="/xl/drawings/drawing{n}.xml" ContentType="{content_type}.drawing+xml"/>')
+    parts["[Content_Types].xml"] = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        f'<Default Extension="rels" ContentType="{content_type}.package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        + "".join(overrides) + '</Types>')
+
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as package:
+        package.writestr("[Content_Types].xml", parts.pop("[Content_Types].xml"))
+        for name, data in parts.items():
+            package.writestr(name, data)
+    return len(shared)
+
+
+def make_workbooks(out_dir, files=1, seed=0, **options):
+    """Write ``files`` workbooks into ``out_dir`` and return their paths"""
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for i in range(files):
+        path = os.path.join(out_dir, f"bench{i + 1}.xlsx")
+        make_workbook(path, seed=seed + i, **options)
+        paths.append(path)
+    return paths
+
+
+def add_arguments(parser):
+    parser.add_argument('--files', type=int, default=1, help='Number of workbooks (default: 1)')
+    parser.add_argument('--sheets', type=int, default=3, help='Sheets per workbook (default: 3)')
+    parser.add_argument('--rows', type=int, default=1000, help='Rows per sheet (default: 1000)')
+    parser.add_argument('--cols', type=int, default=8, help='Columns per sheet (default: 8)')
+    parser.add_argument('--repeat', type=float, default=0.5,
+                        help='Share of texts repeated from a pool of 50 strings (default: 0.5)')
+    parser.add_argument('--min-length', type=int, default=4, help='Minimum text length in characters (default: 4)')
+    parser.add_argument('--max-length', type=int, default=30, help='Maximum text length in characters (default: 30)')
+    parser.add_argument('--shapes', type=int, default=0, help='Text boxes per sheet (default: 0)')
+    parser.add_argument('--skippable', type=float, default=0.0,
+                        help='Share of texts that need no translation, e.g. URLs, IDs, dates and English (default: 0)')
+    parser.add_argument('--templated', type=float, default=0.0,
+                        help='Share of texts that differ only in a number or code, e.g. "手順12を実行" (default: 0)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+
+
+def workbook_options(args):
+    return dict(sheets=args.sheets, rows=args.rows, cols=args.cols, repeat=args.repeat,
+                min_length=args.min_length, max_length=args.max_length, shapes=args.shapes, skippable=args.skippable,
+                templated=args.templated)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--out', default='bench_input', help='Output directory (default: bench_input)')
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    for path in make_workbooks(args.out, args.files, args.seed, **workbook_options(args)):
+        print(f"Wrote {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""Local mock of an OpenAI-compatible chat completions endpoint.
+
+"Translates" every segment of a request by tagging it with the target
+language, so replies keep the structure of all wire formats (separator,
+numbered and json).  Latency, error rate, output speed and delimiter damage
+can be configured to see how the client copes, and ``--slots`` limits how
+many requests the server works on at once, like an inference box.  Like a
+server with prefix caching, it reports the prompt tokens shared with one of
+the recent requests as cached:
+
+    python benchmark/mock_llm.py --port 8000 --latency 0.5 --tokens-per-second 200 --error-rate 0.02 --break-rate 0.05 --slots 4
+
+Then point the translator at it with LLM_API_URL=http://127.0.0.1:8000/v1/.
+``GET /stats`` returns the counters of the server (requests, errors, tokens).
+"""
+import argparse
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SEPARATOR = "¦¦¦"
+NUMBERED_LINE = re.compile(r'^\s*\[(\d+)\]\s?(.*)$')
+TARGET = re.compile(r' to (\w+)')
+RECENT_PROMPTS = 16  # Prompts kept for the simulated prefix cache
+
+
+def estimate_tokens(text):
+    """Same rough estimate the translator uses: ~4 characters per token"""
+    return max(1, len(text) // 4)
+
+
+def fake_translate(payload, target, rng, break_rate, json_object=False):
+    """Tag every segment of a payload with the target language"""
+    tag = f"[{target}] "
+    if json_object:
+        try:
+            segments = json.loads(payload)
+        except ValueError:
+            return tag + payload
+        return json.dumps({key: tag + value for key, value in segments.items()}, ensure_ascii=False)
+
+    lines = payload.split("\n")
+    if NUMBERED_LINE.match(lines[0]):
+        return "\n".join(NUMBERED_LINE.sub(lambda m: f"[{m.group(1)}] {tag}{m.group(2)}", line) for line in lines)
+
+    parts = [tag + part for part in payload.split(SEPARATOR)]
+    reply = SEPARATOR.join(parts)
+    if len(parts) > 1 and rng.random() < break_rate:
+        # Drop one delimiter, like a model merging two segments
+        reply = reply.replace(SEPARATOR, " ", 1)
+    return reply
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0, error_rate=0.0, tokens_per_second=0.0, break_rate=0.0, seed=0, slots=0):
+        super().__init__(address, MockHandler)
+        self.slots = threading.Semaphore(slots) if slots else None  # Requests served at once, the rest queue
+        self.latency = latency
+        self.error_rate = error_rate
+        self.tokens_per_second = tokens_per_second
+        self.break_rate = break_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.recent_prompts = []
+        self.stats = {"requests": 0, "errors": 0, "broken": 0, "in_flight": 0, "max_in_flight": 0,
+                      "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0}
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1/"
+
+    def count(self, **changes):
+        with self.lock:
+            for key, value in changes.items():
+                self.stats[key] += value
+            self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self.stats["in_flight"])
+
+    def cached_prefix(self, prompt):
+        """Length of the longest prefix ``prompt`` shares with a recent prompt"""
+        with self.lock:
+            shared = max((len(os.path.commonprefix([prompt, recent])) for recent in self.recent_prompts), default=0)
+            self.recent_prompts = (self.recent_prompts + [prompt])[-RECENT_PROMPTS:]
+        return shared
+
+    def start(self):
+        """Serve in a background thread and return the server"""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/stats"):
+            with self.server.lock:
+                self._send(200, dict(self.server.stats))
+        else:
+            self._send(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        messages = body.get("messages", [])
+        user = messages[-1]["content"] if messages else ""
+        instruction, _, payload = user.partition(":\n\n")
+        match = TARGET.search(instruction)
+        target = match.group(1)[:2].lower() if match else "xx"
+
+        if server.slots:
+            server.slots.acquire()
+        server.count(requests=1, in_flight=1)
+        try:
+            with server.lock:
+                failed = server.rng.random() < server.error_rate
+                rng = random.Random(server.rng.random())
+            time.sleep(server.latency)
+            if failed:
+                server.count(errors=1)
+                self._send(500, {"error": {"message": "mock server error", "type": "server_error"}})
+                return
+
+            # A separator payload can start with "{" too, e.g. a "{1} ..." template
+            reply = fake_translate(payload, target, rng, server.break_rate, "JSON object" in instruction)
+            if reply.count(SEPARATOR) < payload.count(SEPARATOR):
+                server.count(broken=1)
+            prompt_tokens = sum(estimate_tokens(message.get("content", "")) for message in messages)
+            shared = server.cached_prefix("".join(message.get("content", "") for message in messages))
+            cached_tokens = min(shared // 4, prompt_tokens)
+            completion_tokens = estimate_tokens(reply)
+            server.count(prompt_tokens=prompt_tokens, cached_tokens=cached_tokens, completion_tokens=completion_tokens)
+            usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                     "total_tokens": prompt_tokens + completion_tokens,
+                     "prompt_tokens_details": {"cached_tokens": cached_tokens}}
+
+            if body.get("stream"):
+                self._stream(body, reply, completion_tokens, usage)
+            else:
+                if server.tokens_per_second:
+                    time.sleep(completion_tokens / server.tokens_per_second)
+                self._send(200, {
+                    "id": "mock", "object": "chat.completion", "created": int(time.time()), "model": body.get("model"),
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+                    "usage": usage,
+                })
+        finally:
+            server.count(in_flight=-1)
+            if server.slots:
+                server.slots.release()
+
+    def _stream(self, body, reply, completion_tokens, usage):
+        """Send the reply as server-sent events, paced at the token throughput"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        chunk_size = 16
+        delay = chunk_size / 4 / self.server.tokens_per_second if self.server.tokens_per_second else 0
+        for start in range(0, len(reply), chunk_size):
+            time.sleep(delay)
+            self._event({"id": "mock", "object": "chat.completion.chunk", "created": int(time.time()),
+                         "model": body.get("model"),
+                         "choices": [{"index": 0, "delta": {"content": reply[start:start + chunk_size]}, "finish_reason": None}]})
+        final = {"id": "mock", "object": "chat.completion.chunk", "created": int(time.time()), "model": body.get("model"),
+                 "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+        if body.get("stream_options", {}).get("include_usage"):
+            final["usage"] = usage
+        self._event(final)
+        self._chunk(b"data: [DONE]\n\n")
+        self._chunk(b"")
+
+    def _event(self, data):
+        self._chunk(f"data: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8"))
+
+    def _chunk(self, data):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def _send(self, status, data):
+        payload = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def add_arguments(parser):
+    parser.add_argument('--latency', type=float, default=0.2, help='Seconds before each reply starts (default: 0.2)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of requests answered with HTTP 500 (default: 0)')
+    parser.add_argument('--tokens-per-second', type=float, default=0.0,
+                        help='Output speed of each reply in tokens per second, 0 = instant (default: 0)')
+    parser.add_argument('--break-rate', type=float, default=0.0,
+                        help=f'Share of separator replies with one "{SEPARATOR}" dropped (default: 0)')
+    parser.add_argument('--slots', type=int, default=0,
+                        help='Requests the server works on at once, the others wait, 0 = unlimited (default: 0)')
+
+
+def server_options(args):
+    return dict(latency=args.latency, error_rate=args.error_rate,
+                tokens_per_second=args.tokens_per_second, break_rate=args.break_rate, slots=args.slots)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8000, help='Port to listen on (default: 8000)')
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    server = MockServer((args.host, args.port), **server_options(args))
+    print(f"Mock LLM listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(json.dumps(server.stats))
+
+
+if __name__ == "__main__":
+    main()
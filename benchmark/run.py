@@ -0,0 +1,269 @@
+"""End-to-end throughput benchmark that runs offline.
+
+Generates synthetic workbooks, starts the mock LLM server in-process, runs
+them through the translator and reports segments per second, LLM calls,
+tokens and the time spent in each stage:
+
+    python benchmark/run.py --files 4 --rows 2000 --latency 0.3 --concurrency 8
+    python benchmark/run.py --files 8 --workers 4 --break-rate 0.1 --protocol numbered
+    python benchmark/run.py --files 1 --sheets 1 --rows 50000 --pipeline-rows 2000 --memory
+    python benchmark/run.py --files 2 --slots 2 --concurrency 6 --endpoints 3 --down-endpoints 1
+    python benchmark/run.py --files 2 --glossary 2000
+
+Files are processed one by one with process_excel, which gives the per-stage
+breakdown; with --workers the whole directory goes through process_directory
+and only totals are reported.  The translation cache is disabled so every
+run does the same work.
+"""
+import argparse
+import contextlib
+import csv
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+import urllib.request
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import make_workbooks  # noqa: E402
+import mock_llm  # noqa: E402
+
+STAGES = ("open", "extract", "translate", "write", "save", "close")
+WORKBOOK_STAGES = [stage for stage in STAGES if stage != "translate"]
+
+
+class TimedBackend:
+    """Wrap a workbook backend and add the time spent in each call to ``times``"""
+
+    def __init__(self, backend, times):
+        self.backend = backend
+        self.times = times
+        self.name = backend.name
+        self.extensions = backend.extensions
+
+    def open(self, path):
+        start_time = time.perf_counter()
+        wb = self.backend.open(path)
+        self.times["open"] += time.perf_counter() - start_time
+        return TimedWorkbook(wb, self.times)
+
+    def close(self):
+        self.backend.close()
+
+
+class TimedWorkbook:
+    def __init__(self, wb, times):
+        self.wb = wb
+        self.times = times
+
+    def sections(self, chunk_rows=None):
+        sections = iter(self.wb.sections(chunk_rows))
+        while True:
+            start_time = time.perf_counter()
+            section = next(sections, None)
+            self.times["extract"] += time.perf_counter() - start_time
+            if section is None:
+                return
+            yield section
+
+    def _timed(self, stage, method, *args):
+        start_time = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            self.times[stage] += time.perf_counter() - start_time
+
+    def fork(self):
+        return TimedWorkbook(self._timed("open", self.wb.fork), self.times)
+
+    def write(self, ref, text):
+        return self._timed("write", self.wb.write, ref, text)
+
+    def flush(self, release=False):
+        return self._timed("write", self.wb.flush, release)
+
+    def describe(self, ref):
+        return self.wb.describe(ref)
+
+    def save(self, path):
+        return self._timed("save", self.wb.save, path)
+
+    def close(self):
+        return self._timed("close", self.wb.close)
+
+
+def make_glossary(path, terms, seed=0):
+    """Write a ja,en glossary of random kanji compounds, some of which occur in the workbooks"""
+    rng = random.Random(seed)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["ja", "en"])
+        for n in range(terms):
+            writer.writerow(["".join(rng.choice(make_workbooks.KANJI) for _ in range(rng.randint(2, 4))), f"term{n}"])
+    return path
+
+
+def configure(args, servers, glossary=None):
+    """Point the translator at the mock servers; main reads these on import"""
+    os.environ.update({
+        "LLM_API_URL": servers[0].url,
+        "LLM_API_KEY": "benchmark",
+        "LLM_MODEL_NAME": "mock",
+        "LLM_RPM": str(args.rpm),
+        "LLM_CONCURRENCY": str(args.concurrency),
+        "LLM_BATCH_TOKENS": str(args.batch_tokens),
+        "LLM_PROTOCOL": args.protocol,
+        "TRANSLATION_CACHE": "off",
+        "WORKBOOK_BACKEND": args.backend,
+        "PIPELINE_ROWS": str(args.pipeline_rows),
+    })
+    os.environ.pop("LLM_MODEL_SUFFIX", None)
+    if glossary:
+        os.environ["GLOSSARY"] = glossary
+    else:
+        os.environ.pop("GLOSSARY", None)
+    if len(servers) > 1:
+        os.environ["LLM_ENDPOINTS"] = json.dumps([{"url": server.url, "name": f"mock{n + 1}"}
+                                                  for n, server in enumerate(servers)])
+    else:
+        os.environ.pop("LLM_ENDPOINTS", None)
+
+
+def run_files(main, paths, output_dir, target_langs):
+    """Translate files one by one and return the time per stage"""
+    times = Counter()
+    translations = {}
+    backend = TimedBackend(main.create_backend(), times)
+    try:
+        for path in paths:
+            workbook_time = sum(times[stage] for stage in WORKBOOK_STAGES)
+            start_time = time.perf_counter()
+            main.process_excel(path, output_dir, "ja", target_langs, backend=backend, translations=translations)
+            elapsed = time.perf_counter() - start_time
+            # Whatever is not spent in the workbook is spent translating
+            times["translate"] += elapsed - (sum(times[stage] for stage in WORKBOOK_STAGES) - workbook_time)
+    finally:
+        backend.close()
+    return times
+
+
+def server_stats(servers):
+    """Counters of each mock server, and their totals"""
+    per_server = []
+    for server in servers:
+        with urllib.request.urlopen(server.url + "stats") as response:
+            per_server.append(json.load(response))
+    return {key: sum(stats[key] for stats in per_server) for key in per_server[0]}, per_server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    make_workbooks.add_arguments(parser)
+    mock_llm.add_arguments(parser)
+    parser.add_argument('--to', dest='target_langs', default='en', help='Target languages, e.g. en,vi (default: en)')
+    parser.add_argument('--backend', default='xlsx', choices=['xlsx', 'excel'], help='Workbook backend (default: xlsx)')
+    parser.add_argument('--workers', type=int, default=1, help='Run process_directory with this many workers (default: 1)')
+    parser.add_argument('--concurrency', type=int, default=4, help='LLM_CONCURRENCY (default: 4)')
+    parser.add_argument('--rpm', type=float, default=0, help='LLM_RPM, 0 = unlimited (default: 0)')
+    parser.add_argument('--batch-tokens', type=int, default=2000, help='LLM_BATCH_TOKENS (default: 2000)')
+    parser.add_argument('--protocol', default='separator', choices=['separator', 'numbered', 'json'],
+                        help='LLM_PROTOCOL (default: separator)')
+    parser.add_argument('--endpoints', type=int, default=1, help='Mock servers in the LLM_ENDPOINTS pool (default: 1)')
+    parser.add_argument('--down-endpoints', type=int, default=0, help='How many of them fail every request (default: 0)')
+    parser.add_argument('--glossary', type=int, default=0, help='Terms in a generated GLOSSARY, 0 = none (default: 0)')
+    parser.add_argument('--pipeline-rows', type=int, default=0, help='PIPELINE_ROWS, 0 = off (default: 0)')
+    parser.add_argument('--memory', action='store_true', help='Trace the peak memory allocated by Python (slows the run down)')
+    parser.add_argument('--keep', action='store_true', help='Keep the generated and translated workbooks')
+    parser.add_argument('--verbose', action='store_true', help='Show the output of the translator')
+    args = parser.parse_args()
+
+    servers = []
+    for n in range(max(1, args.endpoints)):
+        options = mock_llm.server_options(args)
+        if n >= max(1, args.endpoints) - args.down_endpoints:
+            options["error_rate"] = 1.0
+        servers.append(mock_llm.MockServer(("127.0.0.1", 0), seed=n, **options).start())
+    work_dir = tempfile.mkdtemp(prefix="excel-translator-bench-")
+    glossary = make_glossary(os.path.join(work_dir, "glossary.csv"), args.glossary, args.seed) if args.glossary else None
+    configure(args, servers, glossary)
+    import main as translator
+
+    input_dir = os.path.join(work_dir, "input")
+    output_dir = os.path.join(work_dir, "output")
+    paths = make_workbooks.make_workbooks(input_dir, args.files, args.seed, **make_workbooks.workbook_options(args))
+    target_langs = [code.strip() for code in args.target_langs.split(",") if code.strip()]
+
+    log = None if args.verbose else open(os.devnull, "w", encoding="utf-8")
+    if args.memory:
+        tracemalloc.start()
+    start_time = time.perf_counter()
+    with contextlib.redirect_stdout(log) if log else contextlib.nullcontext():
+        if args.workers > 1:
+            times = None
+            translator.process_directory(input_dir, output_dir, "ja", target_langs, workers=args.workers, force=True)
+        else:
+            translator.run_stats.clear()
+            times = run_files(translator, paths, output_dir, target_langs)
+    elapsed = time.perf_counter() - start_time
+    if args.memory:
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    stats = translator.run_stats
+    calls = translator.metrics.run_metrics.summary()["llm_calls"]
+    mock, per_server = server_stats(servers)
+    for server in servers:
+        server.shutdown()
+
+    print(f"Workbooks: {args.files} x {args.sheets} sheets x {args.rows} rows x {args.cols} columns "
+          f"(repeat {args.repeat:.0%}, {args.skippable:.0%} skippable, {args.templated:.0%} templated, {args.shapes} shapes per sheet), backend {args.backend}")
+    print(f"Mock LLM: latency {args.latency}s, {args.tokens_per_second or 'unlimited'} tokens/s, "
+          f"error rate {args.error_rate:.0%}, break rate {args.break_rate:.0%}, {args.slots or 'unlimited'} slots, "
+          f"{len(servers)} endpoints ({args.down_endpoints} down)")
+    print(f"Settings: protocol {args.protocol}, concurrency {args.concurrency}, batch tokens {args.batch_tokens}, "
+          f"workers {args.workers}, pipeline rows {args.pipeline_rows or 'off'}, glossary {args.glossary or 'off'}, "
+          f"languages {', '.join(target_langs)}\n")
+
+    print(f"Total time:        {elapsed:9.2f} s")
+    print(f"Segments:          {stats['segments']:9d} ({stats['unique_segments']} sent to the LLM)")
+    print(f"Segments/sec:      {stats['segments'] / elapsed:9.1f}")
+    print(f"Skipped:           {sum(count for key, count in stats.items() if key.startswith('skipped_')):9d} segments "
+          f"that need no translation")
+    print(f"Templates:         {stats['templates']:9d} ({stats['templated_segments']} segments, "
+          f"{stats['template_fallbacks']} translated one by one)")
+    print(f"LLM calls:         {stats['llm_calls']:9d} ({mock['requests']} received, {mock['errors']} errors, "
+          f"{mock['broken']} broken replies, max {mock['max_in_flight']} in flight)")
+    if len(servers) > 1:
+        print(f"Endpoints:         {' / '.join(str(server['requests'] - server['errors']) for server in per_server)} "
+              f"answered, {stats['endpoint_retries']} retried elsewhere, {stats['endpoint_ejections']} ejections")
+    print(f"Re-dispatched:     {stats['redispatched_segments']:9d} segments")
+    print(f"Failed:            {stats['failed_segments']:9d} segments")
+    if args.memory:
+        print(f"Peak memory:       {peak_memory / 2**20:9.1f} MiB allocated by Python")
+    print(f"Tokens:            {mock['prompt_tokens'] + mock['completion_tokens']:9d} "
+          f"({mock['prompt_tokens']} prompt of which {mock['cached_tokens']} cached, {mock['completion_tokens']} completion)")
+    print(f"Prompt/request:    {mock['prompt_tokens'] / max(mock['requests'] - mock['errors'], 1):9.1f} tokens")
+    if args.glossary:
+        print(f"Glossary terms:    {int(calls.get('glossary_terms', 0)):9d} sent in {int(calls.get('glossary_requests', 0))} requests "
+              f"(~{int(calls.get('glossary_tokens', 0))} tokens, the whole glossary is "
+              f"~{translator.estimate_tokens(whole.prompt(whole.entries)) if (whole := translator.get_glossary('ja', 'en')) else 0} tokens)")
+    if times:
+        print("\nTime per stage:")
+        for stage in STAGES:
+            print(f"   {stage:<10} {times[stage]:9.3f} s  {times[stage] / elapsed:6.1%}")
+
+    if args.keep:
+        print(f"\nWorkbooks kept in {work_dir}")
+    else:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Checkpoint journal and output manifest for resumable runs.
+
+The journal of a job (one input file translated with one language pair,
+model and prompt) records every translated batch as soon as it completes,
+so a rerun after a crash or an endpoint restart only translates what is
+missing.  It is deleted once the output file has been saved.
+
+The manifest lists the output files of completed jobs with their key (the
+input's content hash and the translation context), so unchanged workbooks
+are skipped on the next run.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+CHUNK_SIZE = 1 << 20
+
+
+def file_hash(path):
+    """SHA-256 of a file's content"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def job_key(input_hash, context):
+    """Key of a job: input content plus languages, model and prompt"""
+    return hashlib.sha256(f"{input_hash}:{context}".encode("utf-8")).hexdigest()
+
+
+def segment_id(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+class Journal:
+    """Append-only JSON lines file of the translated segments of one job"""
+
+    def __init__(self, path):
+        self.path = path
+        self.segments = {}  # segment id -> translation
+        self.file = None
+        self.lock = threading.Lock()  # Batches of a pipelined file complete on several threads
+        if os.path.exists(path):
+            with open(path, "rb+") as f:
+                data = f.read()
+                # A crash can leave the last line half written: cut it off so
+                # the batches recorded from now on start on a line of their own
+                complete = data.rfind(b"\n") + 1
+                if complete < len(data):
+                    f.truncate(complete)
+            for line in data[:complete].splitlines():
+                try:
+                    self.segments.update(json.loads(line)["segments"])
+                except (ValueError, KeyError, TypeError):
+                    continue  # Skip a damaged line, the batches after it are still good
+
+    def __len__(self):
+        return len(self.segments)
+
+    def lookup(self, texts):
+        """Return {text: translation} for the texts already in the journal"""
+        found = {}
+        for text in texts:
+            translation = self.segments.get(segment_id(text))
+            if translation is not None:
+                found[text] = translation
+        return found
+
+    def record(self, translations):
+        """Append a completed batch of {text: translation} and flush it to disk"""
+        if not translations:
+            return
+        segments = {segment_id(text): translation for text, translation in translations.items()}
+        with self.lock:
+            self.segments.update(segments)
+            if self.file is None:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                self.file = open(self.path, "a", encoding="utf-8")
+            self.file.write(json.dumps({"time": time.time(), "segments": segments}, ensure_ascii=False) + "\n")
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def discard(self):
+        """Delete the journal once its job is complete"""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class Manifest:
+    """Completed jobs of an output directory: {output file name: job details}"""
+
+    def __init__(self, path):
+        self.path = path
+        self.jobs = {}
+        if os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self.jobs = json.load(f)
+            except ValueError:
+                self.jobs = {}
+
+    def completed(self, key, output_path):
+        """Whether ``output_path`` exists and was written by the job ``key``"""
+        job = self.jobs.get(os.path.basename(output_path))
+        return bool(job) and job["key"] == key and os.path.exists(output_path)
+
+    def record(self, key, input_path, output_path):
+        self.jobs[os.path.basename(output_path)] = {
+            "key": key,
+            "input": os.path.basename(input_path),
+            "completed": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self.jobs, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.path)
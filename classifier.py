@@ -0,0 +1,108 @@
+"""Decide which texts need no translation before they reach the LLM.
+
+All skip rules (numbers, formulas, URLs, e-mail addresses, paths, dates,
+versions, hex IDs, part numbers, ...) are alternatives of one compiled
+regex, so each text is matched once and ``lastgroup`` names the rule.
+Texts that pass are checked for the script of the source language: a
+ja->en sheet often contains English cells already, which have no kana or
+kanji at all.
+
+    classifier = Classifier("ja")
+    classifier.classify(["売上", "https://example.com", "Total", "v1.2.3"])
+    -> [None, "url", "other_script", "version"]
+"""
+import re
+
+# Each rule matches the whole (whitespace-normalized) text; the first rule
+# that matches names the reason, so specific rules come before "number"
+RULES = {
+    "short": r".",
+    "formula": r"=.*",
+    "url": r"(?:https?|ftp)://\S+|www\.\S+",
+    "email": r"(?:mailto:)?[A-Za-z0-9._%+\-]+@[A-Za-z0-9\-]+(?:\.[A-Za-z0-9\-]+)+",
+    "path": (r"[A-Za-z]:[\\/].*"                                        # C:\dir\file.txt
+             r"|\\\\[^\s\\]+\\.*"                                       # \\server\share
+             r"|~?/[A-Za-z0-9_.\-]+(?:/[A-Za-z0-9_.\-]+)*/?"            # /usr/local/bin
+             r"|(?:[A-Za-z0-9_.\-]+[\\/])*[A-Za-z0-9_.\-]+\.(?i:xlsx|xlsm|xls|csv|txt|pdf|docx?|pptx?|json|xml|ya?ml"
+             r"|html?|png|jpe?g|gif|svg|zip|exe|dll|py|js|java|cs|sql|log|ini|cfg|bat|sh)"),
+    "date": (r"(?:\d{4}[\-/.]\d{1,2}[\-/.]\d{1,2}|\d{1,2}[\-/.]\d{1,2}[\-/.]\d{2,4}|\d{1,2}/\d{1,2})"
+             r"(?:[ T]\d{1,2}:\d{2}(?::\d{2})?)?"
+             r"|\d{1,2}:\d{2}(?::\d{2})?(?:\s?[AaPp][Mm])?"),
+    "version": r"[Vv](?:er)?\.?\s?\d+(?:\.\d+)*(?:[\-+][0-9A-Za-z.]+)?|\d+(?:\.\d+){2,3}(?:[\-+][0-9A-Za-z.]+)?",
+    "hex": (r"0[xX][0-9A-Fa-f]+"
+            r"|[0-9A-Fa-f]{8}-[0-9A-Fa-f]{4}-[0-9A-Fa-f]{4}-[0-9A-Fa-f]{4}-[0-9A-Fa-f]{12}"
+            r"|(?=[0-9A-Fa-f]*\d)(?=[0-9A-Fa-f]*[A-Fa-f])[0-9A-Fa-f]{6,}"),
+    "part_number": r"(?=[A-Z0-9\-_/.#]*\d)(?=[A-Z0-9\-_/.#]*[A-Z])[A-Z0-9]+(?:[\-_/.#][A-Z0-9]+)+|[A-Z]+\d+[A-Z]*",
+    "number": r"[\d\s,.%+\-]+",
+    "symbols": r"[\W_]+",
+}
+
+# Letters of each script, as regex character class ranges
+SCRIPTS = {
+    "latin": "A-Za-z\u00C0-\u024F\u1E00-\u1EFF",
+    "kana": "\u3040-\u30FF\u31F0-\u31FF\uFF66-\uFF9F",
+    "han": "\u3400-\u4DBF\u4E00-\u9FFF\uF900-\uFAFF",
+    "hangul": "\u1100-\u11FF\u3130-\u318F\uAC00-\uD7AF",
+    "cyrillic": "\u0400-\u04FF",
+    "arabic": "\u0600-\u06FF\u0750-\u077F",
+    "devanagari": "\u0900-\u097F",
+    "bengali": "\u0980-\u09FF",
+    "thai": "\u0E00-\u0E7F",
+}
+
+# Scripts in which each source language is written (Latin when not listed)
+LANGUAGE_SCRIPTS = {
+    "ja": ("kana", "han"),
+    "zh": ("han",),
+    "ko": ("hangul", "han"),
+    "ru": ("cyrillic",),
+    "uk": ("cyrillic",),
+    "ar": ("arabic",),
+    "hi": ("devanagari",),
+    "bn": ("bengali",),
+    "th": ("thai",),
+}
+
+LETTERS = re.compile(r"[^\W\d_]")
+
+
+def compile_rules(names=None):
+    """One regex with a named group per rule"""
+    names = [name for name in RULES if names is None or name in names]
+    if not names:
+        return None
+    return re.compile("|".join(f"(?P<{name}>{RULES[name]})" for name in names), re.DOTALL)
+
+
+class Classifier:
+    """Skip rules for one source language
+
+    ``rules`` limits the regex rules to those names. Texts in which at most
+    ``min_source_ratio`` of the letters belong to the source language's
+    script are skipped as "other_script": with the default of 0 only texts
+    without any letter of that script, None disables the check.
+    """
+
+    def __init__(self, source_lang=None, rules=None, min_source_ratio=0.0):
+        self.pattern = compile_rules(rules)
+        self.min_source_ratio = min_source_ratio
+        scripts = LANGUAGE_SCRIPTS.get(source_lang, ("latin",)) if source_lang else ()
+        self.source_letters = re.compile("[" + "".join(SCRIPTS[script] for script in scripts) + "]") if scripts else None
+
+    def reason(self, text):
+        """Name of the rule that skips ``text``, or None if it needs translation"""
+        if not text:
+            return "short"
+        if self.pattern is not None:
+            match = self.pattern.fullmatch(text)
+            if match:
+                return match.lastgroup
+        if self.source_letters is not None and self.min_source_ratio is not None:
+            letters = len(LETTERS.findall(text))
+            if letters and len(self.source_letters.findall(text)) <= letters * self.min_source_ratio:
+                return "other_script"
+        return None
+
+    def classify(self, texts):
+        """Skip reason (or None) for each text of a whole column or sheet"""
+        return list(map(self.reason, texts))
@@ -0,0 +1,151 @@
+"""Pool of OpenAI-compatible endpoints that share the translation requests.
+
+Each request goes to an endpoint picked at random, weighted by how fast it
+has answered lately (a rolling average of seconds per token) and by how
+many requests it is already serving, so faster and idle boxes get more of
+the work.  An endpoint that fails several requests in a row is ejected by a
+circuit breaker for a cooldown period; after that a single trial request
+decides whether it comes back.  When every endpoint is ejected the requests
+are sent anyway, as there is nowhere better to send them, and the first
+success brings its endpoint back.
+
+    LLM_ENDPOINTS='[{"url": "http://box1:8000/v1", "model": "qwen3"},
+                    {"url": "http://box2:8000/v1", "model": "qwen3", "api_key": "secret", "name": "box2"}]'
+
+Requests pick and release endpoints on the LLM event loop only, so that
+part needs no locks; the pool itself is created once by main.get_llm_pool,
+under a lock, as several threads may ask for it first.
+"""
+import json
+import random
+import time
+
+from openai import AsyncOpenAI
+
+
+class Endpoint:
+    """One OpenAI-compatible server, its client and its health"""
+
+    def __init__(self, url, api_key=None, model=None, name=None):
+        self.url = url
+        self.api_key = api_key
+        self.model = model
+        self.name = name or url
+        self.client = None
+        self.max_retries = None  # Retries of the client itself, None for the library default
+        self.in_flight = 0
+        self.cost = None  # Rolling average of seconds per token
+        self.failures = 0  # Failed requests in a row
+        self.open_until = 0.0  # Ejected by the circuit breaker until this time (monotonic)
+        self.trial = False  # The request that decides whether an ejected endpoint comes back is running
+
+    def get_client(self):
+        """Create the client on first use; it keeps its connections open for later requests"""
+        if self.client is None:
+            options = {} if self.max_retries is None else {"max_retries": self.max_retries}
+            self.client = AsyncOpenAI(base_url=self.url, api_key=self.api_key, **options)
+        return self.client
+
+
+class EndpointPool:
+    """Route requests over several endpoints, ejecting the ones that keep failing
+
+    ``max_failures`` failed requests in a row eject an endpoint for
+    ``cooldown`` seconds; ``smoothing`` is the weight of the newest latency
+    in the rolling average.
+    """
+
+    def __init__(self, endpoints, max_failures=3, cooldown=30.0, smoothing=0.3):
+        if not endpoints:
+            raise ValueError("No LLM endpoints configured")
+        self.endpoints = list(endpoints)
+        if len(self.endpoints) > 1:
+            # A failed request moves to another endpoint at once instead of
+            # being retried on the same one by the client
+            for endpoint in self.endpoints:
+                endpoint.max_retries = 0
+        self.max_failures = max(1, max_failures)
+        self.cooldown = cooldown
+        self.smoothing = smoothing
+
+    def models(self):
+        """Models served by the pool, for cache keys"""
+        return sorted({endpoint.model or "" for endpoint in self.endpoints})
+
+    def _usable(self, endpoint, now):
+        return endpoint.open_until <= now and not endpoint.trial
+
+    def _weight(self, endpoint):
+        """Higher for endpoints that have been fast and have few requests in flight"""
+        known = [other.cost for other in self.endpoints if other.cost is not None]
+        # An endpoint without a measurement yet is assumed to be average
+        cost = endpoint.cost if endpoint.cost is not None else (sum(known) / len(known) if known else 1.0)
+        return 1.0 / (max(cost, 1e-6) * (endpoint.in_flight + 1))
+
+    def acquire(self, exclude=()):
+        """Pick an endpoint for a request, preferring those not in ``exclude``
+
+        Call ``release`` with the outcome when the request is done.
+        """
+        now = time.monotonic()
+        usable = [endpoint for endpoint in self.endpoints if self._usable(endpoint, now)]
+        candidates = [endpoint for endpoint in usable if endpoint not in exclude] or usable
+        if candidates:
+            endpoint = random.choices(candidates, weights=[self._weight(c) for c in candidates])[0]
+            if endpoint.open_until:
+                endpoint.trial = True  # Half open: only this request until it succeeds or fails
+        else:
+            # Every endpoint is ejected
+            candidates = [endpoint for endpoint in self.endpoints if endpoint not in exclude] or self.endpoints
+            endpoint = min(candidates, key=lambda candidate: candidate.open_until)
+        endpoint.in_flight += 1
+        return endpoint
+
+    def release(self, endpoint, ok, latency=0.0, tokens=1):
+        """Record the outcome of a request (None if it was cancelled); returns
+        True if it ejected the endpoint"""
+        endpoint.in_flight -= 1
+        trial, endpoint.trial = endpoint.trial, False
+        if ok is None:
+            return False
+        if ok:
+            cost = latency / max(tokens, 1)
+            endpoint.cost = cost if endpoint.cost is None else (
+                self.smoothing * cost + (1 - self.smoothing) * endpoint.cost)
+            endpoint.failures = 0
+            endpoint.open_until = 0.0
+            return False
+        endpoint.failures += 1
+        if trial or endpoint.failures >= self.max_failures:
+            now = time.monotonic()
+            ejected = endpoint.open_until <= now or trial  # Not when it was already out
+            endpoint.open_until = now + self.cooldown
+            return ejected
+        return False
+
+    def status(self):
+        """State of every endpoint, e.g. for the service's /stats"""
+        now = time.monotonic()
+        return [{
+            "name": endpoint.name,
+            "model": endpoint.model,
+            "state": "ejected" if endpoint.open_until > now else ("trial" if endpoint.trial else "ok"),
+            "in_flight": endpoint.in_flight,
+            "seconds_per_token": endpoint.cost,
+            "failures_in_a_row": endpoint.failures,
+        } for endpoint in self.endpoints]
+
+
+def parse_endpoints(value, defaults=None):
+    """Endpoints from a JSON list of {"url", "api_key", "model", "name"} objects;
+    missing keys and models are taken from ``defaults``"""
+    defaults = defaults or {}
+    try:
+        entries = json.loads(value)
+    except ValueError as json_err:
+        raise ValueError(f"LLM_ENDPOINTS is not valid JSON: {json_err}") from json_err
+    if not isinstance(entries, list) or not all(isinstance(entry, dict) and entry.get("url") for entry in entries):
+        raise ValueError('LLM_ENDPOINTS must be a JSON list of {"url": ..., "api_key": ..., "model": ...} objects')
+    return [Endpoint(entry["url"], entry.get("api_key") or defaults.get("api_key"),
+                     entry.get("model") or defaults.get("model"), entry.get("name"))
+            for entry in entries]
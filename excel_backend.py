@@ -0,0 +1,419 @@
+"""Workbook backend that drives a hidden Excel instance through xlwings.
+
+Requires Microsoft Excel, so it only works on Windows or macOS.  Every call
+on a range or shape is a round trip to the Excel process, so cells are read
+with two bulk calls per sheet, or per block of rows for very large sheets
+(values and formulas of the used range), and translations are written back
+with a few rectangular 2D assignments per block that only take in empty and
+numeric cells besides the translated ones.  Shapes (also inside groups) are
+probed once while reading; write-back reuses the object and the access
+method the text was read with.
+
+The Excel application is created by ``app_factory``, which lets the backend
+run against an in-memory stand-in (see benchmark/fake_excel.py).
+"""
+import bisect
+import os
+import shutil
+import tempfile
+
+import metrics
+
+MSO_GROUP = 6  # Shape.Type of a group
+
+
+def _read_text_frame(shape):
+    text_frame = shape.TextFrame
+    return (text_frame.Characters().Text if text_frame.HasText else None), text_frame
+
+
+def _write_text_frame(text_frame, text):
+    text_frame.Characters().Text = text
+
+
+def _read_text_frame2(shape):
+    text_frame = shape.TextFrame2
+    return text_frame.TextRange.Text, text_frame
+
+
+def _write_text_frame2(text_frame, text):
+    text_frame.TextRange.Text = text
+
+
+def _write_alternative_text(shape, text):
+    shape.AlternativeText = text
+
+
+def _read_text_of(owner):
+    return owner.Text, owner
+
+
+def _write_text(owner, text):
+    owner.Text = text
+
+
+# Ways to reach the text of a shape, tried in this order:
+# name -> (read(shape) -> (text, owner), write(owner, text)).  The owner is
+# the object the text was read from and is kept for write-back; ranges such
+# as Characters() are fetched again on write, as they may not cover a
+# longer text.
+SHAPE_TEXT = {
+    "TextFrame": (_read_text_frame, _write_text_frame),
+    "TextFrame2": (_read_text_frame2, _write_text_frame2),
+    "AlternativeText": (lambda shape: (shape.AlternativeText, shape), _write_alternative_text),
+    "OLEFormat": (lambda shape: _read_text_of(shape.OLEFormat.Object), _write_text),  # OLE objects
+    "TextEffect": (lambda shape: _read_text_of(shape.TextEffect), _write_text),  # WordArt
+}
+
+
+def _shape_name(path):
+    """Shape path for log messages, e.g. "3" or "3 > 2" for an item of a group"""
+    return " > ".join(str(i) for i in path)
+
+
+def start_excel():
+    """Start a hidden Excel application"""
+    import xlwings as xw
+    return xw.App(visible=False)
+
+
+def column_letter(column):
+    """Excel column letters for a 1-based column number"""
+    letters = ""
+    while column:
+        column, remainder = divmod(column - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+class ExcelBackend:
+    """Open workbooks in a hidden Excel application"""
+
+    name = "excel"
+    extensions = (".xlsx", ".xlsm", ".xls")
+
+    def __init__(self, app_factory=None):
+        self.app_factory = app_factory or start_excel
+        self.app = None
+
+    def open(self, path):
+        """Open a workbook, starting Excel on first use"""
+        if self.app is None:
+            self.app = self.app_factory()
+        return ExcelWorkbook(self.app.books.open(path))
+
+    def close(self):
+        """Quit the Excel application if it is still running"""
+        if self.app is not None and self.app.pid:
+            self.app.quit()
+            print("🧊 Excel application closed.")
+        self.app = None
+
+
+class ExcelWorkbook:
+    """Cells and shapes of one workbook opened in Excel
+
+    References are compact tuples: ('cell', sheet index, row, column) and
+    ('shape', sheet index, shape path, access method), where the path is the
+    shape index followed by the indices within its groups.  Cell writes are buffered and applied
+    in bulk by ``flush``, which ``save`` calls.
+    """
+
+    def __init__(self, book, snapshots=None):
+        self.book = book
+        self.sheets = list(book.sheets)
+        self.owner = snapshots is None  # A fork shares the cells read by its owner
+        self.copy_dir = None  # Temporary directory of a fork's copy of the file
+        # sheet index -> {first row of a block: (first column, values, formulas)}
+        self.snapshots = {} if snapshots is None else snapshots
+        self.pending = {}  # sheet index -> {(row, column): text}
+        self.shapes = {}  # (sheet index, shape path) -> object holding the shape's text
+
+    def sections(self, chunk_rows=None):
+        """Yield (sheet name, [(text, reference), ...]) for every sheet
+
+        With ``chunk_rows`` the cells of a sheet are read and yielded in
+        blocks of that many rows, as several items with the same sheet name;
+        the shapes come with the last block.
+        """
+        for index, sheet in enumerate(self.sheets):
+            blocks = self._cell_blocks(index, sheet, chunk_rows)
+            segments = []
+            while True:
+                with metrics.stage("scan_cells", sheet=sheet.name):
+                    block = next(blocks, None)
+                if block is None:
+                    break
+                if segments:
+                    yield sheet.name, segments
+                segments = block
+            with metrics.stage("probe_shapes", sheet=sheet.name):
+                segments.extend(self._shape_segments(index, sheet))
+            yield sheet.name, segments
+
+    def _cell_blocks(self, index, sheet, chunk_rows=None):
+        """Read the used range with two bulk calls per block of rows and
+        yield the text constants of each block"""
+        used_rng = sheet.used_range
+        first_row, first_column = used_rng.row, used_rng.column
+        if chunk_rows:
+            row_count, column_count = used_rng.shape
+            last_row, last_column = first_row + row_count - 1, first_column + column_count - 1
+            ranges = ((top, sheet.range((top, first_column), (min(top + chunk_rows - 1, last_row), last_column)))
+                      for top in range(first_row, last_row + 1, chunk_rows))
+        else:
+            ranges = [(first_row, used_rng)]
+
+        empty = True
+        for top, rng in ranges:
+            values = rng.options(ndim=2).value
+            formulas = rng.formula
+            if not isinstance(formulas, (list, tuple)):
+                formulas = ((formulas,),)  # A single cell returns a plain string
+            if all(value is None for row in values for value in row):
+                continue
+            empty = False
+            self.snapshots.setdefault(index, {})[top] = (first_column, values, formulas)
+
+            segments = []
+            for r, (value_row, formula_row) in enumerate(zip(values, formulas)):
+                for c, (value, formula) in enumerate(zip(value_row, formula_row)):
+                    # Only text constants; formulas, numbers and dates stay untouched
+                    if isinstance(value, str) and value and not str(formula).startswith('='):
+                        segments.append((value, ('cell', index, top + r, first_column + c)))
+            yield segments
+
+        if empty:
+            print(f"   ⚠️ Sheet '{sheet.name}' is empty or has no data.")
+
+    def _shape_segments(self, index, sheet):
+        """Collect text from shapes (text boxes, comments, WordArt, ...), including grouped shapes"""
+        segments = []
+        try:
+            shapes_collection = sheet.api.Shapes
+            shapes_count = shapes_collection.Count
+
+            if shapes_count > 0:
+                print(f"   📊 Sheet '{sheet.name}' has {shapes_count} shapes to check")
+                segments.extend(self._collect_shapes(index, shapes_collection, shapes_count, ()))
+        except Exception as e:
+            print(f"   ⚠️ Error processing shapes on sheet '{sheet.name}': {str(e)}")
+        return segments
+
+    def _collect_shapes(self, index, collection, count, parent_path):
+        """Read the text of each shape of a collection (Excel COM API indexes from 1).
+
+        The reference of a shape records its path (shape index, then group
+        item indices) and the access method its text was read with, and the
+        object holding the text is kept, so write-back makes no lookups or
+        probes.  The access methods are always tried in the order of
+        SHAPE_TEXT, so the visible text wins over the alternative text.
+        """
+        segments = []
+        for i in range(1, count + 1):
+            path = parent_path + (i,)
+            try:
+                shape = collection.Item(i)
+                if shape.Type == MSO_GROUP:
+                    group_items = shape.GroupItems
+                    segments.extend(self._collect_shapes(index, group_items, group_items.Count, path))
+                    continue
+                for method, (read, _) in SHAPE_TEXT.items():
+                    try:
+                        shape_text, owner = read(shape)
+                    except Exception:
+                        continue
+                    if shape_text:
+                        self.shapes[(index, path)] = owner
+                        segments.append((shape_text, ('shape', index, path, method)))
+                        break
+            except Exception as outer_e:
+                # General error when processing shape
+                print(f"   ⚠️ Error processing shape {_shape_name(path)}: {str(outer_e)}")
+        return segments
+
+    def write(self, ref, text):
+        """Write translated text back to a shape, or buffer it for a cell"""
+        if ref[0] == 'cell':
+            _, index, row, column = ref
+            self.pending.setdefault(index, {})[(row, column)] = text
+        elif ref[0] == 'shape':
+            # Write through the same access method the text was read with
+            _, index, path, method = ref
+            sheet_obj = self.sheets[index]
+            read, write = SHAPE_TEXT[method]
+            try:
+                owner = self.shapes.get((index, path))
+                if owner is None:
+                    owner = read(self._find_shape(index, path))[1]
+                write(owner, text)
+                print(f"   ✅ Updated text for shape {_shape_name(path)} on sheet '{sheet_obj.name}'")
+            except Exception as update_err:
+                print(f"   ⚠️ Error updating shape {_shape_name(path)} on sheet '{sheet_obj.name}' "
+                      f"through {method}: {str(update_err)}")
+        else:
+            print(f"   ⚠️ Unknown reference type: {ref[0]}")
+
+    def fork(self):
+        """Another copy of the workbook, opened in the same Excel, for the
+        translation into another language; it shares the cells read through
+        this one, so it is written without being read again"""
+        copy_dir = tempfile.mkdtemp(prefix="excel-translator-")
+        # Excel cannot open two workbooks of the same name
+        stem, ext = os.path.splitext(self.book.name)
+        copy_path = os.path.join(copy_dir, f"{stem}-copy{ext}")
+        self.book.api.SaveCopyAs(copy_path)
+        fork = ExcelWorkbook(self.book.app.books.open(copy_path), self.snapshots)
+        fork.copy_dir = copy_dir
+        return fork
+
+    def _find_shape(self, index, path):
+        """Look a shape up again by its path"""
+        shape = self.sheets[index].api.Shapes.Item(path[0])
+        for i in path[1:]:
+            shape = shape.GroupItems.Item(i)
+        return shape
+
+    def flush(self, release=False):
+        """Write buffered cell translations, in a few assignments per block
+        of rows
+
+        With ``release`` the values read up to the last block written to are
+        dropped; cells written to them later are written row by row.  Blocks
+        must be written in reading order, and the forks of a workbook flushed
+        before it.
+        """
+        for index, cells in self.pending.items():
+            sheet = self.sheets[index]
+            snapshots = self.snapshots.get(index, {})
+            tops = sorted(snapshots)
+            blocks = {}  # first row of a block -> {(row, column): text}
+            for (row, column), text in cells.items():
+                top = tops[bisect.bisect_right(tops, row) - 1] if tops and row >= tops[0] else None
+                blocks.setdefault(top, {})[(row, column)] = text
+            for top, block_cells in blocks.items():
+                try:
+                    if top is not None and self._write_block(sheet, top, snapshots[top], block_cells):
+                        continue
+                except Exception as bulk_err:
+                    print(f"   ⚠️ Bulk write failed on sheet '{sheet.name}', writing row by row: {str(bulk_err)}")
+                self._write_rows(index, sheet, block_cells)
+            if release and self.owner:
+                # Blocks read before the last one written to are done, written to or not
+                last = max((top for top in blocks if top is not None), default=None)
+                for top in tops:
+                    if last is not None and top <= last:
+                        snapshots.pop(top, None)
+        if release and self.owner and self.pending:
+            for index in range(max(self.pending)):
+                self.snapshots.pop(index, None)
+        self.pending = {}
+
+    def _write_block(self, sheet, first_row, snapshot, cells):
+        """Assign the translated cells of a block in as few rectangles as possible.
+
+        In each row, the gap between two translated cells is bridged when it
+        only holds empty cells, numbers or booleans, which are written back
+        with the formula text read during the scan.  Untranslated text (its
+        rich text formatting would be lost) and formulas (a dynamic array
+        formula written through .Formula is implicitly intersected) are never
+        rewritten.  Runs that span the same columns in consecutive rows are
+        assigned together.  If a cell lies outside the block, nothing is
+        written and False is returned.
+        """
+        first_column, values, formulas = snapshot
+        if any(not (first_row <= row < first_row + len(values) and first_column <= column < first_column + len(values[0]))
+               for row, column in cells):
+            return False
+
+        runs = []  # (row, first column, [contents])
+        for row, column in sorted(cells):
+            if runs and runs[-1][0] == row:
+                _, start, contents = runs[-1]
+                gap = []
+                for gap_column in range(start + len(contents), column):
+                    value = values[row - first_row][gap_column - first_column]
+                    formula = formulas[row - first_row][gap_column - first_column]
+                    if not _rewritable(value, formula):
+                        break
+                    gap.append(formula)
+                else:
+                    contents.extend(gap)
+                    contents.append(cells[(row, column)])
+                    continue
+            runs.append((row, column, [cells[(row, column)]]))
+
+        rectangles = []  # (first row, first column, [rows of contents])
+        growing = {}  # (first column, width) -> rectangle ending at the last row seen
+        for row, start, contents in runs:
+            rectangle = growing.get((start, len(contents)))
+            if rectangle and rectangle[0] + len(rectangle[2]) == row:
+                rectangle[2].append(contents)
+            else:
+                rectangle = (row, start, [contents])
+                rectangles.append(rectangle)
+                growing[(start, len(contents))] = rectangle
+
+        for top, left, block in rectangles:
+            sheet.range((top, left), (top + len(block) - 1, left + len(block[0]) - 1)).formula = block
+        return True
+
+    def _write_rows(self, index, sheet, cells):
+        """Write each run of adjacent translated cells in a row with one call"""
+        for row, start, texts in _row_runs(cells):
+            try:
+                target = sheet.range((row, start), (row, start + len(texts) - 1))
+                target.value = texts if len(texts) > 1 else texts[0]
+            except Exception:
+                # Fall back to single cells so one bad cell does not lose the run
+                for offset, text in enumerate(texts):
+                    ref = ('cell', index, row, start + offset)
+                    try:
+                        sheet.range((row, start + offset)).value = text
+                    except Exception as update_err:
+                        print(f"   ⚠️ Could not update content for {self.describe(ref)}: {str(update_err)}")
+
+    def describe(self, ref):
+        """Human readable description of a reference for log messages"""
+        sheet_name = self.sheets[ref[1]].name
+        if ref[0] == 'shape':
+            return f"Shape {_shape_name(ref[2])} on sheet {sheet_name}"
+        return f"Cell {column_letter(ref[3])}{ref[2]} on sheet {sheet_name}"
+
+    def save(self, path):
+        with metrics.stage("write_cells"):
+            self.flush()
+        self.book.save(path)
+
+    def close(self):
+        self.book.close()
+        if self.copy_dir:
+            shutil.rmtree(self.copy_dir, ignore_errors=True)
+
+
+def _rewritable(value, formula):
+    """Whether writing the formula text of an untranslated cell back to it
+    leaves the cell unchanged: only empty cells, numbers and booleans"""
+    if not isinstance(formula, str) or formula.startswith('='):
+        return False
+    if value is None:
+        return formula == ''
+    if isinstance(value, bool):
+        return formula.upper() == str(value).upper()
+    if isinstance(value, (int, float)):
+        try:
+            return float(formula) == value
+        except ValueError:
+            return False
+    return False
+
+
+def _row_runs(cells):
+    """Group {(row, column): text} into (row, first column, [texts]) runs of adjacent cells"""
+    runs = []
+    for row, column in sorted(cells):
+        if runs and runs[-1][0] == row and runs[-1][1] + len(runs[-1][2]) == column:
+            runs[-1][2].append(cells[(row, column)])
+        else:
+            runs.append((row, column, [cells[(row, column)]]))
+    return runs
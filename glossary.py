@@ -0,0 +1,153 @@
+"""Glossaries that pin the translation of domain terms.
+
+A glossary is a CSV or TSV file whose header row names the language of each
+column; a file per language pair has two columns, one file can also hold
+several languages, and other columns (notes, ...) are ignored:
+
+    ja,en,vi
+    仕様書,specification,đặc tả
+    受入試験,acceptance test,kiểm thử chấp nhận
+
+All source terms of a language pair go into one Aho-Corasick automaton, so a
+batch is scanned once however large the glossary is, and only the entries
+found in the batch are added to its prompt.
+
+    glossary = load_glossary("glossary", "ja", "en")
+    glossary.match(["仕様書を確認", "受入試験の結果"])
+    -> [("仕様書", "specification"), ("受入試験", "acceptance test")]
+"""
+import csv
+import glob
+import hashlib
+import os
+from collections import deque
+
+
+class TermMatcher:
+    """Aho-Corasick automaton finding every occurrence of a set of terms"""
+
+    def __init__(self, terms):
+        self.goto = [{}]  # State -> {character: next state}
+        self.fail = [0]  # State -> longest proper suffix that is also a state
+        self.output = [[]]  # State -> indexes of the terms ending here
+        for index, term in enumerate(terms):
+            state = 0
+            for ch in term:
+                if ch not in self.goto[state]:
+                    self.goto[state][ch] = len(self.goto)
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                state = self.goto[state][ch]
+            self.output[state].append(index)
+
+        # Breadth first, so the failure state of a child is always done before it
+        pending = deque(self.goto[0].values())
+        while pending:
+            state = pending.popleft()
+            for ch, child in self.goto[state].items():
+                pending.append(child)
+                fallback = self.fail[state]
+                while fallback and ch not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(ch, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def find(self, text):
+        """Yield (end position, term index) for every occurrence in ``text``"""
+        state = 0
+        for position, ch in enumerate(text):
+            while state and ch not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(ch, 0)
+            for index in self.output[state]:
+                yield position + 1, index
+
+
+def is_word_char(ch):
+    """Letters and digits of scripts that separate words with spaces"""
+    return ch.isalnum() and ord(ch) < 0x2E80
+
+
+class Glossary:
+    """Term translations for one language pair
+
+    Terms match case-insensitively. A term that starts or ends with a letter
+    of a space-separated script only matches whole words there, so "API"
+    is not found in "rapid"; CJK terms match anywhere.
+    """
+
+    def __init__(self, entries):
+        self.entries = []
+        seen = set()
+        for source, target in entries:
+            if source.lower() not in seen:  # The first translation of a term wins
+                seen.add(source.lower())
+                self.entries.append((source, target))
+        self.terms = [source.lower() for source, _ in self.entries]
+        self.matcher = TermMatcher(self.terms)
+        self.digest = hashlib.sha256("\n".join(f"{source}\t{target}" for source, target in self.entries)
+                                     .encode("utf-8")).hexdigest()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def match(self, texts):
+        """Entries found in any of ``texts``, in glossary order"""
+        found = set()
+        for text in texts:
+            text = text.lower()
+            for end, index in self.matcher.find(text):
+                if index in found:
+                    continue
+                term = self.terms[index]
+                start = end - len(term)
+                if start and is_word_char(term[0]) and is_word_char(text[start - 1]):
+                    continue
+                if end < len(text) and is_word_char(term[-1]) and is_word_char(text[end]):
+                    continue
+                found.add(index)
+        return [self.entries[index] for index in sorted(found)]
+
+    def prompt(self, entries):
+        """Prompt lines that pin the translation of ``entries``"""
+        if not entries:
+            return ""
+        return ("\nGlossary: always translate these terms as given:\n"
+                + "".join(f"- {source} => {target}\n" for source, target in entries))
+
+
+def glossary_files(path):
+    """The CSV and TSV files of a glossary file or directory"""
+    if os.path.isdir(path):
+        return sorted(file for pattern in ("*.csv", "*.tsv", "*.txt")
+                      for file in glob.glob(os.path.join(path, pattern)))
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Glossary not found: {path}")
+    return [path]
+
+
+def read_entries(file_path, source_lang, target_lang):
+    """(source term, target term) rows of one file; none if it lacks either language"""
+    delimiter = "," if file_path.lower().endswith(".csv") else "\t"
+    # utf-8-sig drops the byte order mark Excel writes in front of CSV files
+    with open(file_path, newline="", encoding="utf-8-sig") as f:
+        rows = csv.reader(f, delimiter=delimiter)
+        header = [name.strip().lower() for name in next(rows, [])]
+        if source_lang not in header or target_lang not in header:
+            return []
+        source_column, target_column = header.index(source_lang), header.index(target_lang)
+        entries = []
+        for row in rows:
+            if len(row) > max(source_column, target_column):
+                source, target = row[source_column].strip(), row[target_column].strip()
+                if source and target:
+                    entries.append((source, target))
+        return entries
+
+
+def load_glossary(path, source_lang, target_lang):
+    """Glossary of a language pair from a file or a directory of files, None if it has no terms"""
+    entries = [entry for file_path in glossary_files(path)
+               for entry in read_entries(file_path, source_lang, target_lang)]
+    return Glossary(entries) if entries else None
@@ -1,11 +1,28 @@
 import os
+import argparse
+import csv
 import time
 import re
 import glob
-import xlwings as xw
-from gooey import Gooey, GooeyParser
-from openai import OpenAI
+import sys
+import asyncio
+import contextvars
+import threading
+import queue
+import multiprocessing.util
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
+from translation_memory import TranslationMemory, context_key
+import rate_limiter
+import metrics
+from rate_limiter import RateLimiter, LimiterManager
+from endpoints import Endpoint, EndpointPool, parse_endpoints
+from protocols import get_protocol, parse_reply, ThinkFilter, StreamInterrupted
+from checkpoint import Journal, Manifest, file_hash, job_key
+from classifier import Classifier, RULES
+from templates import group_texts, fill_template
+from glossary import load_glossary
 
 # Load environment variables from .env file
 load_dotenv()
@@ -53,6 +70,15 @@ lang_map = {
 
 separator = "¦¦¦"
 
+# Wire format for batches: "separator" (segments joined with the separator),
+# "numbered" ([n] lines) or "json"; the last two keep every correctly tagged
+# segment of a damaged reply and only re-request the missing ones
+LLM_PROTOCOL = os.getenv("LLM_PROTOCOL") or "separator"
+LLM_RESPONSE_FORMAT = (os.getenv("LLM_RESPONSE_FORMAT") or "").lower() in ["1", "true"]  # JSON schema for the json protocol
+protocol = get_protocol(LLM_PROTOCOL, separator, schema=LLM_RESPONSE_FORMAT)
+LLM_MAX_ATTEMPTS = 3  # Requests for the same segment before keeping the original
+LLM_STREAM = (os.getenv("LLM_STREAM") or "").lower() in ["1", "true"]  # Stream replies and hand over segments as they arrive
+
 system_prompt = f"""
 You are a professional IT translator specializing in software development, programming, and technical documentation. Follow these rules strictly:
 
@@ -64,7 +90,7 @@ You are a professional IT translator specializing in software development, progr
 6. Preserve the original formatting (spaces, line breaks)
 7. Use proper grammar and punctuation
 8. Only keep unchanged: proper names, IDs, and technical codes
-9. Translate all segments separated by "{separator}" and keep them separated with the same delimiter
+9. {protocol.rule}
 
 For IT-specific terminology:
 - Maintain consistency in technical terms
@@ -74,12 +100,70 @@ For IT-specific terminology:
 - Keep file extensions and paths unchanged
 """
 
-# LLM API Client
-llm_client = None
-
-# Set API delay and batch size
-API_DELAY = 2  # Delay 2 seconds between API calls
+# Several OpenAI-compatible endpoints can share the requests: a JSON list of
+# {"url", "api_key", "model", "name"} entries (see endpoints.py). Without it
+# LLM_API_URL, LLM_API_KEY and LLM_MODEL_NAME are the only endpoint
+LLM_ENDPOINTS = os.getenv("LLM_ENDPOINTS")
+LLM_ENDPOINT_FAILURES = int(os.getenv("LLM_ENDPOINT_FAILURES") or 3)  # Failed requests in a row that eject an endpoint
+LLM_ENDPOINT_COOLDOWN = float(os.getenv("LLM_ENDPOINT_COOLDOWN") or 30)  # Seconds before an ejected endpoint is tried again
+llm_pool = None
+llm_pool_lock = threading.Lock()
+
+# Persistent translation memory, set TRANSLATION_CACHE=off to disable it
+TRANSLATION_CACHE = os.getenv("TRANSLATION_CACHE") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "translation_cache.db")
+TRANSLATION_CACHE_SIZE = int(os.getenv("TRANSLATION_CACHE_SIZE") or 200000)  # Maximum number of cached translations
+translation_memory = None
+
+# Checkpoint journals and the manifest of completed files live in the output directory
+JOURNAL_DIR = ".journal"
+MANIFEST_FILE = ".manifest.json"
+
+# Timings and LLM usage of each run, as JSON lines and/or a Prometheus textfile
+METRICS_JSONL = os.getenv("METRICS_JSONL")
+METRICS_PROMETHEUS = os.getenv("METRICS_PROMETHEUS")
+
+# Counters for the current run (segments found, unique strings sent, ...)
+run_stats = metrics.Counters()
+
+# LLM request limits (replace the old fixed 2 second delay between API calls)
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY") or 4)  # Batches in flight at the same time
+LLM_RPM = float(os.getenv("LLM_RPM") or 30)  # Requests per minute, 0 = unlimited
+LLM_TPM = float(os.getenv("LLM_TPM") or 0)  # Tokens per minute, 0 = unlimited
 BATCH_SIZE = 100  # Maximum number of cells in a batch
+LLM_BATCH_TOKENS = int(os.getenv("LLM_BATCH_TOKENS") or 2000)  # Estimated source tokens per batch for the model in use
+
+# Event loop running all LLM requests, and the limiter for their rate and
+# concurrency (shared between processes with --workers)
+llm_loop = None
+llm_loop_lock = threading.Lock()
+llm_limiter = None
+
+# Texts that need no translation (numbers, formulas, URLs, paths, dates, IDs,
+# ... and text without letters of the source language's script) are skipped
+SKIP_RULES = [rule.strip() for rule in (os.getenv("SKIP_RULES") or ",".join(RULES)).split(",") if rule.strip()]
+SOURCE_SCRIPT_RATIO = os.getenv("SOURCE_SCRIPT_RATIO") or "0"  # Share of source script letters at or below which text is skipped
+SOURCE_SCRIPT_RATIO = None if SOURCE_SCRIPT_RATIO.lower() == "off" else float(SOURCE_SCRIPT_RATIO)
+classifiers = {}
+
+# Texts that differ only in numbers, IDs or codes ("手順1を実行", "手順2を実行", ...)
+# are translated once as a template when at least this many share it, 0 = off
+TEMPLATE_MIN_GROUP = int(os.getenv("TEMPLATE_MIN_GROUP") or 2)
+
+# Glossary file or directory of CSV/TSV files whose header row names the
+# languages; only the terms found in a batch are added to its prompt
+GLOSSARY = os.getenv("GLOSSARY")
+glossaries = {}
+glossary_lock = threading.Lock()
+
+# Pipelined mode for very large sheets: read PIPELINE_ROWS rows at a time and
+# translate and write them while the next rows are read, with at most
+# PIPELINE_DEPTH chunks between reading and writing, 0 = off
+PIPELINE_ROWS = int(os.getenv("PIPELINE_ROWS") or 0)
+PIPELINE_DEPTH = int(os.getenv("PIPELINE_DEPTH") or 4)
+
+# Workbook backend: "excel" drives Excel through xlwings (Windows/macOS only),
+# "xlsx" edits the .xlsx package directly and runs anywhere
+WORKBOOK_BACKEND = os.getenv("WORKBOOK_BACKEND") or ("excel" if sys.platform in ("win32", "darwin") else "xlsx")
 
 def clean_text(text):
     """Clean and normalize text before translation"""
@@ -88,25 +172,66 @@ def clean_text(text):
     text = ' '.join(text.split())  # Normalize whitespace
     return text.strip()
 
-def should_translate(text):
-    """Check if a cell needs translation"""
-    text = clean_text(text)
-    if not text or len(text) < 2:
-        return False
-    if re.match(r'^[\d\s,.-]+$', text):  # Contains only numbers and number formatting characters
-        return False
-    if text.startswith('='):  # Excel formula
-        return False
-    return True
-
-def translate_batch(texts, source_lang, target_lang):
-    """Translate a batch of texts to the target language"""
+def get_classifier(source_lang):
+    """Skip rules for a source language, compiled once"""
+    if source_lang not in classifiers:
+        classifiers[source_lang] = Classifier(source_lang, SKIP_RULES, SOURCE_SCRIPT_RATIO)
+    return classifiers[source_lang]
+
+def get_glossary(source_lang, target_lang):
+    """Glossary of a language pair, loaded once; None without GLOSSARY or terms"""
+    if not GLOSSARY:
+        return None
+    # Asked for by the LLM loop and by translator threads at the same time
+    with glossary_lock:
+        if (source_lang, target_lang) not in glossaries:
+            try:
+                glossary = load_glossary(GLOSSARY, source_lang, target_lang)
+            except (OSError, ValueError, csv.Error) as glossary_err:
+                print(f"⚠️ Could not read glossary: {str(glossary_err)}")
+                glossary = None
+            if glossary:
+                print(f"📖 Glossary {source_lang}→{target_lang}: {len(glossary)} terms "
+                      f"(~{estimate_tokens(glossary.prompt(glossary.entries))} tokens if sent whole with every request)")
+            glossaries[source_lang, target_lang] = glossary
+        return glossaries[source_lang, target_lang]
+
+def estimate_tokens(text):
+    """Rough token count: one per CJK character, one per 4 other characters"""
+    wide = sum(1 for ch in text if ord(ch) >= 0x2E80)
+    return wide + (len(text) - wide) // 4 + 1
+
+def get_llm_loop():
+    """Start the background event loop that runs LLM requests"""
+    global llm_loop
+    # Several threads submit batches at once, and there must be only one loop
+    with llm_loop_lock:
+        if llm_loop is None:
+            llm_loop = asyncio.new_event_loop()
+            threading.Thread(target=llm_loop.run_forever, name="llm-loop", daemon=True).start()
+    return llm_loop
+
+def submit_batch(texts, source_lang, target_lang, emit=None):
+    """Schedule a batch on the LLM event loop and return a concurrent Future"""
+    labels = {**metrics.current_labels(), "language": target_lang}
+    coroutine = metrics.with_labels(labels, translate_batch_async(texts, source_lang, target_lang, emit=emit))
+    return asyncio.run_coroutine_threadsafe(coroutine, get_llm_loop())
+
+async def translate_batch_async(texts, source_lang, target_lang, attempt=1, emit=None):
+    """Translate a batch of texts to the target language on the LLM event loop
+
+    Segments that could not be translated, or came back blank, are returned
+    as None.
+    With the separator protocol a reply with the wrong number of segments is
+    split in two and only the halves are retried, until every segment is
+    aligned. With an indexed protocol the segments that arrived, also of a
+    streamed reply that broke off, are kept and only the missing ones are
+    requested again. ``emit`` gets the segments of an indexed protocol as
+    they arrive, and those of the separator protocol once they line up.
+    """
     if not texts:
         return []
 
-    # Combine texts with separator
-    combined_text = separator.join(texts)
-
     # Get translation direction
     source = lang_map.get(source_lang)
     target = lang_map.get(target_lang)
@@ -114,309 +239,829 @@ def translate_batch(texts, source_lang, target_lang):
         print(f"❌ Invalid language combination: from {source_lang} to {target_lang}")
         return texts
 
-    user_prompt = f"Translate the following text from {source} to {target}, keeping segments separated by '{separator}':\n\n{combined_text}"
+    try:
+        # Separator segments are only known to line up once the whole reply is counted
+        reply = await request_translation(texts, source, target, emit if protocol.indexed else None,
+                                          get_glossary(source_lang, target_lang))
+    except StreamInterrupted as e:
+        print(f"❌ Error translating batch after {len(e.segments)} of {len(texts)} streamed segments: {str(e)}")
+        if not e.segments or not protocol.indexed:
+            run_stats.add("failed_segments", len(texts))
+            return [None] * len(texts)
+        # Keep the numbered segments that arrived before the failure
+        reply = e.segments
+    except Exception as e:
+        print(f"❌ Error translating batch: {str(e)}")
+        # No translations if the request fails, so the texts are tried again later
+        run_stats.add("failed_segments", len(texts))
+        return [None] * len(texts)
+
+    if protocol.indexed:
+        # A blank segment counts as missing
+        translated_parts = [part if part and part.strip() else None for part in map(reply.get, range(len(texts)))]
+        missing = [i for i, part in enumerate(translated_parts) if part is None]
+        if not missing:
+            return translated_parts
+
+        run_stats.add("partial_batches")
+        if attempt >= LLM_MAX_ATTEMPTS:
+            print(f"   ⚠️ {len(missing)} of {len(texts)} segments still missing after {attempt} attempts, keeping the originals")
+            run_stats.add("failed_segments", len(missing))
+            return translated_parts
+
+        # Re-request only the segments that did not come back
+        print(f"   ⚠️ Recovered {len(texts) - len(missing)} of {len(texts)} segments, re-requesting {len(missing)} missing")
+        run_stats.add("redispatched_segments", len(missing))
+        retried = await translate_batch_async([texts[i] for i in missing], source_lang, target_lang, attempt + 1, emit)
+        for i, part in zip(missing, retried):
+            translated_parts[i] = part
+        return translated_parts
+
+    if not any(part.strip() for part in reply.values()):
+        # An empty reply (or only a think block) is not worth splitting up
+        print(f"❌ Empty reply for a batch of {len(texts)} segments")
+        run_stats.add("failed_segments", len(texts))
+        return [None] * len(texts)
+
+    translated_parts = [reply[i] for i in sorted(reply)]
+    if len(texts) == 1 and len(translated_parts) != 1:
+        # A single segment cannot be misaligned, keep the whole reply
+        translated_parts = [' '.join(part.strip() for part in translated_parts if part.strip())]
+    if len(translated_parts) == len(texts):
+        blank = [i for i, part in enumerate(translated_parts) if not part.strip()]
+        if blank:
+            print(f"   ⚠️ {len(blank)} of {len(texts)} segments came back blank, keeping the originals")
+            run_stats.add("failed_segments", len(blank))
+            for i in blank:
+                translated_parts[i] = None
+        if emit:
+            for text, part in zip(texts, translated_parts):
+                if part is not None:
+                    emit(text, part)
+        return translated_parts
+
+    # Handle case when number of translated parts doesn't match: bisect and retry
+    print(f"   ⚠️ Number of translated parts ({len(translated_parts)}) does not match number of original texts ({len(texts)}), retrying in two halves")
+    run_stats.add("mismatched_batches")
+    run_stats.add("redispatched_segments", len(texts))
+    middle = len(texts) // 2
+    first, second = await asyncio.gather(
+        translate_batch_async(texts[:middle], source_lang, target_lang, emit=emit),
+        translate_batch_async(texts[middle:], source_lang, target_lang, emit=emit),
+    )
+    return first + second
+
+def get_llm_pool():
+    """Create the endpoint pool on first use: the LLM_ENDPOINTS entries, or the
+    single LLM_API_URL endpoint"""
+    global llm_pool
+    # Translator threads and the LLM loop ask for it at the same time, and
+    # there must be only one pool so the endpoints' health is shared
+    with llm_pool_lock:
+        if llm_pool is None:
+            endpoints = parse_endpoints(LLM_ENDPOINTS, llm_api) if LLM_ENDPOINTS else [Endpoint(**llm_api)]
+            llm_pool = EndpointPool(endpoints, LLM_ENDPOINT_FAILURES, LLM_ENDPOINT_COOLDOWN)
+            for endpoint in endpoints:
+                print(f"🤖 Using LLM model: '{endpoint.model}' at '{endpoint.url}'")
+    return llm_pool
+
+async def request_translation(texts, source, target, emit=None, glossary=None):
+    """Send one translation request and return {segment index: translated text}
+
+    With LLM_STREAM the reply is streamed and ``emit(text, translation)`` is
+    called for every segment as soon as it is complete. The ``glossary``
+    entries found in the texts are appended to the system prompt.
+    """
+    # Combine texts in the configured wire format
+    combined_text = protocol.format(texts)
+
+    user_prompt = f"{protocol.instruction(source, target)}:\n\n{combined_text}"
 
     if llm_model_suffix := os.getenv("LLM_MODEL_SUFFIX"):
         user_prompt += "\n"
         user_prompt += llm_model_suffix
 
+    global llm_limiter
+    if llm_limiter is None:
+        llm_limiter = RateLimiter(LLM_RPM, LLM_TPM, LLM_CONCURRENCY)
+
+    request = {}
+    if response_format := protocol.response_format(len(texts)):
+        request["response_format"] = response_format
+
+    # The system prompt never changes, so servers that cache prompt prefixes
+    # reuse it; the glossary terms of this batch only come after it
+    terms = glossary.match(texts) if glossary else []
+    glossary_prompt = glossary.prompt(terms) if terms else ""
+
+    pool = get_llm_pool()
+    messages = [
+        {"role": "system", "content": system_prompt + glossary_prompt},
+        {"role": "user", "content": user_prompt}
+    ]
+
+    # A failed request is sent again to another endpoint, each endpoint once
+    # (twice with a single endpoint), before its segments are given up
+    tokens = estimate_tokens(system_prompt + glossary_prompt + user_prompt) + estimate_tokens(combined_text)  # The reply is about as long as the text
+    attempts = max(2, len(pool.endpoints))
+    tried = []
+    for attempt in range(1, attempts + 1):
+        # Wait for the rate limiter, then pick an endpoint that has not failed this batch yet
+        wait_start = time.perf_counter()
+        await rate_limiter.acquire(llm_limiter, tokens)
+        endpoint = pool.acquire(exclude=tried)
+        tried.append(endpoint)
+        call_start = time.perf_counter()
+        call = {"segments": len(texts), "wait": round(call_start - wait_start, 6), "endpoint": endpoint.name}
+        if glossary:
+            call.update(glossary_terms=len(terms), glossary_tokens=estimate_tokens(glossary_prompt) if terms else 0)
+        try:
+            # Call translation API
+            run_stats.add("llm_calls")
+            if LLM_STREAM:
+                segments, usage = await stream_translation(endpoint, texts, messages, request, call, emit)
+            else:
+                response = await endpoint.get_client().chat.completions.create(
+                    model=endpoint.model,
+                    messages=messages,
+                    **request
+                )
+                usage = response.usage
+        except Exception as e:
+            metrics.run_metrics.record("llm_call", status="error", error=type(e).__name__, prompt_tokens=0, completion_tokens=0,
+                                       latency=round(time.perf_counter() - call_start, 6), **call)
+            if pool.release(endpoint, ok=False):
+                print(f"   ⛔ Ejecting LLM endpoint '{endpoint.name}' for {pool.cooldown:.0f} seconds "
+                      f"after {endpoint.failures} failed requests")
+                run_stats.add("endpoint_ejections")
+                metrics.run_metrics.record("endpoint_ejected", endpoint=endpoint.name, failures=endpoint.failures)
+            # Numbered segments that a broken stream already delivered are kept, the caller requests the rest
+            if attempt == attempts or (isinstance(e, StreamInterrupted) and e.segments and protocol.indexed):
+                raise
+            print(f"   ⚠️ LLM endpoint '{endpoint.name}' failed ({type(e).__name__}: {str(e)}), "
+                  f"retrying the batch on another endpoint")
+            run_stats.add("endpoint_retries")
+            continue
+        except BaseException:
+            pool.release(endpoint, ok=None)  # Cancelled, which says nothing about the endpoint
+            raise
+        finally:
+            llm_limiter.release()
+
+        latency = time.perf_counter() - call_start
+        pool.release(endpoint, ok=True, latency=latency, tokens=tokens)
+        metrics.run_metrics.record("llm_call", status="ok", latency=round(latency, 6),
+                                   prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+                                   cached_tokens=getattr(getattr(usage, "prompt_tokens_details", None), "cached_tokens", 0) or 0,
+                                   completion_tokens=getattr(usage, "completion_tokens", 0) or 0, **call)
+        break
+    if LLM_STREAM:
+        return segments
+
+    # Split translation result into separate parts
+    translated_text = response.choices[0].message.content or ""
+
+    if llm_model_no_think:
+        translated_text = re.sub(r'<think>.*?</think>\n*', '', translated_text, flags=re.DOTALL)
+
+    return parse_reply(protocol, translated_text, len(texts))
+
+async def stream_translation(endpoint, texts, messages, request, call, emit=None):
+    """Stream a completion from ``endpoint`` and parse segments as they arrive
+
+    Returns ({segment index: text}, usage). If the stream fails part way,
+    StreamInterrupted carries the segments that were already complete.
+    """
+    parser = protocol.parser(len(texts))
+    think_filter = ThinkFilter() if llm_model_no_think else None
+    segments = {}
+    usage = None
+
+    def receive(parsed):
+        for index, text in parsed:
+            if "first_segment" not in call:
+                call["first_segment"] = round(time.perf_counter() - call_start, 6)
+            segments[index] = text
+            if emit and index < len(texts) and text.strip():
+                emit(texts[index], text)
+
+    call_start = time.perf_counter()
     try:
-        global llm_client
-        if not llm_client:
-            llm_client = OpenAI(
-                base_url=llm_api["url"],
-                api_key=llm_api["api_key"],
-            )
-            print(f"🤖 Using LLM model: '{llm_api['model']}' at '{llm_api['url']}'")
-
-        # Call translation API
-        response = llm_client.chat.completions.create(
-            model=llm_api["model"], # Or "gemini-pro" or other suitable model
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ]
+        stream = await endpoint.get_client().chat.completions.create(
+            model=endpoint.model,
+            messages=messages,
+            stream=True,
+            stream_options={"include_usage": True},
+            **request
         )
-
-        # Split translation result into separate parts
-        translated_text = response.choices[0].message.content
-
-        if llm_model_no_think:
-            translated_text = re.sub(r'<think>.*?</think>\n*', '', translated_text, flags=re.DOTALL)
-
-        translated_parts = translated_text.split(separator)
-
-        # Handle case when number of translated parts doesn't match
-        if len(translated_parts) != len(texts):
-            print(f"   ⚠️ Number of translated parts ({len(translated_parts)}) does not match number of original texts ({len(texts)})")
-            # Ensure number of translated parts equals number of original texts
-            if len(translated_parts) < len(texts):
-                translated_parts.extend(texts[len(translated_parts):])
-            else:
-                translated_parts = translated_parts[:len(texts)]
-
-        # Delay to avoid exceeding API limits
-        time.sleep(API_DELAY)
-        return translated_parts
-
+        async for chunk in stream:
+            if chunk.usage:
+                usage = chunk.usage
+            if not chunk.choices:
+                continue
+            content = chunk.choices[0].delta.content or ""
+            if think_filter:
+                content = think_filter.feed(content)
+            if content:
+                receive(parser.feed(content))
     except Exception as e:
-        print(f"❌ Error translating batch: {str(e)}")
-        # Return original texts if translation fails
-        return texts
-
-def process_excel(input_path, output_dir, source_lang, target_lang):
-    """Process Excel file: read, translate and save with original format"""
+        raise StreamInterrupted(e, segments) from e
+
+    if think_filter:
+        receive(parser.feed(think_filter.close()))
+    receive(parser.close())
+    return segments, usage
+
+def make_batches(texts):
+    """Pack texts into batches of at most LLM_BATCH_TOKENS estimated tokens
+    and BATCH_SIZE segments; a longer text gets a batch of its own"""
+    batches = []
+    batch = []
+    batch_tokens = 0
+    for text in texts:
+        tokens = estimate_tokens(text)
+        if batch and (batch_tokens + tokens > LLM_BATCH_TOKENS or len(batch) >= BATCH_SIZE):
+            batches.append(batch)
+            batch = []
+            batch_tokens = 0
+        batch.append(text)
+        batch_tokens += tokens
+    if batch:
+        batches.append(batch)
+    return batches
+
+def get_translation_memory():
+    """Open the translation memory on first use; None when it is disabled"""
+    global translation_memory
+    if TRANSLATION_CACHE.lower() in ("off", "0", "false", "none"):
+        return None
+    if translation_memory is None:
+        translation_memory = TranslationMemory(TRANSLATION_CACHE, TRANSLATION_CACHE_SIZE)
+    return translation_memory
+
+def cache_context(source_lang, target_lang):
+    """Cache key for everything except the text: languages, model, prompt and glossary"""
+    prompt = system_prompt + (os.getenv("LLM_MODEL_SUFFIX") or "")
+    if glossary := get_glossary(source_lang, target_lang):
+        prompt += glossary.digest
+    return context_key(source_lang, target_lang, ",".join(get_llm_pool().models()), prompt)
+
+def translate_texts(texts, source_lang, target_lang, translations=None, journal=None, on_translated=None):
+    """Translate each unique text once and return a {text: translation} dict.
+
+    Texts already present in ``translations`` are not sent to the LLM again, so
+    passing the same dict for every sheet and file deduplicates a whole run.
+    With a checkpoint ``journal``, texts it already holds are resumed from it
+    and every completed batch is recorded in it.
+    ``on_translated(text, translation)`` is called on the calling thread for
+    every segment of a batch when the batch completes (translation None if it
+    failed) and, with LLM_STREAM, before that for each segment as it arrives.
+    """
+    if translations is None:
+        translations = {}
+
+    pending = [text for text in dict.fromkeys(texts) if text not in translations]
+    if not pending:
+        return translations
+
+    if journal is not None:
+        resumed = journal.lookup(pending)
+        if resumed:
+            print(f"   ⏯️ Resumed {len(resumed)} {target_lang} text segments from checkpoint journal")
+            run_stats.add("resumed_segments", len(resumed))
+            translations.update(resumed)
+            pending = [text for text in pending if text not in resumed]
+        if not pending:
+            return translations
+
+    # Look up all pending texts in the translation memory at once
+    memory = get_translation_memory()
+    if memory:
+        context = cache_context(source_lang, target_lang)
+        with metrics.stage("cache_lookup", language=target_lang):
+            cached = memory.lookup(context, pending)
+        run_stats.add("cache_misses", len(pending) - len(cached))
+        if cached:
+            print(f"   💾 Found {len(cached)} of {len(pending)} {target_lang} text segments in translation cache")
+            run_stats.add("cache_hits", len(cached))
+            translations.update(cached)
+            pending = [text for text in pending if text not in cached]
+        if not pending:
+            return translations
+
+    # Texts that differ only in numbers, IDs or codes are translated once as a template
+    groups, singles = group_texts(pending, TEMPLATE_MIN_GROUP) if TEMPLATE_MIN_GROUP else ({}, pending)
+    if groups:
+        templated = sum(len(members) for members in groups.values())
+        print(f"   🧩 {templated} {target_lang} text segments share {len(groups)} templates")
+        run_stats.add("templated_segments", templated)
+        run_stats.add("templates", len(groups))
+    requests = singles + list(groups)
+
+    def expand(item, translated):
+        """Translations of the texts behind a request, and the texts to request again one by one"""
+        if item not in groups:
+            return [(item, translated)], []
+        if translated is None:
+            return [(text, None) for text, _ in groups[item]], []
+        results, retry = [], []
+        for text, values in groups[item]:
+            filled = fill_template(translated, values)
+            if filled is None:
+                retry.append(text)
+            else:
+                results.append((text, filled))
+        return results, retry
+
+    batches = make_batches(requests)
+    print(f"   📦 Translating {len(requests)} unique text segments into {target_lang} in {len(batches)} batches.")
+    run_stats.add("unique_segments", len(requests))
+
+    # Streamed segments and finished batches are handed over through one queue,
+    # so on_translated always runs on this thread
+    updates = queue.Queue()
+    emit = None
+    if on_translated and LLM_STREAM:
+        emit = lambda text, translated: updates.put(("segment", text, translated))
+
+    # Keep up to LLM_CONCURRENCY batches in flight and handle them as they finish
+    with metrics.stage("translate", language=target_lang):
+        futures = {}
+
+        def submit(batch_texts):
+            future = submit_batch(batch_texts, source_lang, target_lang, emit)
+            futures[future] = (len(futures) + 1, batch_texts)
+            future.add_done_callback(lambda done: updates.put(("batch", done, None)))
+
+        for batch_texts in batches:
+            submit(batch_texts)
+
+        remaining = len(futures)
+        while remaining:
+            kind, item, translated = updates.get()
+            if kind == "segment":
+                for text, translated in expand(item, translated)[0]:
+                    on_translated(text, translated)
+                continue
+            remaining -= 1
+            current_batch_num, batch_texts = futures[item]
+            translated_batch = item.result()
+            run_stats.add("llm_batches")
+            print(f"   🔄 Translated {target_lang} batch {current_batch_num}/{len(futures)} ({len(batch_texts)} texts)")
+
+            results, retry = [], []
+            for request, translated in zip(batch_texts, translated_batch):
+                request_results, request_retry = expand(request, translated)
+                results.extend(request_results)
+                retry.extend(request_retry)
+
+            # Failed segments are None; a translation equal to its source
+            # (a product name, a code) is as good as any other
+            new_translations = {text: translated for text, translated in results if translated is not None}
+            translations.update(new_translations)
+            if memory:
+                memory.store(context, new_translations)
+            if journal is not None:
+                journal.record(new_translations)
+            if on_translated:
+                for text, translated in results:
+                    on_translated(text, translated)
+
+            # Placeholders that did not survive: translate those texts one by one
+            if retry:
+                print(f"   ⚠️ Template placeholders were not kept in {target_lang}, "
+                      f"translating {len(retry)} text segments one by one")
+                run_stats.add("template_fallbacks", len(retry))
+                run_stats.add("unique_segments", len(retry))
+                for batch_texts in make_batches(retry):
+                    submit(batch_texts)
+                    remaining += 1
+
+    return translations
+
+def translate_languages(texts, source_lang, target_langs, translations, journals=None, on_translated=None):
+    """Translate texts into several languages at the same time
+
+    ``translations`` maps each language to its {text: translation} dict; the
+    batches of all languages share the LLM concurrency and rate limits.
+    The first language is translated on the calling thread and its segments
+    are passed to ``on_translated`` (see translate_texts).
+    """
+    journals = journals or {}
+    for target_lang in target_langs:
+        translations.setdefault(target_lang, {})
+    first_lang, other_langs = target_langs[0], target_langs[1:]
+
+    with ThreadPoolExecutor(max_workers=max(1, len(other_langs))) as pool:
+        # Each thread gets a copy of the caller's metrics labels
+        futures = [pool.submit(contextvars.copy_context().run, translate_texts, texts, source_lang, target_lang,
+                               translations[target_lang], journals.get(target_lang))
+                   for target_lang in other_langs]
+        translate_texts(texts, source_lang, first_lang, translations[first_lang], journals.get(first_lang), on_translated)
+        for future in futures:
+            future.result()
+    return translations
+
+def group_segments(segments, source_lang=None, stats=None):
+    """Map each unique cleaned text to every cell/shape reference that holds it
+
+    The unique texts of the whole section are classified at once, and texts
+    that need no translation are dropped; with ``stats`` their references
+    are counted per skip rule as "skipped_<rule>".
+    """
+    segment_refs = {}
+    for text, ref in segments:
+        segment_refs.setdefault(clean_text(text), []).append(ref)
+    texts = list(segment_refs)
+    for text, reason in zip(texts, get_classifier(source_lang).classify(texts)):
+        if reason:
+            refs = segment_refs.pop(text)
+            if stats is not None:
+                stats.add(f"skipped_{reason}", len(refs))
+    return segment_refs
+
+def translate_pipelined(workbooks, source_lang, translations, journals=None, stats=None):
+    """Translate a workbook chunk by chunk and write it back as chunks finish
+
+    ``workbooks`` maps each target language to the workbook its translation
+    is written to: the first one, which is read, and forks of it.  Chunks of
+    PIPELINE_ROWS rows are read on the calling thread and handed to
+    translator threads, which translate them into every language while the
+    next chunks are read.  Translated chunks are written back in reading
+    order on the calling thread too, as a workbook (Excel through COM) is
+    used from one thread only.  At most PIPELINE_DEPTH chunks are held
+    between reading and writing, so memory does not grow with the size of
+    the sheet.  With ``stats`` the segments are counted like in
+    group_segments.
+
+    Returns {language: number of texts that kept their original text}.
+    """
+    target_langs = list(workbooks)
+    wb = workbooks[target_langs[0]]
+    chunks = deque()  # (sheet name, {text: references}, texts sent, future) in reading order
+    claimed = set()  # Texts that a pending chunk is translating
+    untranslated = Counter()
+
+    def write_chunk(section_name, segment_refs, texts, future):
+        future.result()
+        for target_lang, lang_wb in workbooks.items():
+            lang_translations = translations[target_lang]
+            with metrics.stage("write", language=target_lang, sheet=section_name):
+                for text, refs in segment_refs.items():
+                    translated = lang_translations.get(text)
+                    if translated is None:
+                        untranslated[target_lang] += 1
+                        for ref in refs:
+                            print(f"   ⚠️ Missing {target_lang} translation for {lang_wb.describe(ref)}. Keeping original value.")
+                        continue
+                    if translated == text:
+                        continue
+                    for ref in refs:
+                        try:
+                            lang_wb.write(ref, translated)
+                        except Exception as update_single_err:
+                            print(f"   ⚠️ Could not update content for {lang_wb.describe(ref)}: {str(update_single_err)}")
+        # The chunk is complete, so its cells can go to the workbooks and be forgotten;
+        # the forks first, as they use what the first workbook read
+        for target_lang in reversed(target_langs):
+            with metrics.stage("write", language=target_lang, sheet=section_name):
+                workbooks[target_lang].flush(release=True)
+        claimed.difference_update(texts)
+
+    with ThreadPoolExecutor(max_workers=max(1, PIPELINE_DEPTH), thread_name_prefix="pipeline") as pool:
+        current_section = None
+        for section_name, segments in metrics.timed_sections(wb.sections(PIPELINE_ROWS)):
+            if section_name != current_section:
+                print(f"\n📋 Processing sheet: {section_name}")
+                current_section = section_name
+            segment_refs = group_segments(segments, source_lang, stats)
+            if not segment_refs:
+                continue
+            if stats is not None:
+                stats.add("segments", sum(len(refs) for refs in segment_refs.values()))
+
+            # A text that an earlier chunk is still translating is not sent again:
+            # chunks are written in order, so its translation is there in time
+            texts = [text for text in segment_refs if text not in claimed]
+            claimed.update(texts)
+            future = pool.submit(contextvars.copy_context().run, translate_languages, texts, source_lang, target_langs,
+                                 translations, journals)
+            chunks.append((section_name, segment_refs, texts, future))
+
+            # Write the chunks that are done, and wait for the oldest one while PIPELINE_DEPTH are pending
+            while chunks and (chunks[0][3].done() or len(chunks) >= PIPELINE_DEPTH):
+                write_chunk(*chunks.popleft())
+        while chunks:
+            write_chunk(*chunks.popleft())
+    return {target_lang: untranslated[target_lang] for target_lang in target_langs}
+
+def create_backend(name=None):
+    """Create the workbook backend used to read and write Excel files"""
+    name = name or WORKBOOK_BACKEND
+    if name == "excel":
+        from excel_backend import ExcelBackend
+        return ExcelBackend()
+    if name == "xlsx":
+        from xlsx_backend import XlsxBackend
+        return XlsxBackend()
+    raise ValueError(f"Unknown workbook backend: {name}")
+
+def output_path_for(input_path, output_dir, target_lang):
+    """Path of the translated copy of ``input_path``"""
+    base_name, ext = os.path.splitext(os.path.basename(input_path))
+    return os.path.join(output_dir, f"{base_name}-{target_lang}{ext}")
+
+def process_excel(input_path, output_dir, source_lang, target_langs, backend=None, translations=None, input_hash=None):
+    """Process Excel file: read, translate and save with original format
+
+    The workbook is read once and translated into every language of
+    ``target_langs`` concurrently; each language is written to its own copy
+    of the workbook (see fork), so untranslated cells keep their content.
+    ``translations`` is an optional {language: {text: translation}} dict shared
+    between files; strings already in it are reused instead of being translated
+    again. Translated batches are checkpointed in a journal per language under
+    the output directory, so an interrupted file resumes where it stopped.
+    With PIPELINE_ROWS the workbook is read, translated and written in chunks
+    of rows instead (see translate_pipelined).
+
+    Returns {language: (output path or None, complete)}, where complete means
+    every text of the workbook was translated.
+    """
+    if isinstance(target_langs, str):
+        target_langs = [target_langs]
+    owns_backend = backend is None
+    if translations is None:
+        translations = {}
+    results = {target_lang: (None, False) for target_lang in target_langs}
+    journals = {}
     try:
         # Create output file path
         filename = os.path.basename(input_path)
-        base_name, ext = os.path.splitext(filename)
+        base_name = os.path.splitext(filename)[0]
 
         # Use provided output_dir
         os.makedirs(output_dir, exist_ok=True)
-        output_path = os.path.join(output_dir, f"{base_name}-{target_lang}{ext}")
 
         print(f"\n🔄 Processing file: {filename}")
 
-        # Open workbook with xlwings to preserve formatting
-        app = xw.App(visible=False)
+        # Checkpoint journal of this file, language pair, model and prompt
+        input_hash = input_hash or file_hash(input_path)
+        for target_lang in target_langs:
+            key = job_key(input_hash, cache_context(source_lang, target_lang))
+            journal = Journal(os.path.join(output_dir, JOURNAL_DIR, f"{base_name}-{target_lang}-{key[:12]}.jsonl"))
+            if len(journal):
+                print(f"   ⏯️ Found {target_lang} checkpoint journal with {len(journal)} translated segments")
+            journals[target_lang] = journal
+
+        # Open workbook with the selected backend to preserve formatting
+        if owns_backend:
+            backend = create_backend()
         wb = None # Initialize wb
+        workbooks = {}  # language -> workbook it is written to: wb for the first, forks of it for the others
+        file_labels = metrics.push_labels(file=filename)
+        file_start = time.perf_counter()
         try:
-            wb = app.books.open(input_path)
-
-            # Loop through each sheet
-            for sheet in wb.sheets:
-                print(f"\n📋 Processing sheet: {sheet.name}")
-
-                # Collect data from cells that need translation
-                texts_to_translate = []
-                cell_references = []
-
-                # Scan through used data range
-                used_rng = sheet.used_range
-                if used_rng.count > 1 or used_rng.value is not None: # Only scan if sheet has data
-                    for cell in used_rng:
-                        # Check if cell.value is None before calling str()
-                        cell_value_str = str(cell.value) if cell.value is not None else ""
-                        if cell_value_str and should_translate(cell_value_str):
-                            texts_to_translate.append(clean_text(cell_value_str))
-                            cell_references.append(cell)
-                else:
-                     print(f"   ⚠️ Sheet '{sheet.name}' is empty or has no data.")
-
-                # --- START SHAPES PROCESSING FIX ---
-                # Process shapes with text
+            def save_output(target_lang, untranslated, lang_wb):
+                """Save the workbook as the ``target_lang`` output and record the result"""
+                output_path = output_path_for(input_path, output_dir, target_lang)
+                print(f"\n💾 Saving translated file to: {output_path}")
                 try:
-                    shapes_collection = sheet.api.Shapes
-                    shapes_count = shapes_collection.Count
-
-                    if shapes_count > 0:
-                        print(f"   📊 Sheet '{sheet.name}' has {shapes_count} shapes to check")
-
-                        # Process each shape by index (Excel COM API indexes from 1)
-                        for i in range(1, shapes_count + 1):
-                            shape = None # Initialize to avoid errors if .Item(i) fails
-                            try:
-                                shape = shapes_collection.Item(i)
-                                shape_text = None
-
-                                # --- Try multiple methods to get text from shape ---
-                                
-                                # Method 1: TextFrame
-                                try:
-                                    if hasattr(shape, 'TextFrame'):
-                                        if shape.TextFrame.HasText:
-                                            shape_text = shape.TextFrame.Characters().Text
-                                except:
-                                    pass
-                                
-                                # Method 2: TextFrame2
-                                if not shape_text:
-                                    try:
-                                        if hasattr(shape, 'TextFrame2'):
-                                            shape_text = shape.TextFrame2.TextRange.Text
-                                    except:
-                                        pass
-                                
-                                # Method 3: AlternativeText
-                                if not shape_text:
-                                    try:
-                                        if hasattr(shape, 'AlternativeText') and shape.AlternativeText:
-                                            shape_text = shape.AlternativeText
-                                    except:
-                                        pass
-                                
-                                # Method 4: OLEFormat (for OLE objects)
-                                if not shape_text:
-                                    try:
-                                        if hasattr(shape, 'OLEFormat') and hasattr(shape.OLEFormat, 'Object'):
-                                            if hasattr(shape.OLEFormat.Object, 'Text'):
-                                                shape_text = shape.OLEFormat.Object.Text
-                                    except:
-                                        pass
-                                
-                                # Method 5: TextEffect (for WordArt)
-                                if not shape_text:
-                                    try:
-                                        if hasattr(shape, 'TextEffect') and hasattr(shape.TextEffect, 'Text'):
-                                            shape_text = shape.TextEffect.Text
-                                    except:
-                                        pass
-                                
-                                # If text is found, add to translation list
-                                if shape_text and should_translate(shape_text):
-                                    clean_shape_text = clean_text(shape_text)
-                                    print(f"   💬 Shape {i}: Found text: {clean_shape_text[:30]}...")
-                                    texts_to_translate.append(clean_shape_text)
-                                    
-                                    # Save tuple with information for later updates:
-                                    # ('shape', sheet object, shape index, list of methods tried)
-                                    cell_references.append(('shape', sheet, i))
-
-                            except Exception as outer_e:
-                                # General error when processing shape
-                                print(f"   ⚠️ Error processing shape {i}: {str(outer_e)}")
-                                continue
-
-                except Exception as e:
-                    print(f"   ⚠️ Error processing shapes on sheet '{sheet.name}': {str(e)}")
-                # --- END SHAPES PROCESSING FIX ---
-
-
-                # Split into batches for processing
-                if not texts_to_translate:
-                     print(f"   ✅ No text to translate on sheet '{sheet.name}'.")
+                    with metrics.stage("save", language=target_lang):
+                        lang_wb.save(output_path)
+                except Exception as save_err:
+                    print(f"❌ Error saving '{output_path}': {str(save_err)}")
+                    return
+                print(f"✅ File saved successfully: {output_path}")
+
+                # Keep the journal if some text could not be translated, so a rerun resumes
+                if untranslated:
+                    print(f"   ⚠️ {untranslated} text segments kept their original text, "
+                          f"run again to resume from the checkpoint journal")
+                else:
+                    journals[target_lang].discard()
+                results[target_lang] = (output_path, not untranslated)
+
+            with metrics.stage("open"):
+                wb = backend.open(input_path)
+                # The workbook is read once; the other languages are written to
+                # forks of it, so untranslated cells are never written back
+                workbooks[target_langs[0]] = wb
+                for target_lang in target_langs[1:]:
+                    workbooks[target_lang] = wb.fork()
+
+            if PIPELINE_ROWS:
+                untranslated = translate_pipelined(workbooks, source_lang, translations, journals, run_stats)
+                for target_lang, lang_wb in workbooks.items():
+                    save_output(target_lang, untranslated[target_lang], lang_wb)
+                return results
+
+            # Extract every sheet (or text part for the xlsx backend) once for all languages
+            sections = []
+            for section_name, segments in metrics.timed_sections(wb.sections()):
+                print(f"\n📋 Processing sheet: {section_name}")
+
+                # Collect data from cells and shapes that need translation,
+                # grouping identical texts so each is translated only once
+                segment_refs = group_segments(segments, source_lang, run_stats)
+
+                if not segment_refs:
+                     print(f"   ✅ No text to translate on sheet '{section_name}'.")
                      continue # Move to next sheet
 
-                total_batches = (len(texts_to_translate) - 1) // BATCH_SIZE + 1
-                print(f"   📦 Preparing to translate {len(texts_to_translate)} text segments in {total_batches} batches.")
-
-                for i in range(0, len(texts_to_translate), BATCH_SIZE):
-                    batch_texts = texts_to_translate[i:i+BATCH_SIZE]
-                    batch_refs = cell_references[i:i+BATCH_SIZE]
-                    current_batch_num = i // BATCH_SIZE + 1
-
-                    print(f"   🔄 Translating batch {current_batch_num}/{total_batches} ({len(batch_texts)} texts)")
-
-                    # Translate batch
-                    translated_batch = translate_batch(batch_texts, source_lang, target_lang)
-
-                    # Update translated content
-                    print(f"   ✍️ Updating content for batch {current_batch_num}...")
-                    for j, ref in enumerate(batch_refs):
-                        # Check if index j is within translated_batch
-                        if j < len(translated_batch) and translated_batch[j] is not None:
-                            try:
-                                # Update content for shape and cell
-                                if isinstance(ref, tuple) and ref[0] == 'shape':
-                                    # Process shape: ref is ('shape', sheet_obj, shape_index)
-                                    _, sheet_obj, shape_index = ref # Unpack tuple
-                                    try:
-                                        # Get shape object again
-                                        shape_to_update = sheet_obj.api.Shapes.Item(shape_index)
-                                        updated = False
-                                        
-                                        # --- Try multiple methods to update text for shape ---
-                                        
-                                        # Method 1: TextFrame
-                                        try:
-                                            if hasattr(shape_to_update, 'TextFrame') and shape_to_update.TextFrame.HasText:
-                                                shape_to_update.TextFrame.Characters().Text = translated_batch[j]
-                                                updated = True
-                                        except:
-                                            pass
-                                            
-                                        # Method 2: TextFrame2
-                                        if not updated:
-                                            try:
-                                                if hasattr(shape_to_update, 'TextFrame2'):
-                                                    shape_to_update.TextFrame2.TextRange.Text = translated_batch[j]
-                                                    updated = True
-                                            except:
-                                                pass
-                                                
-                                        # Method 3: AlternativeText
-                                        if not updated:
-                                            try:
-                                                if hasattr(shape_to_update, 'AlternativeText'):
-                                                    shape_to_update.AlternativeText = translated_batch[j]
-                                                    updated = True
-                                            except:
-                                                pass
-                                                
-                                        # Method 4: TextEffect (for WordArt)
-                                        if not updated:
-                                            try:
-                                                if hasattr(shape_to_update, 'TextEffect') and hasattr(shape_to_update.TextEffect, 'Text'):
-                                                    shape_to_update.TextEffect.Text = translated_batch[j]
-                                                    updated = True
-                                            except:
-                                                pass
-                                                
-                                        # Method 5: OLEFormat
-                                        if not updated:
-                                            try:
-                                                if hasattr(shape_to_update, 'OLEFormat') and hasattr(shape_to_update.OLEFormat, 'Object'):
-                                                    if hasattr(shape_to_update.OLEFormat.Object, 'Text'):
-                                                        shape_to_update.OLEFormat.Object.Text = translated_batch[j]
-                                                        updated = True
-                                            except:
-                                                pass
-                                                
-                                        if updated:
-                                            print(f"   ✅ Updated text for shape {shape_index} on sheet '{sheet_obj.name}'")
-                                        else:
-                                            print(f"   ⚠️ Could not update text for shape {shape_index} on sheet '{sheet_obj.name}' after trying all methods")
-                                        
-                                    except Exception as update_err:
-                                        print(f"   ⚠️ Error updating shape {shape_index} on sheet '{sheet_obj.name}': {str(update_err)}")
-                                elif isinstance(ref, xw.main.Range):
-                                    # Is a cell
-                                    ref.value = translated_batch[j]
-                                else:
-                                    print(f"   ⚠️ Unknown reference type: {type(ref)}")
-
-                            except Exception as update_single_err:
-                                # Catch general errors when updating a specific cell/shape
-                                ref_info = f"Shape index {ref[2]} on sheet {ref[1].name}" if isinstance(ref, tuple) else f"Cell {ref.address}"
-                                print(f"   ⚠️ Could not update content for {ref_info}: {str(update_single_err)}")
-                        else:
+                segment_count = sum(len(refs) for refs in segment_refs.values())
+                run_stats.add("segments", segment_count)
+                print(f"   📦 Found {segment_count} text segments ({len(segment_refs)} unique).")
+                sections.append((section_name, segment_refs))
+
+            text_refs = {}  # text -> references in every section
+            for _, segment_refs in sections:
+                for text, refs in segment_refs.items():
+                    text_refs.setdefault(text, []).extend(refs)
+            written = {target_lang: {} for target_lang in target_langs}  # language -> {reference: translation}
+
+            def write_segment(target_lang, translated, refs):
+                """Write a translation to the workbook of ``target_lang``, once per reference"""
+                lang_wb, lang_written = workbooks[target_lang], written[target_lang]
+                for ref in refs:
+                    if lang_written.get(ref) == translated:
+                        continue
+                    try:
+                        lang_wb.write(ref, translated)
+                        lang_written[ref] = translated
+                    except Exception as update_single_err:
+                        # Catch general errors when updating a specific cell/shape
+                        print(f"   ⚠️ Could not update content for {lang_wb.describe(ref)}: {str(update_single_err)}")
+
+            def on_translated(text, translated):
+                if translated is not None:
+                    write_segment(target_langs[0], translated, text_refs[text])
+
+            # Segments of the first language are written back as soon as they arrive
+            translate_languages(list(text_refs), source_lang, target_langs, translations, journals, on_translated)
+
+            for target_lang in target_langs:
+                lang_translations = translations.get(target_lang, {})
+
+                # Update translated content
+                for section_name, segment_refs in sections:
+                    print(f"   ✍️ Updating {target_lang} content for sheet '{section_name}'...")
+                    write_start = time.perf_counter()
+                    for text, refs in segment_refs.items():
+                        translated = lang_translations.get(text)
+                        if translated is None:
                             # Notify if a translation is missing for a reference
-                            ref_info = f"Shape index {ref[2]} on sheet {ref[1].name}" if isinstance(ref, tuple) else f"Cell {ref.address}"
-                            print(f"   ⚠️ Missing translation for {ref_info} (index {j} in batch). Keeping original value.")
-
+                            for ref in refs:
+                                print(f"   ⚠️ Missing {target_lang} translation for {wb.describe(ref)}. Keeping original value.")
+                            continue
+                        write_segment(target_lang, translated, refs)
+                    metrics.run_metrics.record("stage", stage="write", seconds=round(time.perf_counter() - write_start, 6),
+                                               language=target_lang, sheet=section_name)
 
-            # Save file with original format
-            print(f"\n💾 Saving translated file to: {output_path}")
-            wb.save(output_path)
-            print(f"✅ File saved successfully: {output_path}")
+                # Save file with original format
+                save_output(target_lang, sum(1 for text in text_refs if text not in lang_translations),
+                            workbooks[target_lang])
 
         except Exception as wb_process_err:
              print(f"❌ Error processing workbook '{filename}': {str(wb_process_err)}")
-             # Ensure workbook is closed if error occurs before saving
-             if wb is not None:
-                 try:
-                     wb.close()
-                 except Exception as close_err:
-                     print(f"   ⚠️ Error trying to close workbook after processing error: {close_err}")
         finally:
-            # Close workbook (if not already closed) and Excel app
-            # wb.close() has been called in the except block if needed
-            # Just need to ensure app is closed
-            if 'app' in locals() and app.pid: # Check if app exists and is still running
-                 app.quit()
-                 print("🧊 Excel application closed.")
+            for journal in journals.values():
+                journal.close()
+            # Close the forks and the workbook, and the backend (e.g. the Excel app) if we started it
+            for lang_wb in list(workbooks.values())[1:]:
+                try:
+                    with metrics.stage("close"):
+                        lang_wb.close()
+                except Exception as close_err:
+                    print(f"   ⚠️ Error trying to close workbook: {close_err}")
+            if wb is not None:
+                try:
+                    with metrics.stage("close"):
+                        wb.close()
+                except Exception as close_err:
+                    print(f"   ⚠️ Error trying to close workbook: {close_err}")
+            if owns_backend:
+                backend.close()
+            metrics.run_metrics.record("stage", stage="file", seconds=round(time.perf_counter() - file_start, 6))
+            metrics.pop_labels(file_labels)
 
-        return output_path
+        return results
 
     except Exception as e:
         print(f"❌ Critical error when starting Excel file processing '{input_path}': {str(e)}")
-        # Ensure Excel app is closed if error occurs right at the beginning
-        if 'app' in locals() and app.pid:
-            app.quit()
-        return None
+        # Ensure the backend is closed if error occurs right at the beginning
+        for journal in journals.values():
+            journal.close()
+        if owns_backend and backend is not None:
+            backend.close()
+        return results
+
+def prescan_texts(file_paths, source_lang=None, backend=None):
+    """Collect the unique translatable texts of several workbooks"""
+    owns_backend = backend is None
+    if owns_backend:
+        backend = create_backend()
+    texts = {}
+    try:
+        for file_path in file_paths:
+            wb = None
+            try:
+                wb = backend.open(file_path)
+                for _, segments in wb.sections():
+                    texts.update(dict.fromkeys(group_segments(segments, source_lang)))
+            except Exception as scan_err:
+                print(f"   ⚠️ Could not pre-scan '{os.path.basename(file_path)}': {str(scan_err)}")
+            finally:
+                if wb is not None:
+                    wb.close()
+    finally:
+        if owns_backend:
+            backend.close()
+    return list(texts)
+
+# Per-process state of --workers pool processes
+worker_backend = None
+worker_translations = None
+
+def init_worker(backend_name, cache_path, pipeline_rows, limiter, translations):
+    """Set up a pool process: shared limiter, settings and a warm backend"""
+    global WORKBOOK_BACKEND, TRANSLATION_CACHE, PIPELINE_ROWS, llm_limiter, worker_backend, worker_translations
+    global llm_loop, llm_loop_lock, llm_pool, llm_pool_lock, translation_memory, glossary_lock, run_stats
+    # A forked process inherits the LLM loop without the thread that runs it,
+    # clients and a SQLite connection of the parent, and locks that another
+    # thread of the parent may have held: start all of them over
+    llm_loop, llm_loop_lock = None, threading.Lock()
+    llm_pool, llm_pool_lock = None, threading.Lock()
+    translation_memory = None
+    glossary_lock = threading.Lock()
+    glossaries.clear()
+    classifiers.clear()
+    run_stats = metrics.Counters()
+    metrics.run_metrics = metrics.Metrics()
+    WORKBOOK_BACKEND = backend_name
+    TRANSLATION_CACHE = cache_path
+    PIPELINE_ROWS = pipeline_rows
+    llm_limiter = limiter
+    worker_translations = {target_lang: dict(texts) for target_lang, texts in translations.items()}
+    # Keep the backend (e.g. the Excel app) open for every file of this worker
+    worker_backend = create_backend()
+    multiprocessing.util.Finalize(worker_backend, worker_backend.close, exitpriority=10)
+
+def process_file_in_worker(file_path, output_dir, source_lang, target_langs, input_hash=None):
+    """Translate one file in a pool process, return (outputs, seconds, stats, metric events)"""
+    run_stats.clear()
+    metrics.run_metrics.clear()
+    start_time = time.time()
+    outputs = process_excel(file_path, output_dir, source_lang, target_langs,
+                            backend=worker_backend, translations=worker_translations, input_hash=input_hash)
+    return outputs, time.time() - start_time, run_stats.snapshot(), metrics.run_metrics.events
+
+def process_files_in_pool(jobs, output_dir, source_lang, translations, workers, input_hashes=None):
+    """Translate files in parallel worker processes sharing one LLM limiter
+
+    ``jobs`` maps each file path to its target languages. Returns a list of
+    (file path, {language: (output path or None, complete)}, seconds).
+    """
+    input_hashes = input_hashes or {}
+    results = []
+    manager = LimiterManager()
+    manager.start()
+    try:
+        limiter = manager.RateLimiter(LLM_RPM, LLM_TPM, LLM_CONCURRENCY)
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                 initargs=(WORKBOOK_BACKEND, TRANSLATION_CACHE, PIPELINE_ROWS, limiter, translations)) as pool:
+            futures = {pool.submit(process_file_in_worker, file_path, output_dir, source_lang, target_langs,
+                                   input_hashes.get(file_path)): file_path
+                       for file_path, target_langs in jobs.items()}
+            for future in as_completed(futures):
+                file_path = futures[future]
+                try:
+                    outputs, elapsed, stats, events = future.result()
+                    run_stats.update(stats)
+                    metrics.run_metrics.extend(events)
+                except Exception as worker_err:
+                    print(f"❌ Worker failed on '{os.path.basename(file_path)}': {str(worker_err)}")
+                    outputs, elapsed = {target_lang: (None, False) for target_lang in jobs[file_path]}, 0.0
+                results.append((file_path, outputs, elapsed))
+    finally:
+        manager.shutdown()
+    return results
+
+def process_directory(input_dir, output_dir, source_lang, target_langs, prescan=False, workers=1, force=False):
+    """Process all Excel files in the input directory
+
+    Each file is read once and translated into every language of
+    ``target_langs``. Translations are shared between all files of the run,
+    so a string is sent to the LLM only once per language. With ``prescan``
+    every file is scanned up front and the run's unique strings are translated
+    together before any file is written.
+    With ``workers`` > 1 files are processed in parallel worker processes, each
+    keeping its own backend open across files.
+    Files translated completely by an earlier run with the same content,
+    languages, model and prompt are skipped unless ``force`` is set.
+    """
+    if isinstance(target_langs, str):
+        target_langs = [target_langs]
 
-def process_directory(input_dir, output_dir, source_lang, target_lang):
-    """Process all Excel files in the input directory"""
     # Ensure directory path exists
     if not os.path.isdir(input_dir):
         print(f"❌ Directory does not exist or is not a directory: {input_dir}")
@@ -432,42 +1077,186 @@ def process_directory(input_dir, output_dir, source_lang, target_lang):
 
     print(f"🔍 Found {len(excel_files)} Excel files in input directory: {input_dir}")
 
-    # Process each file
-    successful_files = []
-    failed_files = []
+    # Skip Excel temporary files (usually starting with ~$)
     for file_path in excel_files:
-        # Skip Excel temporary files (usually starting with ~$)
         if os.path.basename(file_path).startswith('~$'):
             print(f"   ⏩ Skipping temporary file: {os.path.basename(file_path)}")
-            continue
+    excel_files = [f for f in excel_files if not os.path.basename(f).startswith('~$')]
+
+    # Skip languages whose translation of a file is already complete and unchanged
+    manifest = Manifest(os.path.join(output_dir, MANIFEST_FILE))
+    contexts = {target_lang: cache_context(source_lang, target_lang) for target_lang in target_langs}
+    input_hashes = {file_path: file_hash(file_path) for file_path in excel_files}
+    jobs = {}  # file path -> target languages still to translate
+    for file_path in excel_files:
+        pending_langs = [target_lang for target_lang in target_langs
+                         if force or not manifest.completed(job_key(input_hashes[file_path], contexts[target_lang]),
+                                                            output_path_for(file_path, output_dir, target_lang))]
+        if len(pending_langs) < len(target_langs):
+            skipped = [target_lang for target_lang in target_langs if target_lang not in pending_langs]
+            print(f"   ⏩ Skipping unchanged file: {os.path.basename(file_path)} ({', '.join(skipped)})")
+        if pending_langs:
+            jobs[file_path] = pending_langs
+    if not jobs:
+        print("✅ All files are already translated, use --force to translate them again")
+        return
+
+    run_stats.clear()
+    metrics.run_metrics.clear()
+    translations = {}  # language -> {text: translation}
+    if prescan:
+        print("\n🔎 Pre-scanning all files for unique text...")
+        with metrics.stage("prescan"):
+            unique_texts = prescan_texts(list(jobs), source_lang)
+        print(f"   Found {len(unique_texts)} unique text segments across {len(jobs)} files")
+        translate_languages(unique_texts, source_lang, sorted({lang for langs in jobs.values() for lang in langs}),
+                            translations)
 
-        output_file = process_excel(file_path, output_dir, source_lang, target_lang)
-        if output_file:
-            successful_files.append(os.path.basename(file_path))
-        else:
-            failed_files.append(os.path.basename(file_path))
+    # Process each file
+    if workers > 1 and len(jobs) > 1:
+        print(f"👷 Processing files with {workers} workers")
+        results = process_files_in_pool(jobs, output_dir, source_lang, translations, workers, input_hashes)
+    else:
+        results = []
+        backend = create_backend()
+        try:
+            for file_path, pending_langs in jobs.items():
+                start_time = time.time()
+                outputs = process_excel(file_path, output_dir, source_lang, pending_langs, backend=backend,
+                                        translations=translations, input_hash=input_hashes[file_path])
+                results.append((file_path, outputs, time.time() - start_time))
+        finally:
+            backend.close()
+
+    # Only fully translated outputs are skipped next time
+    for file_path, outputs, _ in results:
+        for target_lang, (output_file, complete) in outputs.items():
+            if output_file and complete:
+                manifest.record(job_key(input_hashes[file_path], contexts[target_lang]), file_path, output_file)
+
+    successful_files = [os.path.basename(output_file) for _, outputs, _ in results
+                        for output_file, _ in outputs.values() if output_file]
+    failed_files = [f"{os.path.basename(path)} ({target_lang})" for path, outputs, _ in results
+                    for target_lang, (output_file, _) in outputs.items() if not output_file]
+
+    print("\n⏱️ Time per file:")
+    for file_path, outputs, elapsed in sorted(results, key=lambda result: -result[2]):
+        ok = all(output_file for output_file, _ in outputs.values())
+        print(f"   {'✅' if ok else '❌'} {os.path.basename(file_path)}: {elapsed:.2f} seconds")
 
     print(f"\n✅ Successful: {len(successful_files)} files")
     if failed_files:
         print(f"❌ Failed: {len(failed_files)} files: {', '.join(failed_files)}")
-
-@Gooey(program_name="AI Excel Translator")
-def main():
+    if run_stats["segments"]:
+        print(f"🔁 Sent {run_stats['unique_segments']} unique strings for {run_stats['segments']} text segments "
+              f"in {run_stats['llm_batches']} batches ({run_stats['llm_calls']} LLM calls)")
+    if skipped := {key[len("skipped_"):]: count for key, count in run_stats.items() if key.startswith("skipped_")}:
+        print(f"⏭️ Skipped {sum(skipped.values())} text segments that need no translation: "
+              + ", ".join(f"{reason} {count}" for reason, count in sorted(skipped.items(), key=lambda item: -item[1])))
+    if run_stats["templated_segments"]:
+        print(f"🧩 Translated {run_stats['templated_segments']} text segments through {run_stats['templates']} templates"
+              + (f" ({run_stats['template_fallbacks']} translated one by one)" if run_stats["template_fallbacks"] else ""))
+    if run_stats["redispatched_segments"]:
+        print(f"🔂 Re-dispatched {run_stats['redispatched_segments']} segments "
+              f"({run_stats['mismatched_batches']} misaligned batches, {run_stats['partial_batches']} partial replies)")
+    if run_stats["resumed_segments"]:
+        print(f"⏯️ Resumed {run_stats['resumed_segments']} text segments from checkpoint journals")
+    if run_stats["endpoint_retries"]:
+        print(f"🔀 Retried {run_stats['endpoint_retries']} failed requests on another LLM endpoint "
+              f"({run_stats['endpoint_ejections']} endpoint ejections)")
+    if run_stats["failed_segments"]:
+        print(f"⚠️ {run_stats['failed_segments']} text segments could not be translated, run again to resume")
+    if lookups := run_stats["cache_hits"] + run_stats["cache_misses"]:
+        print(f"💾 Translation cache: {run_stats['cache_hits']} hits, {run_stats['cache_misses']} misses "
+              f"({run_stats['cache_hits'] / lookups:.0%} hit rate)")
+    write_metrics()
+
+def write_metrics():
+    """Write the run's timings and LLM usage to the configured metrics files"""
+    summary = metrics.run_metrics.summary()
+    calls = summary["llm_calls"]
+    if calls:
+        requests = calls.get("ok", 0) + calls.get("error", 0)
+        print(f"📈 LLM usage: {int(calls.get('prompt_tokens', 0))} prompt"
+              + (f" ({int(calls['cached_tokens'])} cached)" if calls.get("cached_tokens") else "")
+              + f" + {int(calls.get('completion_tokens', 0))} completion tokens, "
+              f"{calls.get('prompt_tokens', 0) / max(calls.get('ok', 0), 1):.0f} prompt tokens per request, "
+              f"{calls.get('latency_seconds', 0):.1f}s request time, {calls.get('wait_seconds', 0):.1f}s rate limit wait")
+        if calls.get("glossary_requests"):
+            print(f"📖 Glossary: {int(calls['glossary_terms'])} terms (~{int(calls['glossary_tokens'])} tokens) "
+                  f"added to {int(calls['glossary_requests'])} of {int(requests)} requests")
+    endpoints = summary["endpoints"]
+    if len(endpoints) > 1 or any(totals.get("error") for totals in endpoints.values()):
+        print("🔀 LLM endpoints: " + ", ".join(
+            f"{name} {int(totals.get('ok', 0))} ok / {int(totals.get('error', 0))} failed"
+            + (f" ({totals['latency_seconds'] / (totals.get('ok', 0) + totals.get('error', 0)):.2f}s per request)")
+            + (f", ejected {int(totals['ejected'])} times" if totals.get("ejected") else "")
+            for name, totals in endpoints.items()))
+    if summary["stages"]:
+        stages = sorted(summary["stages"].items(), key=lambda item: -item[1])
+        print("📈 Time per stage: " + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in stages if name != "file"))
+    try:
+        if METRICS_JSONL:
+            metrics.run_metrics.write_jsonl(METRICS_JSONL, run_stats)
+            print(f"📈 Metrics appended to {METRICS_JSONL}")
+        if METRICS_PROMETHEUS:
+            metrics.run_metrics.write_prometheus(METRICS_PROMETHEUS, run_stats)
+            print(f"📈 Prometheus metrics written to {METRICS_PROMETHEUS}")
+    except OSError as metrics_err:
+        print(f"⚠️ Could not write metrics: {str(metrics_err)}")
+
+def parse_languages(value):
+    """Parse a comma separated list of language codes, e.g. 'en,vi,ko'"""
+    codes = list(dict.fromkeys(code.strip() for code in value.split(',') if code.strip()))
+    unknown = [code for code in codes if code not in lang_map]
+    if not codes or unknown:
+        raise argparse.ArgumentTypeError(f"unknown language code(s): {', '.join(unknown) or value!r}")
+    return codes
+
+def create_parser(gui=False):
+    """Command line arguments, with Gooey widgets when ``gui`` is set"""
     # Create language help text dynamically
     lang_help = ', '.join(f"{code}: {name}" for code, name in lang_map.items())
-    
-    parser = GooeyParser(description='Translate Excel files from input directory to output directory')
+
+    description = 'Translate Excel files from input directory to output directory'
+    if gui:
+        from gooey import GooeyParser
+        parser = GooeyParser(description=description)
+    else:
+        parser = argparse.ArgumentParser(description=description)
+    dir_chooser = {'widget': 'DirChooser'} if gui else {}
     parser.add_argument('--input_dir', dest='input_dir', required=True,
                         help='Input directory containing Excel files to translate (required)',
-                        widget='DirChooser')
+                        **dir_chooser)
     parser.add_argument('--output_dir', dest='output_dir', required=False, default='output',
                         help='Output directory for translated files (default: output folder in current directory)',
-                        widget='DirChooser')
+                        **dir_chooser)
     parser.add_argument('--from', dest='source_lang', choices=lang_map.keys(), required=True, default="ja",
                         help=f'Source language ({lang_help})')
-    parser.add_argument('--to', dest='target_lang', choices=lang_map.keys(), required=True, default="en",
-                        help=f'Target language ({lang_help})')
-    args = parser.parse_args()
+    parser.add_argument('--to', dest='target_langs', type=parse_languages, required=True, default="en",
+                        help=f'Target language, or several separated by commas, e.g. en,vi,ko ({lang_help})')
+    parser.add_argument('--prescan', dest='prescan', action='store_true',
+                        help='Scan all files first and translate the unique strings of the whole run together')
+    parser.add_argument('--workers', dest='workers', type=int, required=False, default=1,
+                        help='Number of files to process in parallel, each worker keeps its own Excel instance open (default: 1)')
+    parser.add_argument('--no-cache', dest='no_cache', action='store_true',
+                        help='Do not read or write the persistent translation cache')
+    parser.add_argument('--force', dest='force', action='store_true',
+                        help='Translate files again even if an earlier run already translated them unchanged')
+    parser.add_argument('--backend', dest='backend', choices=['excel', 'xlsx'], required=False, default=WORKBOOK_BACKEND,
+                        help='Workbook backend: excel (needs Microsoft Excel) or xlsx (pure Python, works without Excel)')
+    parser.add_argument('--pipeline-rows', dest='pipeline_rows', type=int, required=False, default=PIPELINE_ROWS,
+                        help='Read, translate and write very large sheets this many rows at a time, 0 = off (default: PIPELINE_ROWS or 0)')
+    return parser
+
+def run(args):
+    """Translate the input directory with the parsed command line arguments"""
+    global WORKBOOK_BACKEND, TRANSLATION_CACHE, PIPELINE_ROWS
+
+    WORKBOOK_BACKEND = args.backend
+    PIPELINE_ROWS = args.pipeline_rows
+    if args.no_cache:
+        TRANSLATION_CACHE = "off"
 
     # Determine input directory
     input_dir = args.input_dir
@@ -498,17 +1287,41 @@ def main():
 
     print("")
 
-    # Determine source and target language
+    # Determine source and target languages
     source_lang = lang_map.get(args.source_lang)
-    target_lang = lang_map.get(args.target_lang)
-    if not source_lang or not target_lang:
-        print(f"❌ Invalid language combination: from {args.source_lang} to {args.target_lang}")
+    target_langs = [lang_map[code] for code in args.target_langs if code in lang_map]
+    if not source_lang or len(target_langs) != len(args.target_langs):
+        print(f"❌ Invalid language combination: from {args.source_lang} to {', '.join(args.target_langs)}")
         return
 
-    print(f"🎯 Translation direction: {source_lang} to {target_lang}")
+    print(f"🎯 Translation direction: {source_lang} to {', '.join(target_langs)}")
 
     # Process all files in the input directory
-    process_directory(input_dir, output_dir, args.source_lang, args.target_lang)
+    process_directory(input_dir, output_dir, args.source_lang, args.target_langs, prescan=args.prescan, workers=args.workers,
+                      force=args.force)
+
+def main():
+    """Show the Gooey window, or parse the command line directly with --headless
+
+    The GUI stack is only imported when the window is actually shown.
+    """
+    headless = "--headless" in sys.argv
+    if headless:
+        sys.argv.remove("--headless")
+    else:
+        try:
+            from gooey import Gooey
+        except ImportError:
+            print("⚠️ Gooey is not installed, running without the GUI")
+            headless = True
+    if headless:
+        run(create_parser().parse_args())
+        return
+
+    @Gooey(program_name="AI Excel Translator")
+    def gui_main():
+        run(create_parser(gui=True).parse_args())
+    gui_main()
 
 if __name__ == "__main__":
     # Note: Running this script may take time depending on the number of files and text to translate
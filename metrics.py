@@ -0,0 +1,207 @@
+"""Structured timings and LLM usage for a run.
+
+Stages (opening a workbook, scanning cells, probing shapes, translating,
+writing back, saving, ...) are timed with ``stage``, and every LLM request is
+recorded with its latency, rate limiter wait and token usage.  Labels such as
+the file are set with ``push_labels`` and attached to everything recorded
+until they are popped again.
+
+At the end of a run the events can be written as JSON lines and the totals
+as a Prometheus textfile (for node_exporter's textfile collector).
+"""
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+PREFIX = "excel_translator"
+
+_labels = contextvars.ContextVar("metrics_labels", default={})
+
+
+class Counters(Counter):
+    """Run counters that several threads add to at the same time
+
+    ``counters[name] += n`` reads and writes in two steps and loses updates
+    under contention, so counts are added with ``add``.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()  # Before Counter.__init__, which calls update
+        super().__init__()
+
+    def add(self, name, count=1):
+        with self._lock:
+            self[name] += count
+
+    def update(self, *args, **kwargs):
+        with self._lock:
+            super().update(*args, **kwargs)
+
+    def clear(self):
+        with self._lock:
+            super().clear()
+
+    def snapshot(self):
+        """A plain dict copy, safe to take while counts are being added"""
+        with self._lock:
+            return dict(self)
+
+
+class Metrics:
+    """Thread-safe list of recorded events"""
+
+    def __init__(self):
+        self.events = []
+        self._lock = threading.Lock()
+
+    def record(self, kind, **fields):
+        event = {"kind": kind, "time": round(time.time(), 3), **_labels.get(), **fields}
+        with self._lock:
+            self.events.append(event)
+        return event
+
+    def extend(self, events):
+        """Add events recorded elsewhere, e.g. in a worker process"""
+        with self._lock:
+            self.events.extend(events)
+
+    def clear(self):
+        with self._lock:
+            self.events = []
+
+    def summary(self):
+        """Totals per stage, per file, for all LLM calls and per LLM endpoint"""
+        stages = defaultdict(float)
+        files = {}
+        calls = defaultdict(float)
+        endpoints = defaultdict(lambda: defaultdict(float))
+        for event in list(self.events):
+            if event["kind"] == "stage":
+                stages[event["stage"]] += event["seconds"]
+                if event["stage"] == "file":
+                    files[event.get("file")] = event["seconds"]
+            elif event["kind"] == "llm_call":
+                calls[event["status"]] += 1
+                calls["latency_seconds"] += event["latency"]
+                calls["wait_seconds"] += event["wait"]
+                calls["prompt_tokens"] += event["prompt_tokens"]
+                calls["cached_tokens"] += event.get("cached_tokens", 0)
+                calls["completion_tokens"] += event["completion_tokens"]
+                if event.get("glossary_terms"):
+                    calls["glossary_requests"] += 1
+                    calls["glossary_terms"] += event["glossary_terms"]
+                    calls["glossary_tokens"] += event["glossary_tokens"]
+                if "endpoint" in event:
+                    endpoints[event["endpoint"]][event["status"]] += 1
+                    endpoints[event["endpoint"]]["latency_seconds"] += event["latency"]
+            elif event["kind"] == "endpoint_ejected":
+                endpoints[event["endpoint"]]["ejected"] += 1
+        return {"stages": dict(stages), "files": files, "llm_calls": dict(calls),
+                "endpoints": {name: dict(totals) for name, totals in endpoints.items()}}
+
+    def write_jsonl(self, path, counters=None):
+        """Append every event and a closing summary line to ``path``"""
+        summary = {"kind": "summary", "time": round(time.time(), 3), **self.summary(), "counters": dict(counters or {})}
+        with open(path, "a", encoding="utf-8") as f:
+            for event in list(self.events) + [summary]:
+                f.write(json.dumps(event, ensure_ascii=False) + "\n")
+
+    def write_prometheus(self, path, counters=None):
+        """Write the totals in the Prometheus text format, replacing ``path`` atomically"""
+        summary = self.summary()
+        calls = summary["llm_calls"]
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {PREFIX}_{name} {kind}")
+            for sample_labels, value in samples:
+                label_text = ",".join(f'{key}="{_escape(label)}"' for key, label in sample_labels.items())
+                lines.append(f"{PREFIX}_{name}{{{label_text}}} {value}" if label_text else f"{PREFIX}_{name} {value}")
+
+        metric("stage_seconds", "gauge", "Seconds spent in each stage during the last run",
+               [({"stage": stage}, round(seconds, 6)) for stage, seconds in sorted(summary["stages"].items())])
+        metric("file_seconds", "gauge", "Seconds spent on each file during the last run",
+               [({"file": name}, round(seconds, 6)) for name, seconds in sorted(summary["files"].items())])
+        metric("llm_calls", "gauge", "LLM requests during the last run by outcome",
+               [({"status": status}, int(calls.get(status, 0))) for status in ("ok", "error")])
+        metric("llm_latency_seconds", "gauge", "Total latency of the LLM requests during the last run",
+               [({}, round(calls.get("latency_seconds", 0), 6))])
+        metric("llm_wait_seconds", "gauge", "Total time LLM requests waited for the rate limiter during the last run",
+               [({}, round(calls.get("wait_seconds", 0), 6))])
+        metric("llm_tokens", "gauge", "Tokens used by the LLM requests during the last run",
+               [({"type": "prompt"}, int(calls.get("prompt_tokens", 0))),
+                ({"type": "cached"}, int(calls.get("cached_tokens", 0))),
+                ({"type": "completion"}, int(calls.get("completion_tokens", 0)))])
+        metric("llm_glossary_tokens", "gauge", "Estimated prompt tokens of the glossary terms added to LLM requests during the last run",
+               [({}, int(calls.get("glossary_tokens", 0)))])
+        metric("llm_endpoint_calls", "gauge", "LLM requests during the last run by endpoint and outcome",
+               [({"endpoint": name, "status": status}, int(totals.get(status, 0)))
+                for name, totals in sorted(summary["endpoints"].items()) for status in ("ok", "error")])
+        metric("llm_endpoint_latency_seconds", "gauge", "Total latency of the LLM requests of each endpoint during the last run",
+               [({"endpoint": name}, round(totals.get("latency_seconds", 0), 6))
+                for name, totals in sorted(summary["endpoints"].items())])
+        metric("llm_endpoint_ejections", "gauge", "Times each endpoint was ejected by the circuit breaker during the last run",
+               [({"endpoint": name}, int(totals.get("ejected", 0))) for name, totals in sorted(summary["endpoints"].items())])
+        metric("run_count", "gauge", "Counters of the last run (segments, batches, retries, mismatches, ...)",
+               [({"counter": name}, value) for name, value in sorted((counters or {}).items())])
+        metric("last_run_timestamp_seconds", "gauge", "Time the last run finished", [({}, round(time.time(), 3))])
+
+        temp_path = path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(temp_path, path)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+# Events of the current process
+run_metrics = Metrics()
+
+
+def current_labels():
+    return dict(_labels.get())
+
+
+def push_labels(**values):
+    """Attach labels (file, sheet, language, ...) to everything recorded from
+    now on, until ``pop_labels`` is called with the returned token"""
+    return _labels.set({**_labels.get(), **values})
+
+
+def pop_labels(token):
+    _labels.reset(token)
+
+
+async def with_labels(values, coroutine):
+    """Run a coroutine with the labels captured in another thread"""
+    _labels.set(values)
+    return await coroutine
+
+
+@contextmanager
+def stage(name, **values):
+    """Time the enclosed block as stage ``name``"""
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        run_metrics.record("stage", stage=name, seconds=round(time.perf_counter() - start_time, 6), **values)
+
+
+def timed_sections(sections, name="extract"):
+    """Iterate (section name, ...) items, timing how long each one takes to produce"""
+    sections = iter(sections)
+    while True:
+        start_time = time.perf_counter()
+        section = next(sections, None)
+        if section is None:
+            return
+        run_metrics.record("stage", stage=name, seconds=round(time.perf_counter() - start_time, 6), sheet=section[0])
+        yield section
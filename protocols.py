@@ -0,0 +1,289 @@
+"""Wire formats used to send a batch of segments to the LLM and read the reply.
+
+- ``separator``: segments joined with a delimiter.  Compact, but one dropped or
+  invented delimiter shifts every following segment, so a reply with the wrong
+  number of parts can only be retried as a whole.
+- ``numbered``: one ``[n] text`` line per segment.
+- ``json``: a JSON object mapping segment numbers to texts, optionally
+  enforced with a JSON schema ``response_format``.
+
+The numbered and JSON formats are indexed: every correctly tagged segment of
+a partial or damaged reply is kept and only the missing numbers are requested
+again.  All parsers are incremental so they also work on streamed replies.
+"""
+import json
+import re
+
+
+class SeparatorParser:
+    """Split a reply on the separator; a part is complete once the next
+    separator arrives"""
+
+    def __init__(self, separator):
+        self.separator = separator
+        self.buffer = ""
+        self.count = 0
+
+    def feed(self, chunk):
+        self.buffer += chunk
+        parts = self.buffer.split(self.separator)
+        self.buffer = parts.pop()
+        return self._number(parts)
+
+    def close(self):
+        part, self.buffer = self.buffer, ""
+        return self._number([part])
+
+    def _number(self, parts):
+        segments = [(self.count + i, part) for i, part in enumerate(parts)]
+        self.count += len(parts)
+        return segments
+
+
+class NumberedParser:
+    """Parse ``[n] text`` lines; lines without a marker continue the previous
+    segment, which is complete once the next marker line starts"""
+
+    MARKER = re.compile(r'^\s*\[(\d+)\]\s?(.*)$')
+
+    def __init__(self, count):
+        self.count = count
+        self.buffer = ""
+        self.current = None  # (index, [lines])
+        self.seen = set()
+
+    def feed(self, chunk):
+        self.buffer += chunk
+        lines = self.buffer.split("\n")
+        self.buffer = lines.pop()
+        segments = []
+        for line in lines:
+            segments.extend(self._line(line))
+        return segments
+
+    def close(self):
+        segments = self._line(self.buffer) if self.buffer else []
+        self.buffer = ""
+        segments.extend(self._finish())
+        return segments
+
+    def _line(self, line):
+        match = self.MARKER.match(line)
+        if not match:
+            if self.current is not None and line.strip():
+                self.current[1].append(line.strip())
+            return []
+        segments = self._finish()
+        index = int(match.group(1)) - 1
+        # Ignore numbers that were never sent and repeated numbers
+        if 0 <= index < self.count and index not in self.seen:
+            self.current = (index, [match.group(2).strip()])
+        return segments
+
+    def _finish(self):
+        if self.current is None:
+            return []
+        index, lines = self.current
+        self.current = None
+        self.seen.add(index)
+        return [(index, " ".join(line for line in lines if line))]
+
+
+class JsonParser:
+    """Pick ``"n": "text"`` pairs out of a JSON object as soon as each one is
+    complete, so a truncated or slightly malformed object is still usable"""
+
+    PAIR = re.compile(r'"(\d+)"\s*:\s*"((?:[^"\\]|\\.)*)"\s*[,}]')
+
+    def __init__(self, count):
+        self.count = count
+        self.buffer = ""
+        self.position = 0
+        self.seen = set()
+
+    def feed(self, chunk):
+        self.buffer += chunk
+        segments = []
+        for match in self.PAIR.finditer(self.buffer, self.position):
+            self.position = match.end()
+            segments.extend(self._pair(match.group(1), match.group(2)))
+        return segments
+
+    def close(self):
+        # A final pair may be missing its closing brace
+        segments = self.feed("}")
+        return segments
+
+    def _pair(self, key, raw):
+        index = int(key) - 1
+        if not 0 <= index < self.count or index in self.seen:
+            return []
+        try:
+            text = json.loads(f'"{raw}"')
+        except ValueError:
+            return []
+        self.seen.add(index)
+        return [(index, text)]
+
+
+class SeparatorProtocol:
+    name = "separator"
+    indexed = False
+
+    def __init__(self, separator):
+        self.separator = separator
+        self.rule = f'Translate all segments separated by "{separator}" and keep them separated with the same delimiter'
+
+    def instruction(self, source, target):
+        return f"Translate the following text from {source} to {target}, keeping segments separated by '{self.separator}'"
+
+    def format(self, texts):
+        return self.separator.join(texts)
+
+    def parser(self, count):
+        return SeparatorParser(self.separator)
+
+    def response_format(self, count):
+        return None
+
+
+class NumberedProtocol:
+    name = "numbered"
+    indexed = True
+    rule = 'Translate every numbered segment and start each translated segment with its original "[n]" marker on a new line'
+
+    def instruction(self, source, target):
+        return f"Translate the following numbered segments from {source} to {target}, one '[n] translation' line per segment"
+
+    def format(self, texts):
+        return "\n".join(f"[{i}] {text}" for i, text in enumerate(texts, 1))
+
+    def parser(self, count):
+        return NumberedParser(count)
+
+    def response_format(self, count):
+        return None
+
+
+class JsonProtocol:
+    name = "json"
+    indexed = True
+    rule = 'Translate every value of the JSON object you receive and reply with a JSON object that has exactly the same keys'
+
+    def __init__(self, schema=False):
+        self.schema = schema
+
+    def instruction(self, source, target):
+        return f"Translate the values of the following JSON object from {source} to {target} and reply with a JSON object with the same keys"
+
+    def format(self, texts):
+        return json.dumps({str(i): text for i, text in enumerate(texts, 1)}, ensure_ascii=False)
+
+    def parser(self, count):
+        return JsonParser(count)
+
+    def response_format(self, count):
+        """JSON schema requiring one string per segment number"""
+        if not self.schema:
+            return None
+        keys = [str(i) for i in range(1, count + 1)]
+        return {
+            "type": "json_schema",
+            "json_schema": {
+                "name": "translations",
+                "strict": True,
+                "schema": {
+                    "type": "object",
+                    "properties": {key: {"type": "string"} for key in keys},
+                    "required": keys,
+                    "additionalProperties": False,
+                },
+            },
+        }
+
+
+class ThinkFilter:
+    """Remove ``<think>...</think>`` blocks (and the newlines after them) from
+    a streamed reply, even when a tag is split across chunks"""
+
+    OPEN = "<think>"
+    CLOSE = "</think>"
+
+    def __init__(self):
+        self.buffer = ""
+        self.inside = False
+        self.after_block = False
+        self.searched = 0  # Part of the buffer already searched for the closing tag
+
+    def feed(self, chunk):
+        self.buffer += chunk
+        output = []
+        while True:
+            if self.inside:
+                # The whole block is held back: if it is never closed, it stays in the reply
+                end = self.buffer.find(self.CLOSE, self.searched)
+                if end < 0:
+                    self.searched = max(0, len(self.buffer) - (len(self.CLOSE) - 1))
+                    break
+                self.buffer = self.buffer[end + len(self.CLOSE):]
+                self.searched = 0
+                self.inside = False
+                self.after_block = True
+                continue
+            if self.after_block:
+                self.buffer = self.buffer.lstrip("\n")
+                if not self.buffer:
+                    break
+                self.after_block = False
+            start = self.buffer.find(self.OPEN)
+            if start >= 0:
+                output.append(self.buffer[:start])
+                self.buffer = self.buffer[start + len(self.OPEN):]
+                self.inside = True
+                continue
+            keep = _partial_suffix(self.buffer, self.OPEN)
+            output.append(self.buffer[:len(self.buffer) - keep])
+            self.buffer = self.buffer[len(self.buffer) - keep:]
+            break
+        return "".join(output)
+
+    def close(self):
+        # An unterminated block is left in the reply, as the non-streaming filter does
+        text = self.OPEN + self.buffer if self.inside else self.buffer
+        self.buffer = ""
+        return text
+
+
+def _partial_suffix(text, tag):
+    """Length of the longest end of ``text`` that is a beginning of ``tag``"""
+    for length in range(min(len(tag) - 1, len(text)), 0, -1):
+        if text.endswith(tag[:length]):
+            return length
+    return 0
+
+
+class StreamInterrupted(Exception):
+    """A streamed reply failed part way; ``segments`` holds the complete
+    {segment index: text} that arrived before the failure"""
+
+    def __init__(self, error, segments):
+        super().__init__(str(error))
+        self.error = error
+        self.segments = segments
+
+
+def get_protocol(name, separator, schema=False):
+    """Create the wire format called ``name``"""
+    if name == "separator":
+        return SeparatorProtocol(separator)
+    if name == "numbered":
+        return NumberedProtocol()
+    if name == "json":
+        return JsonProtocol(schema)
+    raise ValueError(f"Unknown LLM protocol: {name}")
+
+
+def parse_reply(protocol, text, count):
+    """Parse a complete reply into {segment index: text}"""
+    parser = protocol.parser(count)
+    return dict(parser.feed(text) + parser.close())
@@ -0,0 +1,89 @@
+"""Rate limiter for LLM requests.
+
+Limits requests per minute and tokens per minute with token buckets, and the
+number of requests in flight; a limit of 0 disables it.  Requests are paced
+rather than sent in bursts, so with only a request limit set they start at
+most every ``60 / requests_per_minute`` seconds, no matter how long each one
+takes.
+
+A limiter can be shared by several worker processes through
+``LimiterManager``; workers then call it through a proxy, which is why
+waiting is done by polling ``reserve`` rather than inside the object.
+"""
+import asyncio
+import threading
+import time
+from multiprocessing.managers import BaseManager
+
+# How often to check again while all in-flight slots are taken
+IN_FLIGHT_POLL = 0.05
+
+
+class RateLimiter:
+    """Requests/tokens-per-minute token buckets and an in-flight limit"""
+
+    def __init__(self, requests_per_minute=0, tokens_per_minute=0, max_in_flight=0, burst=1):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_in_flight = max_in_flight
+        self.request_capacity = max(1, burst)
+        self.token_capacity = tokens_per_minute
+        self.in_flight = 0
+        self._requests = self.request_capacity
+        self._tokens = self.token_capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        if self.requests_per_minute:
+            self._requests = min(self.request_capacity, self._requests + elapsed * self.requests_per_minute / 60)
+        if self.tokens_per_minute:
+            self._tokens = min(self.token_capacity, self._tokens + elapsed * self.tokens_per_minute / 60)
+
+    def delay(self, tokens=0):
+        """Seconds to wait before a request using ``tokens`` tokens may start"""
+        self._refill()
+        wait = 0.0
+        if self.max_in_flight and self.in_flight >= self.max_in_flight:
+            wait = IN_FLIGHT_POLL
+        if self.requests_per_minute and self._requests < 1:
+            wait = max(wait, (1 - self._requests) * 60 / self.requests_per_minute)
+        if self.tokens_per_minute:
+            tokens = min(tokens, self.token_capacity)
+            if self._tokens < tokens:
+                wait = max(wait, (tokens - self._tokens) * 60 / self.tokens_per_minute)
+        return wait
+
+    def reserve(self, tokens=0):
+        """Start a request now if allowed and return 0, otherwise return the
+        seconds to wait before trying again"""
+        with self._lock:
+            wait = self.delay(tokens)
+            if wait <= 0:
+                self.in_flight += 1
+                if self.requests_per_minute:
+                    self._requests -= 1
+                if self.tokens_per_minute:
+                    self._tokens -= min(tokens, self.token_capacity)
+            return wait
+
+    def release(self):
+        """Mark a request started with ``reserve`` as finished"""
+        with self._lock:
+            self.in_flight = max(0, self.in_flight - 1)
+
+
+async def acquire(limiter, tokens=0):
+    """Wait until ``limiter`` (local or a manager proxy) allows a request"""
+    while (wait := limiter.reserve(tokens)) > 0:
+        await asyncio.sleep(wait)
+
+
+class LimiterManager(BaseManager):
+    """Hosts one RateLimiter shared by all worker processes"""
+
+
+LimiterManager.register("RateLimiter", RateLimiter)
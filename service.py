@@ -0,0 +1,355 @@
+"""Headless translation service with a job queue.
+
+Runs as a long-lived daemon so the startup cost is paid once: the LLM clients
+and their keep-alive connections, the translation memory, the translations
+already made in this session and one workbook backend per worker (e.g. its
+Excel instance) stay warm across jobs.  Clients talk to it over HTTP:
+
+    POST /jobs?from=ja&to=en,vi&name=book.xlsx   body: the workbook  -> {"id": ...}
+    GET  /jobs                                   status of every job
+    GET  /jobs/<id>                              status of one job
+    GET  /jobs/<id>/result?lang=en               the translated workbook
+    GET  /stats                                  counters, metrics and LLM endpoints of the session
+
+    python service.py --port 8765 --jobs 2 --backend xlsx --retention 3600
+    curl --data-binary @book.xlsx "http://127.0.0.1:8765/jobs?from=ja&to=en&name=book.xlsx"
+
+Finished jobs, their upload and their results are removed ``retention``
+seconds after they finish, so a service left running does not fill the disk.
+Uploads larger than ``max_upload`` bytes are refused.
+
+The LLM settings are read from .env and the environment, as for main.py.
+"""
+import argparse
+import json
+import os
+import queue
+import shutil
+import signal
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import main as translator
+import metrics
+
+MAX_EVENTS = 100000  # Metric events kept for /stats
+MAX_SESSION_TRANSLATIONS = 500000  # Translations kept in memory across jobs, the cache keeps the rest
+
+
+class Job:
+    """One uploaded workbook translated into one or more languages"""
+
+    def __init__(self, name, input_path, output_dir, source_lang, target_langs):
+        self.id = uuid.uuid4().hex[:12]
+        self.name = name
+        self.dir = os.path.dirname(input_path)
+        self.input_path = input_path
+        self.output_dir = output_dir
+        self.source_lang = source_lang
+        self.target_langs = target_langs
+        self.state = "queued"  # queued, running, done or failed
+        self.outputs = {}  # language -> (output path or None, complete)
+        self.error = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "from": self.source_lang,
+            "to": self.target_langs,
+            "state": self.state,
+            "outputs": {lang: {"ready": bool(path), "complete": complete}
+                        for lang, (path, complete) in self.outputs.items()},
+            "error": self.error,
+            "submitted": self.submitted,
+            "started": self.started,
+            "finished": self.finished,
+        }
+
+
+class TranslationService:
+    """Job queue processed by ``workers`` threads, each with its own backend"""
+
+    def __init__(self, work_dir, workers=1, backend_name=None, retention=3600, max_upload=100 << 20):
+        self.work_dir = work_dir
+        self.workers = workers
+        self.backend_name = backend_name
+        self.retention = retention  # Seconds a finished job is kept, 0 = forever
+        self.max_upload = max_upload  # Largest workbook accepted, in bytes
+        self.jobs = {}
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.threads = []
+        self.stopping = threading.Event()
+        # Translations made in this session: source language -> {target language: {text: translation}}
+        self.translations = {}
+
+    def start(self):
+        """Warm up the shared resources and start the worker threads"""
+        os.makedirs(self.work_dir, exist_ok=True)
+        translator.get_llm_pool()
+        translator.get_llm_loop()
+        translator.get_translation_memory()
+        for n in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"job-worker-{n + 1}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        if self.retention > 0:
+            self._remove_stale_dirs()
+            threading.Thread(target=self._clean_up, name="job-cleanup", daemon=True).start()
+        return self
+
+    def stop(self):
+        """Let the workers finish their current job, then close their backends"""
+        self.stopping.set()
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+
+    def expire_jobs(self, now=None):
+        """Forget the jobs that finished more than ``retention`` seconds ago and delete their files"""
+        deadline = (now or time.time()) - self.retention
+        with self.lock:
+            expired = [job for job in self.jobs.values() if job.finished and job.finished < deadline]
+            for job in expired:
+                del self.jobs[job.id]
+        for job in expired:
+            shutil.rmtree(job.dir, ignore_errors=True)
+        if expired:
+            print(f"🧹 Removed {len(expired)} finished jobs older than {self.retention:g} seconds")
+        return expired
+
+    def _clean_up(self):
+        while not self.stopping.wait(min(self.retention, 60)):
+            self.expire_jobs()
+
+    def _remove_stale_dirs(self):
+        """Delete the job directories an earlier run of the service left behind"""
+        deadline = time.time() - self.retention
+        for entry in os.scandir(self.work_dir):
+            if entry.name.startswith("job-") and entry.is_dir() and entry.stat().st_mtime < deadline:
+                shutil.rmtree(entry.path, ignore_errors=True)
+
+    def submit(self, name, data, source_lang, target_langs):
+        """Store an uploaded workbook and queue it"""
+        name = os.path.basename(name)
+        job_dir = tempfile.mkdtemp(prefix="job-", dir=self.work_dir)
+        input_path = os.path.join(job_dir, name)
+        with open(input_path, "wb") as f:
+            f.write(data)
+        job = Job(name, input_path, os.path.join(job_dir, "output"), source_lang, target_langs)
+        with self.lock:
+            self.jobs[job.id] = job
+        self.queue.put(job)
+        print(f"📥 Queued job {job.id}: {name} ({source_lang} to {', '.join(target_langs)})")
+        return job
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def all_jobs(self):
+        with self.lock:
+            return list(self.jobs.values())
+
+    def _work(self):
+        init_com()
+        backend = translator.create_backend(self.backend_name)
+        try:
+            while (job := self.queue.get()) is not None:
+                self._run(job, backend)
+        finally:
+            backend.close()
+
+    def _run(self, job, backend):
+        job.state = "running"
+        job.started = time.time()
+        job_labels = metrics.push_labels(job=job.id)
+        try:
+            with self.lock:
+                translations = self.translations.setdefault(job.source_lang, {})
+            job.outputs = translator.process_excel(job.input_path, job.output_dir, job.source_lang, job.target_langs,
+                                                   backend=backend, translations=translations)
+            job.state = "done" if all(path for path, _ in job.outputs.values()) else "failed"
+        except Exception as job_err:
+            job.error = str(job_err)
+            job.state = "failed"
+        finally:
+            metrics.pop_labels(job_labels)
+            job.finished = time.time()
+            # Start over rather than keep every event of a long-running service
+            if len(metrics.run_metrics.events) > MAX_EVENTS:
+                metrics.run_metrics.clear()
+            # Same for the session translations; running jobs keep the dicts they were given
+            with self.lock:
+                if sum(len(texts) for by_target in self.translations.values()
+                       for texts in by_target.values()) > MAX_SESSION_TRANSLATIONS:
+                    self.translations = {}
+        print(f"{'✅' if job.state == 'done' else '❌'} Job {job.id} {job.state} in {job.finished - job.started:.2f} seconds")
+
+
+def init_com():
+    """xlwings needs COM initialized in every thread that talks to Excel"""
+    if sys.platform == "win32":
+        try:
+            import pythoncom
+            pythoncom.CoInitialize()
+        except ImportError:
+            pass
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        service = self.server.service
+        url = urlparse(self.path)
+        parts = [part for part in url.path.split("/") if part]
+        if parts == ["jobs"]:
+            self._send(200, {"jobs": [job.to_dict() for job in service.all_jobs()]})
+        elif parts == ["stats"]:
+            self._send(200, {"counters": translator.run_stats.snapshot(), **metrics.run_metrics.summary(),
+                             "endpoint_pool": translator.get_llm_pool().status()})
+        elif len(parts) in (2, 3) and parts[0] == "jobs":
+            job = service.get(parts[1])
+            if job is None:
+                self._send(404, {"error": f"Unknown job: {parts[1]}"})
+            elif len(parts) == 2:
+                self._send(200, job.to_dict())
+            elif parts[2] == "result":
+                self._send_result(job, parse_qs(url.query).get("lang", [None])[0])
+            else:
+                self._send(404, {"error": "Not found"})
+        else:
+            self._send(404, {"error": "Not found"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path.rstrip("/") != "/jobs":
+            self._send(404, {"error": "Not found"})
+            return
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        length = self.headers.get("Content-Length")
+        max_upload = self.server.service.max_upload
+        # The body is not read on these errors, so the connection cannot be reused
+        if length is None:
+            self.close_connection = True
+            self._send(411, {"error": "Send the workbook with a Content-Length header"})
+            return
+        if not length.strip().isdigit():
+            self.close_connection = True
+            self._send(400, {"error": f"Invalid Content-Length: {length}"})
+            return
+        if int(length) > max_upload:
+            self.close_connection = True
+            self._send(413, {"error": f"The workbook is larger than {max_upload} bytes"})
+            return
+        data = self.rfile.read(int(length))
+        source_lang = query.get("from", "")
+        try:
+            target_langs = translator.parse_languages(query.get("to", ""))
+        except argparse.ArgumentTypeError as lang_err:
+            self._send(400, {"error": str(lang_err)})
+            return
+        name = query.get("name") or "workbook.xlsx"
+        if source_lang not in translator.lang_map or not target_langs:
+            self._send(400, {"error": "Give the source and target languages as ?from=ja&to=en,vi"})
+        elif not data:
+            self._send(400, {"error": "Send the workbook as the request body"})
+        elif os.path.splitext(name)[1].lower() not in (".xlsx", ".xlsm", ".xls"):
+            self._send(400, {"error": f"Not an Excel file: {name}"})
+        else:
+            job = self.server.service.submit(name, data, source_lang, target_langs)
+            self._send(202, job.to_dict())
+
+    def _send_result(self, job, target_lang):
+        if target_lang is None and len(job.target_langs) == 1:
+            target_lang = job.target_langs[0]
+        output_path, _ = job.outputs.get(target_lang, (None, False))
+        if job.state in ("queued", "running"):
+            self._send(409, {"error": f"Job {job.id} is {job.state}"})
+        elif target_lang is None:
+            self._send(400, {"error": f"Choose the language of the result: ?lang={'|'.join(job.target_langs)}"})
+        elif not output_path:
+            self._send(404, {"error": f"No {target_lang} result for job {job.id}"})
+        else:
+            try:
+                with open(output_path, "rb") as f:
+                    payload = f.read()
+            except FileNotFoundError:  # Expired while the request came in
+                self._send(404, {"error": f"No {target_lang} result for job {job.id}"})
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Disposition", f'attachment; filename="{os.path.basename(output_path)}"')
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    def _send(self, status, data):
+        payload = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def serve(host, port, service):
+    server = ThreadingHTTPServer((host, port), ServiceHandler)
+    server.daemon_threads = True
+    server.service = service
+    # Stop like on Ctrl+C when the service manager asks
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+    print(f"🛰️ Translation service listening on http://{host}:{server.server_address[1]}/ "
+          f"({service.workers} concurrent jobs, {service.backend_name} backend)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print("🛑 Stopping, waiting for running jobs...")
+        service.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8765, help='Port to listen on (default: 8765)')
+    parser.add_argument('--jobs', type=int, default=int(os.getenv("SERVICE_JOBS") or 1),
+                        help='Workbooks processed at the same time (default: SERVICE_JOBS or 1)')
+    parser.add_argument('--work-dir', default=os.getenv("SERVICE_DIR") or "service_jobs",
+                        help='Directory for uploaded workbooks and results (default: SERVICE_DIR or service_jobs)')
+    parser.add_argument('--retention', type=float, default=float(os.getenv("SERVICE_RETENTION") or 3600),
+                        help='Seconds finished jobs and their files are kept, 0 = forever '
+                             '(default: SERVICE_RETENTION or 3600)')
+    parser.add_argument('--max-upload', type=float, default=float(os.getenv("SERVICE_MAX_UPLOAD") or 100),
+                        help='Largest workbook accepted, in MB (default: SERVICE_MAX_UPLOAD or 100)')
+    parser.add_argument('--backend', choices=['excel', 'xlsx'], default=translator.WORKBOOK_BACKEND,
+                        help='Workbook backend (default: WORKBOOK_BACKEND)')
+    parser.add_argument('--no-cache', action='store_true', help='Do not read or write the persistent translation cache')
+    args = parser.parse_args()
+
+    if args.no_cache:
+        translator.TRANSLATION_CACHE = "off"
+    service = TranslationService(os.path.abspath(args.work_dir), max(1, args.jobs), args.backend,
+                                 args.retention, int(args.max_upload * (1 << 20))).start()
+    serve(args.host, args.port, service)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Translate near-duplicate texts that differ only in numbers, IDs and codes once.
+
+"手順1を実行", "手順2を実行", ... "手順250を実行" all become the template
+"手順{1}を実行" with the values ["1"], ["2"], ... ["250"].  The template is
+translated once and the values are put back into its translation; if the
+placeholders do not come back exactly, the texts have to be translated one
+by one instead.
+"""
+import re
+
+# Numbers (with thousands separators) and IDs or codes: runs of ASCII letters
+# and digits, possibly joined by - _ . / : #, that contain a digit
+VALUE = re.compile(r"(?<![A-Za-z0-9])(?:\d{1,3}(?:,\d{3})+(?:\.\d+)?"
+                   r"|(?=[A-Za-z0-9\-_./:#]*\d)[A-Za-z0-9]+(?:[\-_./:#][A-Za-z0-9]+)*)(?![A-Za-z0-9])")
+PLACEHOLDER = re.compile(r"\{(\d+)\}")
+
+
+def make_template(text):
+    """Return (template, values) for a text with numbers or codes, else None"""
+    if "{" in text or "}" in text:
+        return None
+    values = []
+
+    def placeholder(match):
+        values.append(match.group(0))
+        return f"{{{len(values)}}}"
+
+    template = VALUE.sub(placeholder, text)
+    if not values or not template.strip("{}0123456789 "):
+        return None  # Nothing left to translate around the values
+    return template, values
+
+
+def fill_template(translated, values):
+    """Put the values back into a translated template, or None if its
+    placeholders were lost, duplicated or changed"""
+    found = sorted(int(number) for number in PLACEHOLDER.findall(translated))
+    if found != list(range(1, len(values) + 1)):
+        return None
+    return PLACEHOLDER.sub(lambda match: values[int(match.group(1)) - 1], translated)
+
+
+def group_texts(texts, min_group=2):
+    """Split texts into {template: [(text, values), ...]} for the templates
+    shared by at least ``min_group`` texts, and a list of the other texts"""
+    candidates = {}
+    singles = []
+    for text in texts:
+        templated = make_template(text)
+        if templated is None:
+            singles.append(text)
+        else:
+            candidates.setdefault(templated[0], []).append((text, templated[1]))
+
+    groups = {}
+    single_texts = set(singles)
+    for template, members in candidates.items():
+        # A template that is also a text of its own would be ambiguous
+        if len(members) >= min_group and template not in single_texts:
+            groups[template] = members
+        else:
+            singles.extend(text for text, _ in members)
+    return groups, singles
@@ -0,0 +1,86 @@
+"""Skip rules of classifier.py"""
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from classifier import RULES, Classifier  # noqa: E402
+
+
+@pytest.mark.parametrize("text, reason", [
+    ("x", "short"),
+    ("★", "short"),
+    ("=SUM(A1:A3)", "formula"),
+    ("https://example.com/a?b=c", "url"),
+    ("www.example.com", "url"),
+    ("user@example.co.jp", "email"),
+    ("mailto:a@b.com", "email"),
+    ("C:\\dir\\file.txt", "path"),
+    ("\\\\server\\share", "path"),
+    ("/usr/local/bin", "path"),
+    ("~/work/", "path"),
+    ("docs/spec.xlsx", "path"),
+    ("report.PDF", "path"),
+    ("2024-01-31", "date"),
+    ("2024/1/5 9:00", "date"),
+    ("12/31", "date"),
+    ("10:30", "date"),
+    ("v1.2", "version"),
+    ("Ver.3", "version"),
+    ("1.2.3", "version"),
+    ("0x1F", "hex"),
+    ("a3f9c2d1", "hex"),
+    ("123e4567-e89b-12d3-a456-426614174000", "hex"),
+    ("AB-1234", "part_number"),
+    ("A123", "part_number"),
+    ("1,234.5", "number"),
+    ("50%", "number"),
+    ("※ → ■", "symbols"),
+    ("Total", "other_script"),
+])
+def test_rules(text, reason):
+    assert Classifier("ja").reason(text) == reason
+
+
+@pytest.mark.parametrize("text", [
+    "売上",
+    "2024年1月",
+    "v1.2 の変更点",
+    "/specification_documents_final を参照",
+    "仕様書/設計書.xlsx を参照",
+    "https://example.com を参照",
+])
+def test_text_to_translate(text):
+    assert Classifier("ja").reason(text) is None
+
+
+def test_rule_names_the_first_match():
+    # "1.2.3" is a number too, but the version rule comes first
+    assert list(RULES).index("version") < list(RULES).index("number")
+    assert Classifier("ja", rules=["number"]).reason("1.2.3") == "number"
+
+
+def test_script_check():
+    assert Classifier("ja").reason("Total 合計") is None
+    assert Classifier("ja", min_source_ratio=None).reason("Total") is None
+    assert Classifier("en").reason("合計") == "other_script"
+
+
+@pytest.mark.parametrize("text", [
+    "/" + "a" * 5000 + " です",
+    "/" + "a/" * 2500 + " です",
+    "~/" + "a." * 2500 + " です",
+    "a/" * 2500 + "a.xlsx です",
+    "a." * 2500 + " です",
+    "A-" * 2500 + " です",
+    "1." * 2500 + " です",
+    "a@" + "b." * 2500 + " です",
+    "0" * 5000 + " です",
+])
+def test_long_text_does_not_backtrack(text):
+    start = time.perf_counter()
+    assert Classifier("ja").reason(text) is None
+    assert time.perf_counter() - start < 0.5
@@ -0,0 +1,94 @@
+"""Write-back of ExcelBackend against the in-memory Excel of benchmark/fake_excel.py"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmark"))
+
+import fake_excel  # noqa: E402
+from excel_backend import ExcelBackend  # noqa: E402
+from fake_excel import FakeApp  # noqa: E402
+
+
+def translate(contents, keep=(), chunk_rows=None, release=False):
+    """Translate every text cell but those in ``keep``, save, and return the app and the saved cells"""
+    app = FakeApp({"book.xlsx": {"Sheet1": contents}})
+    wb = ExcelBackend(app_factory=lambda: app).open("book.xlsx")
+    for _, segments in wb.sections(chunk_rows):
+        for text, ref in segments:
+            if text not in keep:
+                wb.write(ref, f"T:{text}")
+        if release:
+            wb.flush(release=True)
+    wb.save("out.xlsx")
+    return app, app.saved["out.xlsx"]["Sheet1"]
+
+
+@pytest.fixture
+def written(monkeypatch):
+    """Positions of every cell assigned to through a range"""
+    positions = []
+    assign = fake_excel.FakeRange._assign
+
+    def record(rng, content):
+        positions.extend(position for row in rng._positions() for position in row)
+        assign(rng, content)
+
+    monkeypatch.setattr(fake_excel.FakeRange, "_assign", record)
+    return positions
+
+
+def table(rows):
+    """Text, number, text, formula and text columns, as sheets usually are"""
+    contents = {}
+    for row in range(1, rows + 1):
+        contents.update({(row, 1): f"名前{row}", (row, 2): row * 10, (row, 3): f"備考{row}",
+                         (row, 4): f"=B{row}*2", (row, 5): f"状態{row}"})
+    return contents
+
+
+def test_columns_are_written_as_rectangles():
+    app, cells = translate(table(100))
+    # A:C bridged over the numbers in B, E on its own next to the formulas in D
+    assert app.calls["range.formula="] == 2
+    assert app.calls["range.value="] == 0
+    assert cells[(7, 1)] == ("T:名前7", "T:名前7")
+    assert cells[(7, 5)] == ("T:状態7", "T:状態7")
+
+
+def test_chunks_are_written_per_block():
+    app, cells = translate(table(100), chunk_rows=25, release=True)
+    assert app.calls["range.formula="] == 4 * 2
+    assert cells[(100, 3)] == ("T:備考100", "T:備考100")
+
+
+def test_untranslated_cells_are_not_rewritten(written):
+    contents = {
+        (1, 1): "見出し", (1, 2): "=SEQUENCE(3)", (1, 3): "説明", (1, 4): "ABC-123", (1, 5): "結果",
+        (2, 1): "値", (2, 2): 3.5, (2, 4): True, (2, 5): "合計",
+    }
+    before = fake_excel.FakeSheet(FakeApp({}), "Sheet1", contents).cells
+    app, cells = translate(contents, keep={"ABC-123"})
+
+    # Formulas and untranslated text lie between translated cells but are never assigned
+    assert (1, 2) not in written
+    assert (1, 4) not in written
+    assert cells[(1, 2)] == before[(1, 2)]
+    assert cells[(1, 4)] == before[(1, 4)]
+    # Numbers, booleans and empty cells come back unchanged when a run is bridged over them
+    assert cells[(2, 2)] == before[(2, 2)]
+    assert cells[(2, 4)] == before[(2, 4)]
+    assert (2, 3) not in cells
+    for position in [(1, 1), (1, 3), (1, 5), (2, 1), (2, 5)]:
+        assert cells[position][1] == "T:" + before[position][1]
+    # Row 1 is split around the formula and the kept text, row 2 is one run
+    assert app.calls["range.formula="] == 4
+
+
+def test_single_translated_cell():
+    app, cells = translate({(3, 2): "=A1", (3, 3): "こんにちは"})
+    assert app.calls["range.formula="] == 1
+    assert cells[(3, 2)][1] == "=A1"
+    assert cells[(3, 3)] == ("T:こんにちは", "T:こんにちは")
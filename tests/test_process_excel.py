@@ -0,0 +1,43 @@
+"""process_excel with the xlsx backend and canned translations instead of an LLM"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+from xlsx_backend import XlsxBackend  # noqa: E402
+from xlsx_packages import read_parts, shared_string_rows, write_package  # noqa: E402
+
+RICH_TEXT = '<si><r><rPr><b/></rPr><t>太字</t></r><r><t xml:space="preserve">\n改行の後</t></r></si>'
+
+
+@pytest.fixture
+def translator(monkeypatch):
+    """Tag every text with its language, but give no Vietnamese for the rich text"""
+    monkeypatch.setattr(main, "TRANSLATION_CACHE", "off")
+    monkeypatch.setattr(main, "GLOSSARY", None)
+
+    async def request_translation(texts, source, target, emit=None, glossary=None):
+        return {i: "" if target == "Vietnamese" and text.startswith("太字") else f"[{target}] {text}"
+                for i, text in enumerate(texts)}
+
+    monkeypatch.setattr(main, "request_translation", request_translation)
+
+
+@pytest.mark.parametrize("pipeline_rows", [0, 1])
+def test_untranslated_text_is_left_alone(tmp_path, monkeypatch, translator, pipeline_rows):
+    monkeypatch.setattr(main, "PIPELINE_ROWS", pipeline_rows)
+    source = write_package(tmp_path / "book.xlsx", {"Sheet1": shared_string_rows(2)},
+                           ['<si><t>売上</t></si>', RICH_TEXT])
+    results = main.process_excel(str(source), str(tmp_path / "out"), "ja", ["en", "vi"],
+                                 backend=XlsxBackend(), translations={})
+
+    en, vi = (read_parts(results[lang][0])["xl/sharedStrings.xml"].decode("utf-8") for lang in ("en", "vi"))
+    assert results["en"][1] and not results["vi"][1]
+    assert "<t>[English] 売上</t>" in en
+    assert "<t>[English] 太字 改行の後</t>" in en
+    assert "<t>[Vietnamese] 売上</t>" in vi
+    # The rich text that was not translated keeps its runs and line break
+    assert RICH_TEXT in vi
@@ -0,0 +1,57 @@
+"""Upload checks of the service's HTTP handler"""
+import http.client
+import json
+import os
+import sys
+import threading
+from http.server import ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from service import ServiceHandler  # noqa: E402
+
+
+@pytest.fixture
+def server():
+    submitted = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ServiceHandler)
+    server.daemon_threads = True
+    server.service = SimpleNamespace(
+        max_upload=1000,
+        submit=lambda *job: submitted.append(job) or SimpleNamespace(to_dict=lambda: {"id": "job"}))
+    server.submitted = submitted
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def post(server, headers, body=b""):
+    connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=5)
+    connection.putrequest("POST", "/jobs?from=ja&to=en&name=book.xlsx")
+    for name, value in headers.items():
+        connection.putheader(name, value)
+    connection.endheaders(body)
+    response = connection.getresponse()
+    result = response.status, json.loads(response.read())
+    connection.close()
+    return result
+
+
+@pytest.mark.parametrize("headers, status", [
+    ({}, 411),
+    ({"Content-Length": "many"}, 400),
+    ({"Content-Length": "-5"}, 400),
+    ({"Content-Length": "1001"}, 413),
+])
+def test_bad_uploads_are_refused(server, headers, status):
+    assert post(server, headers)[0] == status
+    assert not server.submitted
+
+
+def test_upload_within_the_limit(server):
+    assert post(server, {"Content-Length": "4"}, b"PK..") == (202, {"id": "job"})
+    assert server.submitted == [("book.xlsx", b"PK..", "ja", ["en"])]
@@ -0,0 +1,41 @@
+"""translate_batch_async against canned replies instead of an LLM"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+from protocols import get_protocol, parse_reply  # noqa: E402
+
+TEXTS = ["売上", "利益", "計画", "報告"]
+
+
+def translate(monkeypatch, protocol_name, content):
+    """Translate TEXTS when the first request gets ``content`` and any retry an empty reply"""
+    monkeypatch.setattr(main, "protocol", get_protocol(protocol_name, main.separator))
+    monkeypatch.setattr(main, "LLM_MAX_ATTEMPTS", 2)
+
+    async def request_translation(texts, *args, **kwargs):
+        return parse_reply(main.protocol, content if len(texts) == len(TEXTS) else "", len(texts))
+
+    monkeypatch.setattr(main, "request_translation", request_translation)
+    main.run_stats.clear()
+    return asyncio.run(main.translate_batch_async(TEXTS, "ja", "en"))
+
+
+@pytest.mark.parametrize("protocol_name", ["separator", "numbered"])
+def test_empty_reply_fails_every_segment(monkeypatch, protocol_name):
+    assert translate(monkeypatch, protocol_name, "") == [None] * 4
+    assert main.run_stats["failed_segments"] == 4
+
+
+@pytest.mark.parametrize("protocol_name, content", [
+    ("separator", "Sales¦¦¦ ¦¦¦Plan¦¦¦Report"),
+    ("numbered", "[1] Sales\n[2]\n[3] Plan\n[4] Report"),
+])
+def test_blank_segment_fails(monkeypatch, protocol_name, content):
+    assert translate(monkeypatch, protocol_name, content) == ["Sales", None, "Plan", "Report"]
+    assert main.run_stats["failed_segments"] == 1
@@ -0,0 +1,141 @@
+"""Reading and splicing of xlsx_backend on generated packages"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import xlsx_backend  # noqa: E402
+from xlsx_backend import XlsxBackend, XlsxWorkbook  # noqa: E402
+from xlsx_packages import inline_string_rows, read_parts, shared_string_rows, write_package  # noqa: E402
+
+RUBY = ('<si><r><rPr><b/></rPr><t>東京</t></r><r><t xml:space="preserve">\n駅前</t></r>'
+        '<rPh sb="0" eb="2"><t>トウキョウ</t></rPh><phoneticPr fontId="1"/></si>')
+PARAGRAPH = '<a:p><a:r><a:rPr lang="ja-JP"/><a:t>注意</a:t></a:r><a:r><a:t>事項</a:t></a:r></a:p>'
+
+
+def segments(path, chunk_rows=None):
+    wb = XlsxWorkbook(str(path))
+    try:
+        return [(name, text, ref) for name, items in wb.sections(chunk_rows) for text, ref in items]
+    finally:
+        wb.close()
+
+
+def translate(source, target, translate_text, chunk_rows=None):
+    """Write translate_text(text) for every segment, flushing each chunk like the pipelined mode"""
+    wb = XlsxBackend().open(str(source))
+    for _, items in wb.sections(chunk_rows):
+        for text, ref in items:
+            wb.write(ref, translate_text(text))
+        if chunk_rows:
+            wb.flush(release=True)
+    wb.save(str(target))
+    wb.close()
+    return read_parts(target)
+
+
+@pytest.fixture
+def book(tmp_path):
+    return write_package(tmp_path / "book.xlsx",
+                         {"売上": shared_string_rows(3), "メモ": inline_string_rows(["受注", "A &amp; B &lt;注&gt;"])},
+                         ['<si><t>売上</t></si>', RUBY, '<si><t xml:space="preserve"> </t></si>'],
+                         [PARAGRAPH, '<a:p><a:endParaRPr lang="ja-JP"/></a:p>'])
+
+
+def test_sections(book):
+    found = [(name, text) for name, text, _ in segments(book)]
+    assert sorted(found) == sorted([
+        ("メモ", "受注"), ("メモ", "A & B <注>"),
+        ("[sharedStrings.xml]", "売上"), ("[sharedStrings.xml]", "東京\n駅前"),
+        ("[drawing1.xml]", "注意事項"),
+    ])
+
+
+def test_rich_text_goes_into_the_first_run(book, tmp_path):
+    parts = translate(book, tmp_path / "out.xlsx", lambda text: {"東京\n駅前": "Tokyo station"}.get(text, text))
+    shared = parts["xl/sharedStrings.xml"].decode("utf-8")
+    # The formatting and the phonetic guide stay, the other runs are emptied
+    assert ('<si><r><rPr><b/></rPr><t>Tokyo station</t></r><r><t xml:space="preserve"></t></r>'
+            '<rPh sb="0" eb="2"><t>トウキョウ</t></rPh><phoneticPr fontId="1"/></si>') in shared
+    drawing = parts["xl/drawings/drawing1.xml"].decode("utf-8")
+    assert '<a:p><a:r><a:rPr lang="ja-JP"/><a:t>注意事項</a:t></a:r><a:r><a:t></a:t></a:r></a:p>' in drawing
+
+
+def test_translations_are_escaped(book, tmp_path):
+    out = tmp_path / "out.xlsx"
+    parts = translate(book, out, lambda text: f"<{text}> & more")
+    sheet = parts["xl/worksheets/sheet2.xml"].decode("utf-8")
+    assert "<t>&lt;A &amp; B &lt;注&gt;&gt; &amp; more</t>" in sheet
+    assert sorted(text for _, text, _ in segments(out)) == sorted(
+        f"<{text}> & more" for _, text, _ in segments(book))
+
+
+def test_untouched_parts_are_identical(book, tmp_path):
+    before = read_parts(book)
+    after = translate(book, tmp_path / "out.xlsx", lambda text: text + "!")
+    changed = {"xl/sharedStrings.xml", "xl/worksheets/sheet2.xml", "xl/drawings/drawing1.xml"}
+    assert list(after) == list(before)
+    assert {name for name in before if before[name] != after[name]} == changed
+
+    # Nothing written, nothing changed
+    wb = XlsxBackend().open(str(book))
+    list(wb.sections())
+    wb.save(str(tmp_path / "same.xlsx"))
+    wb.close()
+    assert read_parts(tmp_path / "same.xlsx") == before
+
+
+def test_chunked_reads_match_whole_reads(tmp_path, monkeypatch):
+    texts = [f"行{i}の説明 &amp; 備考" for i in range(300)]
+    source = write_package(tmp_path / "big.xlsx", {"Sheet1": inline_string_rows(texts)},
+                           [f"<si><t>共有{i}</t></si>" for i in range(300)])
+    whole = translate(source, tmp_path / "whole.xlsx", lambda text: f"T:{text}")
+
+    # Small reads so the parts come in many chunks
+    monkeypatch.setattr(xlsx_backend, "CHUNK_SIZE", 256)
+    assert len({ref for _, _, ref in segments(source, chunk_rows=10)}) == 600
+    wb = XlsxBackend().open(str(source))
+    chunks = 0
+    for _, items in wb.sections(10):
+        chunks += 1
+        for text, ref in items:
+            wb.write(ref, f"T:{text}")
+        wb.flush(release=True)
+        # Released segments are forgotten, so memory does not grow with the part
+        assert not any(wb.spans.values())
+    wb.save(str(tmp_path / "chunked.xlsx"))
+    wb.close()
+
+    assert chunks > 10
+    assert read_parts(tmp_path / "chunked.xlsx") == whole
+
+
+def test_fork_writes_another_language(book, tmp_path):
+    wb = XlsxBackend().open(str(book))
+    fork = wb.fork()
+    for _, items in wb.sections(1):
+        for text, ref in items:
+            wb.write(ref, f"en:{text}")
+            fork.write(ref, f"vi:{text}")
+        fork.flush(release=True)
+        wb.flush(release=True)
+    wb.save(str(tmp_path / "en.xlsx"))
+    fork.save(str(tmp_path / "vi.xlsx"))
+    fork.close()
+    wb.close()
+
+    for lang in ("en", "vi"):
+        assert sorted(text for _, text, _ in segments(tmp_path / f"{lang}.xlsx")) == sorted(
+            f"{lang}:{text}" for _, text, _ in segments(book))
+
+
+def test_released_segment_cannot_be_written(book):
+    wb = XlsxBackend().open(str(book))
+    refs = [ref for _, items in wb.sections(1) for _, ref in items]
+    wb.write(refs[0], "x")
+    wb.flush(release=True)
+    with pytest.raises(KeyError):
+        wb.write(refs[0], "y")
+    wb.close()
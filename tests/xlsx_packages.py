@@ -0,0 +1,57 @@
+"""Small generated .xlsx packages for the tests"""
+import zipfile
+
+CONTENT_TYPES = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                 '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                 '<Default Extension="xml" ContentType="application/xml"/></Types>')
+WORKBOOK = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"'
+            ' xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"><sheets>{}</sheets></workbook>')
+RELS = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">{}</Relationships>')
+SHEET = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+         '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>{}</sheetData></worksheet>')
+SHARED_STRINGS = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                  '<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">{}</sst>')
+DRAWING = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+           '<xdr:wsDr xmlns:xdr="http://schemas.openxmlformats.org/drawingml/2006/spreadsheetDrawing"'
+           ' xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main">'
+           '<xdr:twoCellAnchor><xdr:sp><xdr:txBody>{}</xdr:txBody></xdr:sp></xdr:twoCellAnchor></xdr:wsDr>')
+
+
+def shared_string_rows(count, first_row=1):
+    """Rows with one cell each, pointing at shared strings 0 to count - 1"""
+    return "".join(f'<row r="{first_row + i}"><c r="A{first_row + i}" t="s"><v>{i}</v></c></row>' for i in range(count))
+
+
+def inline_string_rows(texts, first_row=1):
+    """Rows with one inline string cell each"""
+    return "".join(f'<row r="{first_row + i}"><c r="A{first_row + i}" t="inlineStr"><is><t>{text}</t></is></c></row>'
+                   for i, text in enumerate(texts))
+
+
+def write_package(path, sheets, shared_strings=None, drawing=None):
+    """Write a package with ``sheets`` ({name: <sheetData> content}), the
+    <si> items of the shared strings and the paragraphs of a drawing"""
+    parts = {"[Content_Types].xml": CONTENT_TYPES}
+    entries, rels = [], []
+    for i, (name, data) in enumerate(sheets.items(), 1):
+        entries.append(f'<sheet name="{name}" sheetId="{i}" r:id="rId{i}"/>')
+        rels.append(f'<Relationship Id="rId{i}" Type="worksheet" Target="worksheets/sheet{i}.xml"/>')
+        parts[f"xl/worksheets/sheet{i}.xml"] = SHEET.format(data)
+    parts["xl/workbook.xml"] = WORKBOOK.format("".join(entries))
+    parts["xl/_rels/workbook.xml.rels"] = RELS.format("".join(rels))
+    if shared_strings is not None:
+        parts["xl/sharedStrings.xml"] = SHARED_STRINGS.format("".join(shared_strings))
+    if drawing is not None:
+        parts["xl/drawings/drawing1.xml"] = DRAWING.format("".join(drawing))
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as package:
+        for name, xml in parts.items():
+            package.writestr(name, xml.encode("utf-8"))
+    return path
+
+
+def read_parts(path):
+    """{part name: bytes} of a package"""
+    with zipfile.ZipFile(path) as package:
+        return {name: package.read(name) for name in package.namelist()}
@@ -0,0 +1,99 @@
+"""Persistent translation memory backed by SQLite.
+
+Translations are stored per context (language pair, model and prompt) so a
+change to any of them never returns stale results.  Once the memory grows
+past ``max_entries``, the least recently used entries are evicted down to
+``EVICT_TO`` of it, so the table is counted now and then rather than on
+every store.
+"""
+import hashlib
+import sqlite3
+import threading
+import time
+
+# SQLite limits the number of host parameters in one statement
+LOOKUP_CHUNK = 500
+EVICT_TO = 0.9  # Share of max_entries kept after an eviction
+
+
+def context_key(source_lang, target_lang, model, prompt):
+    """Hash everything besides the text itself that affects a translation"""
+    prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    key = "\x1f".join([source_lang, target_lang, model or "", prompt_hash])
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+class TranslationMemory:
+    """SQLite cache of {(context, source text): translation} with LRU eviction"""
+
+    def __init__(self, path, max_entries=200000):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS translations ("
+            " context TEXT NOT NULL,"
+            " source TEXT NOT NULL,"
+            " translation TEXT NOT NULL,"
+            " last_used REAL NOT NULL,"
+            " PRIMARY KEY (context, source))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS translations_last_used ON translations (last_used)")
+        self._conn.commit()
+        # Upper bound of the entries: stores only add to it, other processes
+        # sharing the file are seen when it is counted again
+        self._entries = self._count()
+
+    def lookup(self, context, texts):
+        """Return {text: translation} for the texts found in the memory"""
+        found = {}
+        texts = list(dict.fromkeys(texts))
+        with self._lock:
+            for i in range(0, len(texts), LOOKUP_CHUNK):
+                chunk = texts[i:i + LOOKUP_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT source, translation FROM translations WHERE context = ? AND source IN ({placeholders})",
+                    [context, *chunk],
+                ).fetchall()
+                found.update(rows)
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE translations SET last_used = ? WHERE context = ? AND source = ?",
+                    [(now, context, source) for source in found],
+                )
+                self._conn.commit()
+        return found
+
+    def store(self, context, translations):
+        """Save {text: translation} pairs and evict the least recently used entries"""
+        if not translations:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO translations (context, source, translation, last_used) VALUES (?, ?, ?, ?)",
+                [(context, source, translation, now) for source, translation in translations.items()],
+            )
+            self._entries += len(translations)
+            if self._entries > self.max_entries:
+                self._entries = self._count()
+                if self._entries > self.max_entries:
+                    excess = self._entries - int(self.max_entries * EVICT_TO)
+                    self._conn.execute(
+                        "DELETE FROM translations WHERE rowid IN"
+                        " (SELECT rowid FROM translations ORDER BY last_used LIMIT ?)",
+                        (excess,),
+                    )
+                    self._entries -= excess
+            self._conn.commit()
+
+    def _count(self):
+        return self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,316 @@
+"""Pure-Python workbook backend for .xlsx/.xlsm files.
+
+The text-bearing parts of the package (shared strings, inline strings,
+comments and drawing text boxes) are streamed out of the zip with expat,
+which reports the byte offset of every text node.  On save the package is
+rewritten part by part: edited parts are spliced at those offsets and every
+other part is copied unchanged, so styles and layout are never re-serialized.
+Excel is not needed, so this backend also runs on Linux.
+"""
+import bisect
+import itertools
+import os
+import re
+import shutil
+import struct
+import tempfile
+import zipfile
+from xml.parsers import expat
+from xml.sax.saxutils import escape
+
+CHUNK_SIZE = 1 << 16
+
+# Part name pattern -> local name of the element that holds one text segment.
+# Text inside <rPh> (Japanese phonetic guides) is never part of a segment.
+TEXT_PARTS = [
+    (re.compile(r'^xl/sharedStrings\.xml$'), 'si'),
+    (re.compile(r'^xl/worksheets/sheet\d+\.xml$'), 'is'),
+    (re.compile(r'^xl/comments\d*\.xml$'), 'text'),
+    (re.compile(r'^xl/drawings/drawing\d+\.xml$'), 'p'),
+]
+
+# Worksheets only need a full parse when they contain inline strings
+INLINE_STRING_MARKER = b'inlineStr'
+
+# Header of an edit spilled to disk: start and end offset, length of the data
+SPILLED_EDIT = struct.Struct('<QQI')
+
+
+def _local(name):
+    return name.rpartition(':')[2]
+
+
+def scan_part(stream, container):
+    """Stream an XML part and return [(text, spans), ...] for each container.
+
+    ``spans`` lists the (start, end) byte offsets of the content of every
+    non-empty <t> element belonging to the segment, in document order.
+    """
+    return [segment for segments in iter_part(stream, container) for segment in segments]
+
+
+def iter_part(stream, container, chunk_size=None, unit=None):
+    """Like scan_part, but yield the segments as the part is read, a list
+    each time ``chunk_size`` more ``unit`` elements (default: containers)
+    have ended, so a large part is never held in memory whole"""
+    parser = expat.ParserCreate()
+    segments = []
+    unit = unit or container
+    state = {'pieces': None, 'spans': None, 'skip': 0, 'in_t': False, 't_start': None, 'units': 0}
+
+    def start_element(name, attrs):
+        tag = _local(name)
+        if state['pieces'] is None:
+            if tag == container:
+                state['pieces'] = []
+                state['spans'] = []
+        elif tag == 'rPh':
+            state['skip'] += 1
+        elif tag == 't' and not state['skip']:
+            state['in_t'] = True
+            state['t_start'] = None
+
+    def character_data(data):
+        if state['in_t']:
+            if state['t_start'] is None:
+                state['t_start'] = parser.CurrentByteIndex
+            state['pieces'].append(data)
+
+    def end_element(name):
+        tag = _local(name)
+        if tag == unit:
+            state['units'] += 1
+        if state['pieces'] is None:
+            return
+        if tag == 't' and state['in_t']:
+            # Empty text nodes (<t/> or <t></t>) carry nothing to replace
+            if state['t_start'] is not None:
+                state['spans'].append((state['t_start'], parser.CurrentByteIndex))
+            state['in_t'] = False
+        elif tag == 'rPh':
+            state['skip'] -= 1
+        elif tag == container:
+            text = ''.join(state['pieces'])
+            if text.strip() and state['spans']:
+                segments.append((text, state['spans']))
+            state['pieces'] = None
+            state['spans'] = None
+
+    parser.StartElementHandler = start_element
+    parser.CharacterDataHandler = character_data
+    parser.EndElementHandler = end_element
+
+    while chunk := stream.read(CHUNK_SIZE):
+        parser.Parse(chunk, False)
+        if chunk_size and state['units'] >= chunk_size:
+            yield segments
+            segments = []
+            state['units'] = 0
+    parser.Parse(b'', True)
+    if segments:
+        yield segments
+
+
+def _contains(stream, marker):
+    """Check whether a stream contains a byte string without loading it whole"""
+    tail = b''
+    while chunk := stream.read(CHUNK_SIZE):
+        if marker in tail + chunk:
+            return True
+        tail = chunk[-len(marker):]
+    return False
+
+
+def _copy(src, dst, size):
+    while size > 0:
+        chunk = src.read(min(size, CHUNK_SIZE))
+        if not chunk:
+            break
+        if dst is not None:
+            dst.write(chunk)
+        size -= len(chunk)
+
+
+def _spilled_edits(spill):
+    """Read back the (start, end, data) edits written to a spill file"""
+    spill.seek(0)
+    while header := spill.read(SPILLED_EDIT.size):
+        start, end, size = SPILLED_EDIT.unpack(header)
+        yield start, end, spill.read(size)
+
+
+def _splice(src, dst, edits):
+    """Copy src to dst, replacing the sorted (start, end, data) byte ranges"""
+    pos = 0
+    for start, end, data in edits:
+        _copy(src, dst, start - pos)
+        _copy(src, None, end - start)
+        dst.write(data)
+        pos = end
+    shutil.copyfileobj(src, dst, CHUNK_SIZE)
+
+
+class XlsxBackend:
+    """Open .xlsx/.xlsm packages directly, without Excel"""
+
+    name = "xlsx"
+    extensions = (".xlsx", ".xlsm")
+
+    def open(self, path):
+        if os.path.splitext(path)[1].lower() not in self.extensions:
+            raise ValueError(f"The xlsx backend only supports {', '.join(self.extensions)} files")
+        return XlsxWorkbook(path)
+
+    def close(self):
+        pass
+
+
+class XlsxWorkbook:
+    """Text segments of one OOXML package and the edits made to them"""
+
+    def __init__(self, path, spans=None):
+        self.path = path
+        self.zip = zipfile.ZipFile(path)
+        self.owner = spans is None  # A fork shares the segments read by its owner
+        self.spans = {} if spans is None else spans  # part name -> {segment index: spans}
+        self.chunk_ends = {}  # part name -> segment index after each chunk read
+        self.released = {}  # part name -> segments before this index are forgotten
+        self.edits = {}  # part name -> {segment index: translated text}
+        self.spills = {}  # part name -> temporary file of edits already turned into byte ranges
+
+    def _sheet_names(self):
+        """Map worksheet part names to the sheet names shown in Excel"""
+        names = {}
+        try:
+            targets = {}
+            rels = self.zip.read('xl/_rels/workbook.xml.rels').decode('utf-8')
+            for attrs in re.findall(r'<Relationship\b([^>]*)>', rels):
+                rel_id = re.search(r'\bId="([^"]*)"', attrs)
+                target = re.search(r'\bTarget="([^"]*)"', attrs)
+                if rel_id and target:
+                    path = target.group(1)
+                    path = path[1:] if path.startswith('/') else 'xl/' + path
+                    targets[rel_id.group(1)] = path
+            workbook = self.zip.read('xl/workbook.xml').decode('utf-8')
+            for attrs in re.findall(r'<(?:\w+:)?sheet\b([^>]*)>', workbook):
+                name = re.search(r'\bname="([^"]*)"', attrs)
+                rel_id = re.search(r'\br:id="([^"]*)"', attrs)
+                if name and rel_id and rel_id.group(1) in targets:
+                    names[targets[rel_id.group(1)]] = name.group(1)
+        except (KeyError, UnicodeDecodeError):
+            pass
+        return names
+
+    def sections(self, chunk_rows=None):
+        """Yield (section name, [(text, reference), ...]) for each text part
+
+        With ``chunk_rows`` a part is yielded in pieces while it is read, as
+        several items with the same name: a worksheet every ``chunk_rows``
+        rows, and the shared strings, comments and drawings, which have no
+        rows, every ``chunk_rows`` strings or paragraphs.
+        """
+        sheet_names = self._sheet_names()
+        for part in self.zip.namelist():
+            container = next((tag for pattern, tag in TEXT_PARTS if pattern.match(part)), None)
+            if container is None:
+                continue
+            if container == 'is':
+                with self.zip.open(part) as stream:
+                    if not _contains(stream, INLINE_STRING_MARKER):
+                        continue
+            name = sheet_names.get(part, f"[{os.path.basename(part)}]")
+            with self.zip.open(part) as stream:
+                unit = 'row' if container == 'is' else container
+                part_spans = self.spans.setdefault(part, {})
+                chunk_ends = self.chunk_ends.setdefault(part, [])
+                first = 0
+                for segments in iter_part(stream, container, chunk_rows, unit):
+                    part_spans.update((first + i, spans) for i, (_, spans) in enumerate(segments))
+                    chunk_ends.append(first + len(segments))
+                    yield name, [(text, (part, first + i)) for i, (text, _) in enumerate(segments)]
+                    first += len(segments)
+
+    def fork(self):
+        """Another workbook of the same package for the edits of another
+        language, sharing the segments read through this one"""
+        return XlsxWorkbook(self.path, self.spans)
+
+    def write(self, ref, text):
+        """Record the translation of a segment; it is applied on save"""
+        part, index = ref
+        if index not in self.spans.get(part, {}):
+            raise KeyError(f"Segment {index} in {part} was already released")
+        self.edits.setdefault(part, {})[index] = text
+
+    def flush(self, release=False):
+        """Edits are applied when the package is saved.
+
+        With ``release`` the edits so far are turned into byte ranges in a
+        temporary file, and the segments read up to the end of the last
+        chunk written to are forgotten, so memory does not grow with the
+        size of the package.  Chunks must be written in reading order, and
+        the forks of a workbook flushed before it.
+        """
+        if not release:
+            return
+        for part, part_edits in self.edits.items():
+            if not part_edits:
+                continue
+            if part not in self.spills:
+                self.spills[part] = tempfile.TemporaryFile()
+            for start, end, data in self._part_edits(part):
+                self.spills[part].write(SPILLED_EDIT.pack(start, end, len(data)) + data)
+            if self.owner:
+                # Everything read before the end of the last chunk written to is done
+                ends = self.chunk_ends.get(part, [])
+                position = bisect.bisect_right(ends, max(part_edits))
+                done = ends[position] if position < len(ends) else max(part_edits) + 1
+                part_spans = self.spans[part]
+                for index in range(self.released.get(part, 0), done):
+                    part_spans.pop(index, None)
+                self.released[part] = max(done, self.released.get(part, 0))
+        if self.owner and self.edits:
+            # Parts read before the last one written to are done as well
+            parts = list(self.spans)
+            last = max(parts.index(part) for part in self.edits if part in self.spans)
+            for part in parts[:last]:
+                self.spans[part].clear()
+        self.edits = {}
+
+    def describe(self, ref):
+        part, index = ref
+        return f"Segment {index} in {part}"
+
+    def _part_edits(self, part):
+        """Byte-range edits for a part: the translation goes into the first
+        text node of each segment and the remaining runs are emptied"""
+        edits = []
+        for index, text in self.edits[part].items():
+            spans = self.spans[part][index]
+            start, end = spans[0]
+            edits.append((start, end, escape(text).encode('utf-8')))
+            edits.extend((start, end, b'') for start, end in spans[1:])
+        return sorted(edits)
+
+    def save(self, path):
+        """Write a new package; untouched parts are copied unchanged"""
+        with zipfile.ZipFile(path, 'w') as out:
+            for info in self.zip.infolist():
+                target = zipfile.ZipInfo(info.filename, info.date_time)
+                target.compress_type = info.compress_type
+                target.external_attr = info.external_attr
+                target.comment = info.comment
+                with self.zip.open(info) as src, out.open(target, 'w') as dst:
+                    spill = self.spills.get(info.filename)
+                    if spill is not None or self.edits.get(info.filename):
+                        # Spilled edits come from earlier chunks, so they all lie before the others
+                        edits = self._part_edits(info.filename) if self.edits.get(info.filename) else []
+                        _splice(src, dst, itertools.chain(_spilled_edits(spill) if spill is not None else [], edits))
+                    else:
+                        shutil.copyfileobj(src, dst, CHUNK_SIZE)
+
+    def close(self):
+        for spill in self.spills.values():
+            spill.close()
+        self.spills = {}
+        self.zip.close()